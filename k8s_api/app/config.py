@@ -1,15 +1,65 @@
+import os
+import threading
+from functools import lru_cache
 from kubernetes import config as k8s_config
+from kubernetes import client
+
+# urllib3 连接池大小，与 FastAPI 同步路由所用线程池（anyio 默认 40）一致；
+# 客户端默认只有 cpu 数 * 5，并发请求超出后连接用完即丢、下次重新握手
+CONNECTION_POOL_MAXSIZE = 40
+
+def env_list(name, default):
+    """读取逗号分隔的环境变量，未设置或为空时返回 default"""
+    value = os.environ.get(name, "")
+    items = tuple(item.strip() for item in value.split(",") if item.strip())
+    return items or tuple(default)
+
+_lock = threading.Lock()
+_config_loaded = False
+_api_client = None
 
 def load_kube_config():
     """
-    优先加载集群内配置，失败则回退到本地 ~./kube/config
+    优先加载集群内配置，失败则回退到本地 ~./kube/config；
+    进程内只加载一次
     """
-    try:
-        k8s_config.load_incluster_config()
-    except:
-        k8s_config.load_kube_config()
+    global _config_loaded
+    with _lock:
+        if _config_loaded:
+            return
+        try:
+            k8s_config.load_incluster_config()
+        except:
+            k8s_config.load_kube_config()
+        _config_loaded = True
 
-# Kubernetes API 对象，可选：如需直接用 client 创建/查询 Service
-from kubernetes import client
-load_kube_config()
-core_v1_api = client.CoreV1Api()
+def get_api_client() -> client.ApiClient:
+    """
+    进程内共享的 ApiClient，首次调用时加载配置；
+    所有 API 对象共用它的连接池
+    """
+    global _api_client
+    load_kube_config()
+    with _lock:
+        if _api_client is None:
+            configuration = client.Configuration.get_default_copy()
+            configuration.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+            _api_client = client.ApiClient(configuration)
+        return _api_client
+
+# Kubernetes API 对象，按需创建，全进程复用
+@lru_cache(maxsize=1)
+def get_core_v1_api() -> client.CoreV1Api:
+    return client.CoreV1Api(get_api_client())
+
+@lru_cache(maxsize=1)
+def get_batch_v1_api() -> client.BatchV1Api:
+    return client.BatchV1Api(get_api_client())
+
+@lru_cache(maxsize=1)
+def get_apps_v1_api() -> client.AppsV1Api:
+    return client.AppsV1Api(get_api_client())
+
+def load_k8s_config():
+    """返回 (core_v1, batch_v1, apps_v1)"""
+    return get_core_v1_api(), get_batch_v1_api(), get_apps_v1_api()
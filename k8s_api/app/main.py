@@ -1,16 +1,18 @@
 import uvicorn
 from fastapi import FastAPI
-from config import load_kube_config
 from routers import webapps
 from routers import databases
 from routers import jobs
 from routers import remote
 from routers import admission_webhook
+from routers import batch_jobs
+from routers import batch_deployments
+from routers import nodes
+from routers import informer
+from routers import device_database
+from routers.namespace_cache import namespace_cache
 from fastapi.middleware.cors import CORSMiddleware
 
-# ---------- 初始化 K8s 配置 ----------
-load_kube_config()
-
 # ---------- FastAPI 应用 ----------
 app = FastAPI(
     title="Cluster Control API (K8s Edition)",
@@ -32,6 +34,34 @@ app.include_router(webapps.router)
 app.include_router(databases.router)
 app.include_router(remote.router)
 app.include_router(admission_webhook.router)
+app.include_router(batch_jobs.router)
+app.include_router(batch_deployments.router)
+app.include_router(nodes.router)
+
+# ---------- 生命周期 ----------
+@app.on_event("startup")
+def on_startup():
+    # 提前启动节点资源索引，避免首个准入请求等待全量 list
+    admission_webhook.node_index.start()
+    remote.service_index.start()
+    remote.job_mux.start()
+    jobs.job_cache.start()
+    namespace_cache.start()
+    device_database.start_write_behind()
+    remote.bench_reconciler.start()
+    # 多个 worker 中只有抢到调度锁的一个实际下发，并恢复重启前未收尾的任务
+    remote.start_ota_scheduler()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await remote.stop_ota_scheduler()
+    informer.stop_all()
+    remote.bench_reconciler.stop()
+    remote.ota_executor.shutdown(wait=False)
+    # 先同步刷新写缓冲，再关闭连接池
+    device_database.stop_write_behind()
+    remote.ssh_pool.close()
+    remote.db_pool.close()
 
 # ---------- 启动 Uvicorn ----------
 if __name__ == "__main__":
@@ -16,6 +16,20 @@ class JobSpec(BaseModel):
 class BatchJob(Metadata, JobSpec):
     queue: str = Field(..., min_length=1)
 
+class BatchJobCreate(BaseModel):
+    name: str = Field(..., min_length=1)
+    min_available: int = Field(..., description="Pod minimum availability")
+    command: str = Field(..., description="Command to run in container")
+    image: str = Field(..., description="Container image to use")
+    task_name: str = Field(..., description="Task name")
+    cpu: str = Field("1", description="CPU requests")
+    mem: str = Field("1Gi", description="Memory requests")
+    task_replicas: int = Field(1, description="Number of parallel pods")
+    queue: Optional[str] = Field(None, description="Queue name")
+    node_selector: Optional[str] = Field(None, description="Node selector label")
+    dataset: Optional[str] = Field(None, description="Dataset volume name")
+    mount: Optional[str] = Field(None, description="Mount path inside container")
+
 class DeploymentRequest(Metadata, JobSpec):
     replicas: int = Field(1)
     strategy: str = Field("RollingUpdate")
@@ -23,4 +37,7 @@ class DeploymentRequest(Metadata, JobSpec):
 class BatchDeploymentSpec(Metadata):
     image: str
     replicas: int = Field(1)
-    env: Dict[str, str] = Field(default_factory=dict)
\ No newline at end of file
+    env: Dict[str, str] = Field(default_factory=dict)
+
+class DeploymentScale(Metadata):
+    replicas: int = Field(..., ge=0)
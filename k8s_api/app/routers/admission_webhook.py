@@ -1,6 +1,14 @@
-from fastapi import APIRouter, Request
+import re
+import time
+import logging
+import threading
+import numpy as np
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from kubernetes import client, config
+from typing import List
+from functools import lru_cache
+from config import get_core_v1_api
+from .informer import Informer, shared_informer
 
 router = APIRouter(prefix="/admission", tags=["AdmissionWebhook"])
 
@@ -10,102 +18,325 @@ NODE_CAPACITY = {
     "storage": 1024.0
 }
 
+# Kubernetes resource.Quantity 语法：<signedNumber><suffix>
+QUANTITY_RE = re.compile(
+    r"^([+-]?(?:\d+(?:\.\d*)?|\.\d+))"
+    r"(?:(Ki|Mi|Gi|Ti|Pi|Ei)|[eE]([+-]?\d+)|(m|k|M|G|T|P|E)?)$"
+)
+BINARY_SUFFIXES = {"Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40, "Pi": 2 ** 50, "Ei": 2 ** 60}
+DECIMAL_SUFFIXES = {None: 1, "m": 1e-3, "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18}
+GIB = 2 ** 30
+# 准入请求等待节点索引同步的最长时间（秒），需小于 webhook 的 timeoutSeconds（默认 10）
+SYNC_TIMEOUT = 5
+
+@lru_cache(maxsize=4096)
+def parse_quantity(quantity) -> float:
+    """
+    严格解析 Kubernetes 资源数量（如 500m、1.5Gi、2k、1e3），返回基本单位下的数值；
+    集群中重复出现的数量字符串有限，按原始字符串缓存
+    """
+    match = QUANTITY_RE.match(str(quantity).strip())
+    if not match:
+        raise ValueError(f"invalid quantity: {quantity!r}")
+    number, binary, exponent, decimal = match.groups()
+    if binary:
+        return float(number) * BINARY_SUFFIXES[binary]
+    if exponent is not None:
+        return float(f"{number}e{exponent}")
+    return float(number) * DECIMAL_SUFFIXES[decimal]
+
 def parse_cpu(cpu_str: str) -> float:
-    if cpu_str.endswith('m'):
-        return float(cpu_str[:-1]) / 1000.0
-    else:
-        return float(cpu_str)
+    return parse_quantity(cpu_str)
 
 def parse_memory(mem_str: str) -> float:
-    mem_str = mem_str.strip()
-    units = {"Ki": 1 / 1024 / 1024, "Mi": 1 / 1024, "Gi": 1, "Ti": 1024}
-    for unit in units:
-        if mem_str.endswith(unit):
-            val = float(mem_str[:-len(unit)])
-            return val * units[unit]
-    val = float(mem_str)
-    return val / 1024 / 1024 / 1024
+    return parse_quantity(mem_str) / GIB
 
 def parse_storage(stor_str: str) -> float:
     return parse_memory(stor_str)
 
-def get_node_allocations():
-    try:
-        config.load_incluster_config()
-    except Exception:
-        config.load_kube_config()
-    v1 = client.CoreV1Api()
-    nodes = v1.list_node().items
-    # 只保留非控制平面节点
-    node_names = [
-        node.metadata.name
-        for node in nodes
-        if "node-role.kubernetes.io/control-plane" not in node.metadata.labels
-        and "node-role.kubernetes.io/master" not in node.metadata.labels
-    ]
-    allocations = {n: {"cpu": 0.0, "memory": 0.0, "storage": 0.0} for n in node_names}
-    pods = v1.list_pod_for_all_namespaces().items
-    for pod in pods:
-        if pod.status.phase not in ("Running", "Pending"):
+def pod_requests(pod) -> tuple:
+    """
+    汇总一个 Pod 所有容器的 requests，返回 (cpu 核, memory GiB)
+    """
+    cpu = 0.0
+    memory = 0.0
+    for c in pod.spec.containers:
+        res = c.resources.requests if c.resources else None
+        if not res:
             continue
-        node_name = pod.spec.node_name
-        if not node_name or node_name not in allocations:
-            continue
-        for c in pod.spec.containers:
-            res = c.resources.requests
-            if not res:
-                continue
-            cpu = parse_cpu(res.get("cpu", "0"))
-            memory = parse_memory(res.get("memory", "0"))
-            storage = 0.0
-            allocations[node_name]["cpu"] += cpu
-            allocations[node_name]["memory"] += memory
-            allocations[node_name]["storage"] += storage
-    return allocations
-
-def can_schedule(allocations, req_cpu, req_mem, req_stor):
-    for node, used in allocations.items():
-        free_cpu = NODE_CAPACITY["cpu"] - used["cpu"]
-        free_mem = NODE_CAPACITY["memory"] - used["memory"]
-        free_stor = NODE_CAPACITY["storage"] - used["storage"]
-        if free_cpu >= req_cpu and free_mem >= req_mem and free_stor >= req_stor:
-            if req_cpu <= 4 and req_mem <= 10 and req_stor <= 120:
-                return True
-    return False
+        cpu += parse_cpu(res.get("cpu", "0"))
+        memory += parse_memory(res.get("memory", "0"))
+    return cpu, memory
+
+def is_control_plane(node) -> bool:
+    labels = node.metadata.labels or {}
+    return (
+        "node-role.kubernetes.io/control-plane" in labels
+        or "node-role.kubernetes.io/master" in labels
+    )
+
+def node_allocatable(node) -> tuple:
+    """
+    读取节点 status.allocatable，返回 (cpu 核, memory GiB, storage GiB)，
+    缺失的维度回退到 NODE_CAPACITY
+    """
+    alloc = (node.status.allocatable if node.status else None) or {}
+    cpu = parse_cpu(alloc["cpu"]) if "cpu" in alloc else NODE_CAPACITY["cpu"]
+    memory = parse_memory(alloc["memory"]) if "memory" in alloc else NODE_CAPACITY["memory"]
+    storage = (
+        parse_storage(alloc["ephemeral-storage"])
+        if "ephemeral-storage" in alloc else NODE_CAPACITY["storage"]
+    )
+    return cpu, memory, storage
+
+class NodeFitTable:
+    """
+    某一时刻可调度节点的资源快照，按行存放 (cpu, memory, storage)，
+    适配判断和 best-fit 选择都是一次向量化计算
+    """
+
+    def __init__(self, names, capacity, free):
+        self.names = names
+        self.capacity = capacity
+        self.free = free
+
+    def fit_mask(self, req_cpu, req_mem, req_stor):
+        req = np.array((req_cpu, req_mem, req_stor))
+        return (self.free >= req).all(axis=1)
+
+    def best_fit(self, req_cpu, req_mem, req_stor) -> int:
+        """
+        返回放下请求后剩余资源（按容量归一化求和）最少的节点行号，无可用节点返回 -1
+        """
+        if not self.names:
+            return -1
+        req = np.array((req_cpu, req_mem, req_stor))
+        mask = (self.free >= req).all(axis=1)
+        if not mask.any():
+            return -1
+        leftover = ((self.free - req) / np.maximum(self.capacity, 1e-9)).sum(axis=1)
+        leftover[~mask] = np.inf
+        return int(leftover.argmin())
+
+    def allocate(self, row, req_cpu, req_mem, req_stor):
+        self.free[row] -= (req_cpu, req_mem, req_stor)
+
+class IndexNotSynced(Exception):
+    """节点资源索引在限定时间内未完成首次同步"""
+
+class NodeAllocationIndex:
+    """
+    基于 node / pod 的 list + watch 增量维护各节点容量与已申请资源，
+    数据按节点行号存放在 numpy 数组中，validate 时只需拷贝一次数组快照
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}                        # node -> 行号
+        self._names = []
+        self._capacity = np.zeros((0, 3))      # allocatable (cpu, memory, storage)
+        self._used = np.zeros((0, 3))          # 已申请 (cpu, memory, storage)
+        self._eligible = np.zeros(0, dtype=bool)  # 存在且非控制平面
+        self._pods = {}                        # pod key -> (node, cpu, memory)
+        self._informers = None
+        self._start_lock = threading.Lock()     # 串行化 start；不能复用 _lock，注册处理器时会回放事件
+
+    def start(self):
+        with self._start_lock:
+            if self._informers is not None:
+                return
+            v1 = get_core_v1_api()
+            node_informer = shared_informer(v1.list_node)
+            pod_informer = shared_informer(v1.list_pod_for_all_namespaces)
+            # 先注册处理器再发布，避免并发的 wait_synced 看到已同步的 informer 却拿到空表
+            node_informer.add_handler(self._on_node)
+            pod_informer.add_handler(self._on_pod)
+            self._informers = (node_informer, pod_informer)
+
+    def wait_synced(self, timeout=None):
+        self.start()
+        if timeout is None:
+            return all(inf.wait_synced() for inf in self._informers)
+        deadline = time.monotonic() + timeout
+        return all(inf.wait_synced(max(0.0, deadline - time.monotonic())) for inf in self._informers)
+
+    def _require_synced(self, timeout):
+        if not self.wait_synced(timeout):
+            raise IndexNotSynced(f"节点资源索引在 {timeout}s 内未完成同步")
+
+    def snapshot(self, timeout=SYNC_TIMEOUT) -> NodeFitTable:
+        """未同步完成时抛出 IndexNotSynced"""
+        self._require_synced(timeout)
+        with self._lock:
+            rows = np.flatnonzero(self._eligible)
+            names = [self._names[i] for i in rows]
+            capacity = self._capacity[rows]
+            free = capacity - self._used[rows]
+        return NodeFitTable(names, capacity, free)
+
+    def allocations(self, timeout=SYNC_TIMEOUT):
+        self._require_synced(timeout)
+        with self._lock:
+            return {
+                self._names[i]: dict(zip(("cpu", "memory", "storage"), self._used[i].tolist()))
+                for i in np.flatnonzero(self._eligible)
+            }
+
+    def _row(self, node_name) -> int:
+        row = self._rows.get(node_name)
+        if row is not None:
+            return row
+        row = len(self._names)
+        if row == len(self._eligible):
+            size = max(16, row * 2)
+            self._capacity = np.resize(self._capacity, (size, 3))
+            self._used = np.resize(self._used, (size, 3))
+            self._eligible = np.resize(self._eligible, size)
+            self._capacity[row:] = 0.0
+            self._used[row:] = 0.0
+            self._eligible[row:] = False
+        self._rows[node_name] = row
+        self._names.append(node_name)
+        return row
+
+    def _on_node(self, event_type, node, old):
+        with self._lock:
+            row = self._row(node.metadata.name)
+            if event_type == "DELETED":
+                self._eligible[row] = False
+                return
+            self._capacity[row] = node_allocatable(node)
+            self._eligible[row] = not is_control_plane(node)
+
+    def _on_pod(self, event_type, pod, old):
+        key = Informer.key_of(pod)
+        entry = None
+        if event_type != "DELETED" and pod.status.phase in ("Running", "Pending") and pod.spec.node_name:
+            # 先在锁外解析，解析失败时保留该 Pod 原有的记账，不让节点用量悄悄变少
+            try:
+                cpu, memory = pod_requests(pod)
+            except ValueError as e:
+                logging.warning(f"忽略 Pod {key} 的资源变更: {e}")
+                return
+            entry = (pod.spec.node_name, cpu, memory)
+        with self._lock:
+            prev = self._pods.pop(key, None)
+            if prev:
+                self._used[self._row(prev[0])] -= (prev[1], prev[2], 0.0)
+            if entry:
+                self._pods[key] = entry
+                self._used[self._row(entry[0])] += (entry[1], entry[2], 0.0)
+
+node_index = NodeAllocationIndex()
+
+def get_node_allocations():
+    return node_index.allocations()
+
+def within_request_limit(req_cpu, req_mem, req_stor) -> bool:
+    return req_cpu <= 4 and req_mem <= 10 and req_stor <= 120
+
+def can_schedule(table, req_cpu, req_mem, req_stor, best_fit=False):
+    """
+    判断快照中是否有节点能放下请求；best_fit=True 时返回剩余资源最少的节点名（无则 None）
+    """
+    if not within_request_limit(req_cpu, req_mem, req_stor):
+        return None if best_fit else False
+    if best_fit:
+        row = table.best_fit(req_cpu, req_mem, req_stor)
+        return table.names[row] if row >= 0 else None
+    return bool(table.fit_mask(req_cpu, req_mem, req_stor).any())
+
+def spec_requests(pod_spec: dict) -> tuple:
+    """
+    汇总 AdmissionReview 中 Pod spec 的容器 requests，返回 (cpu 核, memory GiB)
+    """
+    total_cpu = 0.0
+    total_mem = 0.0
+    for c in pod_spec.get("containers", []):
+        reqs = c.get("resources", {}).get("requests", {})
+        total_cpu += parse_cpu(reqs.get("cpu", "0"))
+        total_mem += parse_memory(reqs.get("memory", "0"))
+    return total_cpu, total_mem
 
 class AdmissionReview(BaseModel):
     request: dict
 
+class ValidateBatchRequest(BaseModel):
+    pods: List[dict]
+
+def denied_review(uid, code: int, message: str) -> dict:
+    return {
+        "apiVersion": "admission.k8s.io/v1",
+        "kind": "AdmissionReview",
+        "response": {"uid": uid, "allowed": False, "status": {"code": code, "message": message}},
+    }
+
 @router.post("/validate")
-async def validate(request: Request):
-    body = await request.json()
-    admission = AdmissionReview(**body)
+def validate(admission: AdmissionReview):
+    # 同步路由在线程池中执行，等待索引同步不会阻塞事件循环
     uid = admission.request.get("uid")
     pod_spec = admission.request.get("object", {}).get("spec", {})
-    containers = pod_spec.get("containers", [])
-    total_cpu = 0.0
-    total_mem = 0.0
+    try:
+        total_cpu, total_mem = spec_requests(pod_spec)
+    except ValueError as e:
+        return denied_review(uid, 400, f"资源请求格式错误: {e}")
     total_stor = 0.0
-    for c in containers:
-        reqs = c.get("resources", {}).get("requests", {})
-        total_cpu += parse_cpu(reqs.get("cpu", "0"))
-        total_mem += parse_memory(reqs.get("memory", "0"))
-    allocations = get_node_allocations()
-    allowed = can_schedule(allocations, total_cpu, total_mem, total_stor)
-    response = {
+    try:
+        table = node_index.snapshot()
+    except IndexNotSynced as e:
+        # 快速拒绝，不等到 apiserver 侧的 webhook 超时
+        return denied_review(uid, 503, str(e))
+    if not can_schedule(table, total_cpu, total_mem, total_stor):
+        return denied_review(uid, 403, (
+            f"资源不足，集群所有节点均无法满足请求 "
+            f"cpu={total_cpu} core, memory={total_mem} GiB"
+        ))
+    return {
         "apiVersion": "admission.k8s.io/v1",
         "kind": "AdmissionReview",
         "response": {
             "uid": uid,
-            "allowed": allowed,
+            "allowed": True,
         }
     }
-    if not allowed:
-        response["response"]["status"] = {
-            "code": 403,
-            "message": (
-                f"资源不足，集群所有节点均无法满足请求 "
-                f"cpu={total_cpu} core, memory={total_mem} GiB"
-            )
-        }
-    return response
+
+@router.post("/validate_batch")
+def validate_batch(req: ValidateBatchRequest):
+    """
+    基于同一份资源快照按顺序模拟放置一组 Pod spec，
+    每个通过的请求会先扣减所选节点的剩余资源，再评估下一个
+    """
+    try:
+        table = node_index.snapshot()
+    except IndexNotSynced as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    results = []
+    for i, pod_spec in enumerate(req.pods):
+        try:
+            total_cpu, total_mem = spec_requests(pod_spec)
+        except ValueError as e:
+            # 单个 spec 格式错误只拒绝该项，不影响其余 Pod 的放置
+            results.append({"index": i, "allowed": False, "node": None, "message": f"资源请求格式错误: {e}"})
+            continue
+        total_stor = 0.0
+        row = -1
+        if within_request_limit(total_cpu, total_mem, total_stor):
+            row = table.best_fit(total_cpu, total_mem, total_stor)
+        if row >= 0:
+            table.allocate(row, total_cpu, total_mem, total_stor)
+            results.append({"index": i, "allowed": True, "node": table.names[row]})
+        else:
+            results.append({
+                "index": i,
+                "allowed": False,
+                "node": None,
+                "message": (
+                    f"资源不足，集群所有节点均无法满足请求 "
+                    f"cpu={total_cpu} core, memory={total_mem} GiB"
+                ),
+            })
+    return {
+        "allowed": sum(1 for r in results if r["allowed"]),
+        "denied": sum(1 for r in results if not r["allowed"]),
+        "results": results,
+    }
@@ -0,0 +1,67 @@
+import yaml
+import threading
+from config import get_core_v1_api, get_apps_v1_api
+
+FIELD_MANAGER = "k8s-api"
+APPLY_CONTENT_TYPE = "application/apply-patch+yaml"
+
+# 优先使用 libyaml 的 C 实现
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_manifests(yaml_text):
+    """解析多文档 YAML，跳过空文档"""
+    return [doc for doc in yaml.load_all(yaml_text, Loader=_YAML_LOADER) if doc]
+
+
+class ServerSideApplier:
+    """
+    进程内的 server-side apply：对每个清单直接发送 apply PATCH，
+    替代写临时文件再调用 kubectl apply（省去进程启动、kubeconfig 解析与 discovery）。
+    只支持模板中用到的资源类型，按 (apiVersion, kind) 映射到对应的 patch 接口
+    """
+
+    def __init__(self, field_manager=FIELD_MANAGER, force=True):
+        self.field_manager = field_manager
+        self.force = force
+        self._lock = threading.Lock()
+        self._patchers = None
+
+    def apply(self, manifest):
+        """apply 单个清单，返回 apiserver 返回的对象"""
+        key = (manifest.get("apiVersion"), manifest.get("kind"))
+        patch = self._get_patchers().get(key)
+        if patch is None:
+            raise ValueError(f"不支持 apply 的资源类型: {key[0]} {key[1]}")
+        meta = manifest.get("metadata") or {}
+        kwargs = dict(
+            name=meta["name"],
+            body=manifest,
+            field_manager=self.field_manager,
+            force=self.force,
+            _content_type=APPLY_CONTENT_TYPE,
+        )
+        if meta.get("namespace"):
+            kwargs["namespace"] = meta["namespace"]
+        return patch(**kwargs)
+
+    def apply_yaml(self, yaml_text):
+        """依次 apply 多文档 YAML 中的每个清单，返回 [(kind, 对象)]"""
+        return [(m["kind"], self.apply(m)) for m in parse_manifests(yaml_text)]
+
+    def _get_patchers(self):
+        with self._lock:
+            if self._patchers is None:
+                core_v1 = get_core_v1_api()
+                apps_v1 = get_apps_v1_api()
+                self._patchers = {
+                    ("v1", "Namespace"): core_v1.patch_namespace,
+                    ("v1", "Service"): core_v1.patch_namespaced_service,
+                    ("v1", "ConfigMap"): core_v1.patch_namespaced_config_map,
+                    ("apps/v1", "Deployment"): apps_v1.patch_namespaced_deployment,
+                    ("apps/v1", "StatefulSet"): apps_v1.patch_namespaced_stateful_set,
+                }
+            return self._patchers
+
+
+applier = ServerSideApplier()
@@ -1,31 +1,124 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List
-from ..models import BatchDeploymentSpec
+from fastapi import APIRouter, HTTPException, status, Query, Response, Body
+from typing import Any, List
+from models import BatchDeploymentSpec, DeploymentScale
 from kubernetes.client import ApiException
-from ..config import load_k8s_config
+from config import env_list, get_apps_v1_api
+from .pagination import list_page
+from .informer import shared_informer
+from .bulk import BULK_MAX_ITEMS, parse_items, submit_bulk
 
-# Initialize k8s client
-_, _, apps_v1 = load_k8s_config()
 router = APIRouter(prefix="/v2/batch_deployments", tags=["batch_deployments"])
 
+# Namespaces whose deployments are kept in a watch-backed cache; others are read directly.
+# Override with K8S_API_DEPLOYMENT_CACHE_NAMESPACES (comma-separated)
+DEPLOYMENT_CACHE_NAMESPACES = env_list("K8S_API_DEPLOYMENT_CACHE_NAMESPACES", ("default",))
+SYNC_TIMEOUT = 5   # seconds to wait for the deployment watch before reading from the API
+PATCH_CONTENT_TYPE = "application/strategic-merge-patch+json"
+
+def live_deployment(namespace: str, name: str):
+    """
+    Live Deployment, or None when it does not exist. Namespaces in DEPLOYMENT_CACHE_NAMESPACES
+    are served from a shared watch; other namespaces, or a watch that has not synced yet,
+    fall back to a read
+    """
+    if namespace in DEPLOYMENT_CACHE_NAMESPACES:
+        informer = shared_informer(get_apps_v1_api().list_namespaced_deployment, namespace=namespace)
+        if informer.wait_synced(SYNC_TIMEOUT):
+            return informer.get(f"{namespace}/{name}")
+    try:
+        return get_apps_v1_api().read_namespaced_deployment(name=name, namespace=namespace)
+    except ApiException as e:
+        if e.status == 404:
+            return None
+        raise
+
+def build_manifest(spec: BatchDeploymentSpec) -> dict:
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": spec.name, "namespace": spec.namespace},
+        "spec": {
+            "replicas": spec.replicas,
+            "selector": {"matchLabels": {"app": spec.name}},
+            "template": {"metadata": {"labels": {"app": spec.name}},
+                           "spec": {"containers": [{
+                               "name": spec.name,
+                               "image": spec.image,
+                               "env": [{"name": k, "value": v} for k, v in spec.env.items()]
+                           }]}}
+        }
+    }
+
+def deployment_patch(live, spec: BatchDeploymentSpec):
+    """Strategic merge patch with only the fields that differ from the live object, None if identical"""
+    patch = {}
+    if live.spec.replicas != spec.replicas:
+        patch["spec"] = {"replicas": spec.replicas}
+    containers = live.spec.template.spec.containers or []
+    current = next((c for c in containers if c.name == spec.name), None)
+    env = [{"name": k, "value": v} for k, v in spec.env.items()]
+    if current is None or len(containers) > 1:
+        # containers merge by name: a renamed or extra container would survive a merge,
+        # so replace the whole list with the one container this API manages
+        container = {"name": spec.name, "image": spec.image, "env": env}
+        patch.setdefault("spec", {})["template"] = {"spec": {"containers": [container, {"$patch": "replace"}]}}
+        return patch
+    container = {}
+    if current.image != spec.image:
+        container["image"] = spec.image
+    if [{"name": e.name, "value": e.value} for e in current.env or []] != env:
+        # replace the whole list so removed variables are dropped too
+        container["env"] = env + [{"$patch": "replace"}]
+    if container:
+        patch.setdefault("spec", {})["template"] = {"spec": {"containers": [{"name": spec.name, **container}]}}
+    return patch or None
+
+def upsert_deployment(spec: BatchDeploymentSpec) -> str:
+    """Create the deployment or patch only what changed; returns created, patched or unchanged"""
+    live = live_deployment(spec.namespace, spec.name)
+    if live is None:
+        try:
+            get_apps_v1_api().create_namespaced_deployment(body=build_manifest(spec), namespace=spec.namespace)
+            return "created"
+        except ApiException as e:
+            if e.status != 409:
+                raise
+            # created concurrently or not yet seen by the watch
+            live = get_apps_v1_api().read_namespaced_deployment(name=spec.name, namespace=spec.namespace)
+    patch = deployment_patch(live, spec)
+    if patch is None:
+        return "unchanged"
+    get_apps_v1_api().patch_namespaced_deployment(
+        name=spec.name, namespace=spec.namespace, body=patch, _content_type=PATCH_CONTENT_TYPE
+    )
+    return "patched"
+
+def scale_deployment(item: DeploymentScale):
+    # always patch: the scale patch is idempotent and the cached replicas may be stale
+    get_apps_v1_api().patch_namespaced_deployment_scale(
+        name=item.name, namespace=item.namespace,
+        body={"spec": {"replicas": item.replicas}}, _content_type=PATCH_CONTENT_TYPE
+    )
+
 @router.get("/", response_model=List[BatchDeploymentSpec], name="v2_batch_deployments_list")
 def list_batch_deployments(
     namespace: str = Query(..., min_length=1, description="Target Kubernetes namespace")
 ):
     """List all Deployments as BatchDeployments in namespace"""
     try:
-        resp = apps_v1.list_namespaced_deployment(namespace=namespace)
+        # raw JSON, projected below instead of building V1Deployment trees
+        deployments, _ = list_page(get_apps_v1_api().list_namespaced_deployment, namespace=namespace)
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=e.reason)
     items: List[BatchDeploymentSpec] = []
-    for d in resp.items:
-        c = d.spec.template.spec.containers[0]
+    for d in deployments:
+        c = d["spec"]["template"]["spec"]["containers"][0]
         items.append(BatchDeploymentSpec(
-            name=d.metadata.name,
+            name=d["metadata"]["name"],
             namespace=namespace,
-            image=c.image,
-            replicas=d.spec.replicas,
-            env={env.name: env.value for env in (c.env or [])}
+            image=c.get("image"),
+            replicas=d["spec"].get("replicas"),
+            env={env["name"]: env.get("value") for env in (c.get("env") or [])}
         ))
     return items
 
@@ -36,7 +129,7 @@ def read_batch_deployment(
 ):
     """Read a specific BatchDeployment (Deployment)"""
     try:
-        d = apps_v1.read_namespaced_deployment(name=name, namespace=namespace)
+        d = get_apps_v1_api().read_namespaced_deployment(name=name, namespace=namespace)
     except ApiException as e:
         if e.status == 404:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="BatchDeployment not found")
@@ -52,33 +145,35 @@ def read_batch_deployment(
 
 @router.post("/", response_model=BatchDeploymentSpec, status_code=status.HTTP_201_CREATED, name="v2_batch_deployments_create")
 def create_batch_deployment(
-    spec: BatchDeploymentSpec
+    spec: BatchDeploymentSpec,
+    response: Response
 ):
-    """Create or update a BatchDeployment (Deployment)"""
-    manifest = {
-        "apiVersion": "apps/v1",
-        "kind": "Deployment",
-        "metadata": {"name": spec.name, "namespace": spec.namespace},
-        "spec": {
-            "replicas": spec.replicas,
-            "selector": {"matchLabels": {"app": spec.name}},
-            "template": {"metadata": {"labels": {"app": spec.name}},
-                           "spec": {"containers": [{
-                               "name": spec.name,
-                               "image": spec.image,
-                               "env": [{"name": k, "value": v} for k, v in spec.env.items()]
-                           }]}}
-        }
-    }
+    """
+    Create or update a BatchDeployment (Deployment). Existing deployments get a patch with only
+    the changed fields, and no call at all when nothing changed; X-Upsert-Result tells which
+    """
     try:
-        apps_v1.replace_namespaced_deployment(name=spec.name, namespace=spec.namespace, body=manifest)
+        response.headers["X-Upsert-Result"] = upsert_deployment(spec)
     except ApiException as e:
-        if e.status == 404:
-            apps_v1.create_namespaced_deployment(body=manifest, namespace=spec.namespace)
-        else:
-            raise HTTPException(status_code=e.status, detail=e.reason)
+        raise HTTPException(status_code=e.status, detail=e.reason)
     return spec
 
+@router.post("/scale", name="v2_batch_deployments_scale")
+def scale_batch_deployments(items: List[Any] = Body(..., description="List of DeploymentScale")):
+    """
+    Set replicas on many deployments concurrently; invalid items are reported as 422
+    in the results
+    """
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No deployments given")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {BULK_MAX_ITEMS} deployments per request")
+    entries = [
+        (name, item) if isinstance(item, Exception) else (f"{item.namespace}/{item.name}", item)
+        for name, item in parse_items(DeploymentScale, items)
+    ]
+    return submit_bulk(entries, scale_deployment, ok_key="scaled")
+
 @router.delete("/{namespace}/{name}", status_code=status.HTTP_204_NO_CONTENT, name="v2_batch_deployments_delete")
 def delete_batch_deployment(
     namespace: str,
@@ -86,7 +181,7 @@ def delete_batch_deployment(
 ):
     """Delete a BatchDeployment (Deployment)"""
     try:
-        apps_v1.delete_namespaced_deployment(name=name, namespace=namespace, propagation_policy='Foreground')
+        get_apps_v1_api().delete_namespaced_deployment(name=name, namespace=namespace, propagation_policy='Foreground')
     except ApiException as e:
         if e.status == 404:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="BatchDeployment not found")
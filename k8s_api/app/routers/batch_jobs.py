@@ -1,52 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Form
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Form, Query, Response, Body
+from fastapi.responses import StreamingResponse
+from typing import Any, List, Optional
 from kubernetes.client import ApiException
-from ..models import BatchJob
-from ..config import load_k8s_config
+from models import BatchJob, BatchJobCreate
+from config import get_batch_v1_api
+from .pagination import STREAM_PAGE_SIZE, list_page, iter_pages, ndjson_lines
+from .job_cache import job_cache
+from .bulk import BULK_MAX_ITEMS, parse_items, submit_bulk
 
-# Initialize k8s client
-_, batch_v1, _ = load_k8s_config()
 router = APIRouter(prefix="/v2/batch_jobs", tags=["batch_jobs"])
 
-@router.get("/{namespace}", response_model=List[BatchJob], name="v2_batch_jobs_list")
-def list_batch_jobs(namespace: str):
-    """List all distributed batch jobs in a namespace"""
-    try:
-        resp = batch_v1.list_namespaced_job(namespace=namespace)
-    except ApiException as e:
-        raise HTTPException(status_code=e.status, detail=e.reason)
-    jobs = []
-    for j in resp.items:
-        # extract parameters stored in annotations
-        meta = j.metadata.annotations or {}
-        spec = j.spec.template.spec
-        jobs.append(
-            BatchJob(
-                name=j.metadata.name,
-                namespace=namespace,
-                queue=meta.get('queue',''),
-                image=spec.containers[0].image,
-                command=spec.containers[0].command,
-                env={e.name: e.value for e in (spec.containers[0].env or [])},
-                cpu=spec.containers[0].resources.limits.get('cpu') if spec.containers[0].resources and spec.containers[0].resources.limits else None,
-                memory=spec.containers[0].resources.limits.get('memory') if spec.containers[0].resources and spec.containers[0].resources.limits else None
-            )
-        )
-    return jobs
-
-@router.get("/{namespace}/{name}", response_model=BatchJob, name="v2_batch_jobs_read")
-def read_batch_job(namespace: str, name: str):
-    """Get a specific distributed batch job"""
-    try:
-        j = batch_v1.read_namespaced_job(name=name, namespace=namespace)
-    except ApiException as e:
-        if e.status == 404:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="BatchJob not found")
-        raise HTTPException(status_code=e.status, detail=e.reason)
+def to_batch_job(j, namespace: str) -> BatchJob:
+    # extract parameters stored in annotations
     meta = j.metadata.annotations or {}
     spec = j.spec.template.spec
     return BatchJob(
-        name=name,
+        name=j.metadata.name,
         namespace=namespace,
         queue=meta.get('queue',''),
         image=spec.containers[0].image,
@@ -56,66 +25,170 @@ def read_batch_job(namespace: str, name: str):
         memory=spec.containers[0].resources.limits.get('memory') if spec.containers[0].resources and spec.containers[0].resources.limits else None
     )
 
-@router.post("/{namespace}/{name}", status_code=status.HTTP_201_CREATED, name="v2_batch_jobs_create")
-def create_batch_job(
+def filter_by_queue(jobs: List[dict], queue: Optional[str]):
+    # queue is stored as an annotation, which the apiserver cannot select on
+    if queue is None:
+        return jobs
+    return [j for j in jobs if (j["metadata"].get("annotations") or {}).get('queue') == queue]
+
+def batch_job_from_dict(d: dict, namespace: str) -> BatchJob:
+    # projection of the raw list JSON, only the fields BatchJob needs
+    meta = d["metadata"]
+    container = d["spec"]["template"]["spec"]["containers"][0]
+    limits = (container.get("resources") or {}).get("limits") or {}
+    return BatchJob(
+        name=meta["name"],
+        namespace=namespace,
+        queue=(meta.get("annotations") or {}).get('queue',''),
+        image=container.get("image"),
+        command=container.get("command"),
+        env={e["name"]: e.get("value") for e in (container.get("env") or [])},
+        cpu=limits.get('cpu'),
+        memory=limits.get('memory')
+    )
+
+@router.get("/{namespace}", response_model=List[BatchJob], name="v2_batch_jobs_list")
+def list_batch_jobs(
+    namespace: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, description="Page size, all jobs when omitted"),
+    continue_: Optional[str] = Query(None, alias="continue", description="Token from the X-Continue header of the previous page"),
+    stream: bool = Query(False, description="Stream all jobs page by page as NDJSON"),
+    queue: Optional[str] = Query(None, description="Only jobs whose queue annotation matches"),
+    consistent: bool = Query(False, description="Bypass the local job cache and read from the apiserver"),
+):
+    """
+    List distributed batch jobs in a namespace. Served from the shared job cache by default,
+    paged via limit/continue or streamed as NDJSON straight from the apiserver
+    """
+    if not (consistent or stream or limit or continue_):
+        cached = job_cache.list(namespace, queue=queue, source="annotation")
+        if cached is not None:
+            return [to_batch_job(j, namespace) for j in cached]
+
+    convert = lambda d: batch_job_from_dict(d, namespace)
+
+    if stream:
+        pages = (
+            (filter_by_queue(items, queue), token)
+            for items, token in iter_pages(get_batch_v1_api().list_namespaced_job, limit or STREAM_PAGE_SIZE, continue_, namespace=namespace)
+        )
+        try:
+            first_page = next(pages)
+        except ApiException as e:
+            raise HTTPException(status_code=e.status, detail=e.reason)
+        return StreamingResponse(ndjson_lines(pages, first_page, convert), media_type="application/x-ndjson")
+    try:
+        items, continue_token = list_page(get_batch_v1_api().list_namespaced_job, limit, continue_, namespace=namespace)
+    except ApiException as e:
+        raise HTTPException(status_code=e.status, detail=e.reason)
+    if continue_token:
+        response.headers["X-Continue"] = continue_token
+    return [convert(j) for j in filter_by_queue(items, queue)]
+
+@router.get("/{namespace}/{name}", response_model=BatchJob, name="v2_batch_jobs_read")
+def read_batch_job(
     namespace: str,
     name: str,
-    min_available: int = Form(..., description="Pod minimum availability"),
-    command: str = Form(..., description="Command to run in container"),
-    image: str = Form(..., description="Container image to use"),
-    task_name: str = Form(..., description="Task name"),
-    cpu: str = Form("1", description="CPU requests"),
-    mem: str = Form("1Gi", description="Memory requests"),
-    task_replicas: int = Form(1, description="Number of parallel pods"),
-    queue: Optional[str] = Form(None, description="Queue name"),
-    node_selector: Optional[str] = Form(None, description="Node selector label"),
-    dataset: Optional[str] = Form(None, description="Dataset volume name"),
-    mount: Optional[str] = Form(None, description="Mount path inside container")
+    consistent: bool = Query(False, description="Bypass the local job cache and read from the apiserver"),
 ):
-    """Create a distributed batch job as a K8s Job with parallelism"""
-    # build job manifest
+    """Get a specific distributed batch job"""
+    j = None if consistent else job_cache.get(namespace, name)
+    if j is not None:
+        return to_batch_job(j, namespace)
+    try:
+        j = get_batch_v1_api().read_namespaced_job(name=name, namespace=namespace)
+    except ApiException as e:
+        if e.status == 404:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="BatchJob not found")
+        raise HTTPException(status_code=e.status, detail=e.reason)
+    return to_batch_job(j, namespace)
+
+def build_job_manifest(namespace: str, spec: BatchJobCreate) -> dict:
+    """Build the Job manifest shared by single and bulk creation"""
     manifest = {
         "apiVersion": "batch/v1",
         "kind": "Job",
         "metadata": {
-            "name": name,
+            "name": spec.name,
             "namespace": namespace,
             "annotations": {
-                "queue": queue or '',
-                "task_name": task_name
+                "queue": spec.queue or '',
+                "task_name": spec.task_name
             }
         },
         "spec": {
-            "parallelism": task_replicas,
-            "completions": task_replicas,
+            "parallelism": spec.task_replicas,
+            "completions": spec.task_replicas,
             "template": {
                 "spec": {
-                    "minReadySeconds": min_available,
+                    "minReadySeconds": spec.min_available,
                     "containers": [{
-                        "name": name,
-                        "image": image,
-                        "command": ["/bin/sh", "-c", command],
-                        "resources": {"requests": {"cpu": cpu, "memory": mem}},
-                        **({"volumeMounts": [{"name": dataset, "mountPath": mount}]} if dataset and mount else {})
+                        "name": spec.name,
+                        "image": spec.image,
+                        "command": ["/bin/sh", "-c", spec.command],
+                        "resources": {"requests": {"cpu": spec.cpu, "memory": spec.mem}},
+                        **({"volumeMounts": [{"name": spec.dataset, "mountPath": spec.mount}]} if spec.dataset and spec.mount else {})
                     }],
-                    **({"nodeSelector": {key: "" for key in [node_selector]}} if node_selector else {}),
-                    **({"volumes": [{"name": dataset, "persistentVolumeClaim": {"claimName": dataset}}]} if dataset else {}),
+                    **({"nodeSelector": {key: "" for key in [spec.node_selector]}} if spec.node_selector else {}),
+                    **({"volumes": [{"name": spec.dataset, "persistentVolumeClaim": {"claimName": spec.dataset}}]} if spec.dataset else {}),
                     "restartPolicy": "OnFailure"
                 }
             }
         }
     }
+    return manifest
+
+@router.post("/{namespace}/{name}", status_code=status.HTTP_201_CREATED, name="v2_batch_jobs_create")
+def create_batch_job(
+    namespace: str,
+    name: str,
+    min_available: int = Form(..., description="Pod minimum availability"),
+    command: str = Form(..., description="Command to run in container"),
+    image: str = Form(..., description="Container image to use"),
+    task_name: str = Form(..., description="Task name"),
+    cpu: str = Form("1", description="CPU requests"),
+    mem: str = Form("1Gi", description="Memory requests"),
+    task_replicas: int = Form(1, description="Number of parallel pods"),
+    queue: Optional[str] = Form(None, description="Queue name"),
+    node_selector: Optional[str] = Form(None, description="Node selector label"),
+    dataset: Optional[str] = Form(None, description="Dataset volume name"),
+    mount: Optional[str] = Form(None, description="Mount path inside container")
+):
+    """Create a distributed batch job as a K8s Job with parallelism"""
+    manifest = build_job_manifest(namespace, BatchJobCreate(
+        name=name, min_available=min_available, command=command, image=image, task_name=task_name,
+        cpu=cpu, mem=mem, task_replicas=task_replicas, queue=queue, node_selector=node_selector,
+        dataset=dataset, mount=mount
+    ))
     try:
-        batch_v1.create_namespaced_job(body=manifest, namespace=namespace)
+        get_batch_v1_api().create_namespaced_job(body=manifest, namespace=namespace)
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=e.reason)
     return {"name": name, "namespace": namespace, "status": "Created"}
 
+@router.post("/{namespace}", name="v2_batch_jobs_bulk_create")
+def bulk_create_batch_jobs(namespace: str, specs: List[Any] = Body(..., description="List of BatchJobCreate")):
+    """
+    Create many batch jobs from a JSON array. Each item is validated on its own and invalid
+    ones are reported as 422 in the results; valid manifests are built up front and submitted
+    concurrently, and the response reports the outcome of every item
+    """
+    if not specs:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No jobs given")
+    if len(specs) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {BULK_MAX_ITEMS} jobs per request")
+    entries = [
+        (name, spec if isinstance(spec, Exception) else build_job_manifest(namespace, spec))
+        for name, spec in parse_items(BatchJobCreate, specs)
+    ]
+    return submit_bulk(entries, lambda manifest: get_batch_v1_api().create_namespaced_job(body=manifest, namespace=namespace))
+
 @router.delete("/{namespace}/{name}", status_code=status.HTTP_204_NO_CONTENT, name="v2_batch_jobs_delete")
 def delete_batch_job(namespace: str, name: str):
     """Delete a distributed batch job"""
     try:
-        batch_v1.delete_namespaced_job(name=name, namespace=namespace, propagation_policy='Foreground')
+        get_batch_v1_api().delete_namespaced_job(name=name, namespace=namespace, propagation_policy='Foreground')
     except ApiException as e:
         if e.status == 404:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="BatchJob not found")
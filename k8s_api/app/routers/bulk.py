@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import ValidationError
+from kubernetes.client.rest import ApiException
+
+BULK_CONCURRENCY = 16    # 批量创建时同时向 apiserver 提交的请求数
+BULK_MAX_ITEMS = 1000    # 单次批量请求允许的最大条数
+
+bulk_executor = ThreadPoolExecutor(max_workers=BULK_CONCURRENCY, thread_name_prefix="bulk")
+
+
+def parse_items(model, items):
+    """
+    逐项校验原始请求体，返回 [(name, 模型实例或异常)]；
+    单项校验失败只影响该项（submit_bulk 中返回 422），不拒绝整个请求
+    """
+    parsed = []
+    for item in items:
+        name = item.get("name") if isinstance(item, dict) else None
+        if not isinstance(item, dict):
+            parsed.append((name, ValueError("每一项都必须是 JSON 对象")))
+            continue
+        try:
+            parsed.append((name, model(**item)))
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            parsed.append((name, ValueError(message)))
+    return parsed
+
+
+def submit_bulk(entries, create, ok_key="created"):
+    """
+    并发提交一批已构造好的对象，逐项返回结果，单项失败（含非 ApiException 的错误，记为 500）不影响其他项。
+    entries 为 [(name, body)]，构造失败的项 body 为对应的异常；
+    create(body) 为阻塞的调用，返回 dict 时合并到该项结果中。
+    返回 {ok_key, "failed", "results": [{"index", "name", ok_key, "status"?, "message"?}]}
+    """
+    seen = set()
+
+    def run(index, name, body):
+        result = {"index": index, "name": name, ok_key: False}
+        if isinstance(body, Exception):
+            result.update(status=422, message=str(body))
+            return result
+        try:
+            extra = create(body)
+        except ApiException as e:
+            result.update(status=e.status, message=e.reason)
+            return result
+        except Exception as e:
+            # 连接失败、超时等非 API 错误同样只记在该项上，不影响已提交的其他项
+            result.update(status=500, message=str(e))
+            return result
+        result[ok_key] = True
+        if isinstance(extra, dict):
+            result.update(extra)
+        return result
+
+    futures = []
+    for index, (name, body) in enumerate(entries):
+        if isinstance(body, Exception):
+            # 无效项不参与重名检查（可能没有名称），直接返回 422
+            futures.append(run(index, name, body))
+            continue
+        if name in seen:
+            futures.append({"index": index, "name": name, ok_key: False,
+                            "status": 409, "message": f"名称 {name} 在本次请求中重复"})
+            continue
+        seen.add(name)
+        futures.append(bulk_executor.submit(run, index, name, body))
+    results = [f if isinstance(f, dict) else f.result() for f in futures]
+    succeeded = sum(1 for r in results if r[ok_key])
+    return {ok_key: succeeded, "failed": len(results) - succeeded, "results": results}
@@ -1,13 +1,13 @@
 import os
-import tempfile
-import subprocess
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 from jinja2 import Environment, FileSystemLoader
 from kubernetes.client.rest import ApiException
-from kubernetes.client import V1Namespace, V1ObjectMeta
-from config import core_v1_api
 from kubernetes import client
+from config import get_apps_v1_api
+from .apply import applier
+from .namespace_cache import namespace_cache
+from .readiness import WAIT_TIMEOUT, MAX_WAIT_TIMEOUT, stateful_set_ready, wait_ready
 
 router = APIRouter(prefix="/v1alpha1", tags=["Databases"])
 
@@ -50,50 +50,64 @@ class DbDeploySpec(BaseModel):
             }
         }
 
-# Jinja2 环境
-env = Environment(loader=FileSystemLoader("templates"))
+# Jinja2 环境：模板目录相对于本文件，启动时编译一次，不再逐次检查文件变更
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), auto_reload=False)
+statefulset_template = env.get_template("statefulset.yaml.j2")
 
 @router.post("/namespaces/{namespace}/databases", response_model=dict)
-def create_db(namespace: str, spec: DbDeploySpec):
+def create_db(
+    namespace: str,
+    spec: DbDeploySpec,
+    wait: bool = Query(False, description="等待 StatefulSet 全部副本就绪后再返回"),
+    timeout: int = Query(WAIT_TIMEOUT, ge=1, le=MAX_WAIT_TIMEOUT, description="wait=true 时的最长等待时间（秒）"),
+):
     spec.namespace = namespace
 
-    # 检查 namespace 是否存在，不存在则创建
+    # 已知命名空间只查本地集合，不存在时才创建
     try:
-        core_v1_api.read_namespace(namespace)
+        namespace_cache.ensure(namespace)
     except ApiException as e:
-        if e.status == 404:
-            ns_body = V1Namespace(metadata=V1ObjectMeta(name=namespace))
-            core_v1_api.create_namespace(ns_body)
-        else:
-            raise HTTPException(500, f"read namespace failed: {e}")
+        raise HTTPException(500, f"create namespace failed: {e}")
 
-    tmpl = env.get_template("statefulset.yaml.j2")
-    yaml_text = tmpl.render(**spec.dict())
-
-    # 写临时文件并应用
-    with tempfile.NamedTemporaryFile("w+", suffix=".yaml", delete=False) as f:
-        f.write(yaml_text)
-        path = f.name
+    yaml_text = statefulset_template.render(**spec.dict())
 
+    # 进程内 server-side apply，直接从返回的 Service 中取 nodePort
     try:
-        subprocess.run(["kubectl", "apply", "-f", path],
-                       check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(500, f"kubectl apply failed: {e.stderr}")
+        applied = applier.apply_yaml(yaml_text)
+    except ApiException as e:
+        raise HTTPException(500, f"server-side apply failed: {e}")
+    except ValueError as e:
+        raise HTTPException(500, f"invalid manifest: {e}")
 
-    # 查询 Service 的 nodePort
+    node_port = None
+    workload = None
+    for kind, obj in applied:
+        if kind == "Service" and obj.metadata.name == f"{spec.name}-svc":
+            node_port = obj.spec.ports[0].node_port
+        elif kind == "StatefulSet":
+            workload = obj
+
+    result = {"service": f"{spec.name}-svc", "nodePort": node_port}
+    if not wait or workload is None:
+        return result
+
+    # watch StatefulSet 直到副本就绪或超时，客户端无需再轮询
     try:
-        svc = core_v1_api.read_namespaced_service(f"{spec.name}-svc", namespace)
-        node_port = svc.spec.ports[0].node_port
+        ready, workload = wait_ready(get_apps_v1_api().list_namespaced_stateful_set, workload, stateful_set_ready, timeout)
     except ApiException as e:
-        raise HTTPException(500, f"read service failed: {e}")
-
-    return {"service": f"{spec.name}-svc", "nodePort": node_port}
+        raise HTTPException(500, f"watch StatefulSet failed: {e}")
+    result.update(
+        ready=ready,
+        replicas=workload.spec.replicas,
+        ready_replicas=workload.status.ready_replicas if workload.status else None,
+    )
+    return result
 
 @router.get("/namespaces/{namespace}/databases/{name}", response_model=dict)
 def get_database(namespace: str, name: str):
     try:
-        apps_v1 = client.AppsV1Api()
+        apps_v1 = get_apps_v1_api()
         sts = apps_v1.read_namespaced_stateful_set(name=name, namespace=namespace)
         return {
             "name": sts.metadata.name,
@@ -1,5 +1,10 @@
-import pymysql
+import os
+import json
+import time
 import logging
+import threading
+import pymysql
+from .mysql_pool import MySQLConnectionPool
 
 MYSQL_CONFIG = {
     "host": "10.64.243.119",
@@ -10,13 +15,261 @@ MYSQL_CONFIG = {
     "charset": "utf8mb4"
 }
 
+BATCH_SIZE = 500  # 单条批量语句涉及的最大设备数
+
+# 开启后 test_bench / test_bench_task 的写操作先进入内存队列，由后台线程批量落库；
+# 通过环境变量 K8S_API_WRITE_BEHIND=1 开启
+WRITE_BEHIND = os.environ.get("K8S_API_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+WRITE_BEHIND_INTERVAL = 1.0  # 最长刷新间隔（秒）
+WRITE_BEHIND_MAX_RETRIES = 5  # 数据库可用但批量语句连续失败的次数上限，超过后改为逐条写入并丢弃失败的记录
+WRITE_BEHIND_MAX_BACKOFF = 60  # 重试退避的最长间隔（秒）
+WRITE_BEHIND_DEAD_LETTER = "/var/tmp/k8s_api_write_behind_failed.jsonl"  # 被丢弃记录的落盘位置
+
+USAGE_COLUMNS = ("user", "usage_info", "environment_purpose", "connect_info")
+VERSION_COLUMNS = ("soc_version", "mcu_version", "integration_version")
+STATUS_COLUMNS = ("bench_status",)
+
+db_pool = MySQLConnectionPool(
+    size=8,            # 常驻连接数
+    max_overflow=8,    # 繁忙时额外允许的临时连接数
+    max_lifetime=3600, # 连接最长存活时间（秒）
+    wait_timeout=10,   # 等待空闲连接的最长时间（秒）
+    **MYSQL_CONFIG
+)
+
 def get_conn():
-    return pymysql.connect(**MYSQL_CONFIG)
+    """
+    从连接池借出连接，close() 即归还
+    """
+    return db_pool.connect()
+
+def db_unavailable(e) -> bool:
+    """
+    连接失败、断线、锁等待超时等与具体记录无关的错误（含连接池等待超时），
+    这类错误重试即可，不应当作记录本身有问题
+    """
+    return isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError, OSError))
+
+def _chunks(items, size=BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _bulk_update_by_name(cursor, columns, rows):
+    """
+    用一条 UPDATE ... SET col = CASE name WHEN ... END WHERE name IN (...) 按设备名批量更新，
+    rows 为 {设备名: (与 columns 对应的取值)}
+    """
+    for chunk in _chunks(list(rows.items())):
+        sets, params = [], []
+        for i, col in enumerate(columns):
+            sets.append(f"{col} = CASE name " + "WHEN %s THEN %s " * len(chunk) + "END")
+            for name, values in chunk:
+                params.extend((name, values[i]))
+        names = [name for name, _ in chunk]
+        params.extend(names)
+        placeholders = ",".join(["%s"] * len(names))
+        cursor.execute(
+            f"UPDATE test_bench SET {', '.join(sets)} WHERE name IN ({placeholders})",
+            params,
+        )
+
+class WriteBehindQueue:
+    """
+    test_bench / test_bench_task 的写缓冲：
+    同一设备同一类更新只保留最后一次，后台线程按间隔合并成多行语句在一个事务中提交；
+    数据库不可用时按指数退避一直重试；数据库可用但语句失败时，连续 max_retries 次后逐条写入，
+    仍失败的记录记日志并追加到 dead_letter_path，不再阻塞后续写入
+    """
+
+    def __init__(self, interval, max_retries=WRITE_BEHIND_MAX_RETRIES,
+                 max_backoff=WRITE_BEHIND_MAX_BACKOFF, dead_letter_path=WRITE_BEHIND_DEAD_LETTER):
+        self.interval = interval
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.dead_letter_path = dead_letter_path
+        self._failures = 0     # 连续失败次数，决定退避间隔
+        self._rejections = 0   # 数据库可用但语句执行失败的连续次数
+        self._retry_at = 0.0   # 退避结束的时间（monotonic）
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._updates = {}   # columns -> {设备名: values}
+        self._inserts = []   # test_bench_task 新记录
+        self._finishes = {}  # (device_name, task_name, start_time) -> (end_time, result)
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._stopped.is_set()
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台线程，并同步刷新剩余记录；写不进去的记录逐条重试后落到 dead letter"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush(final=True)
+
+    def put_update(self, columns, device_name, values):
+        with self._lock:
+            self._updates.setdefault(columns, {})[device_name] = values
+
+    def put_insert(self, row):
+        with self._lock:
+            self._inserts.append(row)
+
+    def put_finish(self, key, values):
+        with self._lock:
+            self._finishes[key] = values
+
+    def flush(self, final=False):
+        with self._flush_lock:
+            if not final and time.monotonic() < self._retry_at:
+                return
+            with self._lock:
+                updates, self._updates = self._updates, {}
+                inserts, self._inserts = self._inserts, []
+                finishes, self._finishes = self._finishes, {}
+            if not (updates or inserts or finishes):
+                return
+            try:
+                self._write(updates, inserts, finishes)
+                logging.info(
+                    f"Write-behind flushed: updates={sum(len(v) for v in updates.values())}, "
+                    f"inserts={len(inserts)}, finishes={len(finishes)}"
+                )
+            except Exception as e:
+                self._failures += 1
+                if db_unavailable(e):
+                    if final:
+                        # 停止时数据库仍不可用，整批落到 dead letter，不逐条重连
+                        self._dead_letter((updates, inserts, finishes), e)
+                    else:
+                        # 数据库不可用时一直重试，不计入 max_retries
+                        self._backoff(updates, inserts, finishes, e)
+                    return
+                self._rejections += 1
+                if final or self._rejections >= self.max_retries:
+                    logging.error(f"批量写入 test_bench 连续失败 {self._rejections} 次，改为逐条写入: {e}")
+                    if not self._write_each(updates, inserts, finishes, final):
+                        return
+                else:
+                    self._backoff(updates, inserts, finishes, e)
+                    return
+            self._failures = 0
+            self._rejections = 0
+            self._retry_at = 0.0
+
+    def _backoff(self, updates, inserts, finishes, error):
+        delay = min(self.interval * 2 ** min(self._failures, 16), self.max_backoff)
+        logging.error(f"批量写入 test_bench 失败，{delay:.0f}s 后重试（第 {self._failures} 次）: {error}")
+        self._retry_at = time.monotonic() + delay
+        self._requeue(updates, inserts, finishes)
+
+    def _write(self, updates, inserts, finishes):
+        conn = get_conn()
+        try:
+            with conn.cursor() as cursor:
+                for columns, rows in updates.items():
+                    _bulk_update_by_name(cursor, columns, rows)
+                # 先插入再更新，保证同一批次内的任务结束记录能找到对应行
+                if inserts:
+                    cursor.executemany("""
+                        INSERT INTO test_bench_task (device_name, task_name, task_type, user, start_time, result)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """, inserts)
+                if finishes:
+                    cursor.executemany("""
+                        UPDATE test_bench_task
+                        SET end_time=%s, result=%s
+                        WHERE device_name=%s AND task_name=%s AND start_time=%s
+                    """, [(*values, *key) for key, values in finishes.items()])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _write_each(self, updates, inserts, finishes, final=False):
+        """
+        逐条写入以隔离出错的记录，失败的记录丢弃并记录到 dead letter；
+        中途数据库不可用时其余记录放回队列等待重试（停止时直接落到 dead letter），返回 False
+        """
+        batches = [({columns: {name: values}}, [], {})
+                   for columns, rows in updates.items() for name, values in rows.items()]
+        batches += [({}, [row], {}) for row in inserts]
+        batches += [({}, [], {key: values}) for key, values in finishes.items()]
+        for i, batch in enumerate(batches):
+            try:
+                self._write(*batch)
+            except Exception as e:
+                if not db_unavailable(e):
+                    self._dead_letter(batch, e)
+                    continue
+                if final:
+                    for rest in batches[i:]:
+                        self._dead_letter(rest, e)
+                    return False
+                for rest in reversed(batches[i:]):
+                    self._requeue(*rest)
+                self._backoff({}, [], {}, e)
+                return False
+        return True
+
+    def _dead_letter(self, batch, error):
+        updates, inserts, finishes = batch
+        record = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "error": str(error),
+            "updates": [[list(columns), name, list(values)]
+                        for columns, rows in updates.items() for name, values in rows.items()],
+            "inserts": [list(row) for row in inserts],
+            "finishes": [[*key, *values] for key, values in finishes.items()],
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        logging.error(f"写入 test_bench 失败，丢弃记录: {line}")
+        try:
+            with open(self.dead_letter_path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logging.error(f"写入 dead letter 文件失败: {e}")
+
+    def _requeue(self, updates, inserts, finishes):
+        # 失败的记录放回队列，期间到达的新值优先
+        with self._lock:
+            for columns, rows in updates.items():
+                pending = self._updates.setdefault(columns, {})
+                for device_name, values in rows.items():
+                    pending.setdefault(device_name, values)
+            self._inserts[:0] = inserts
+            for key, values in finishes.items():
+                self._finishes.setdefault(key, values)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+write_queue = WriteBehindQueue(WRITE_BEHIND_INTERVAL)
+
+def start_write_behind():
+    if WRITE_BEHIND:
+        write_queue.start()
+
+def stop_write_behind():
+    if write_queue.running:
+        write_queue.stop()
 
 def update_usage_info(device_name, userinfo, usage_info, environment_purpose, connect_info):
     """
     根据设备名查 test_bench.id，写 usage_log
     """
+    if write_queue.running:
+        write_queue.put_update(USAGE_COLUMNS, device_name, (userinfo, usage_info, environment_purpose, connect_info))
+        return
     try:
         conn = get_conn()
         with conn.cursor() as cursor:
@@ -46,7 +299,7 @@ def get_bench_status(device_name):
     通过设备名获取 bench_status
     """
     try:
-        conn = pymysql.connect(**MYSQL_CONFIG)
+        conn = get_conn()
         with conn.cursor() as cursor:
             cursor.execute("SELECT bench_status FROM test_bench WHERE name=%s", (device_name,))
             row = cursor.fetchone()
@@ -68,8 +321,11 @@ def update_bench_status(device_name, new_status):
     """
     根据设备名更新 bench_status
     """
+    if write_queue.running:
+        write_queue.put_update(STATUS_COLUMNS, device_name, (new_status,))
+        return
     try:
-        conn = pymysql.connect(**MYSQL_CONFIG)
+        conn = get_conn()
         with conn.cursor() as cursor:
             cursor.execute("UPDATE test_bench SET bench_status=%s WHERE name=%s", (new_status, device_name))
         conn.commit()
@@ -82,10 +338,65 @@ def update_bench_status(device_name, new_status):
         except Exception:
             pass
 
+def get_bench_statuses(device_names):
+    """
+    批量获取 bench_status，返回 {设备名: bench_status}，未找到的设备不在结果中
+    """
+    statuses = {}
+    if not device_names:
+        return statuses
+    try:
+        conn = get_conn()
+        with conn.cursor() as cursor:
+            for chunk in _chunks(list(device_names)):
+                placeholders = ",".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"SELECT name, bench_status FROM test_bench WHERE name IN ({placeholders})",
+                    chunk,
+                )
+                statuses.update(cursor.fetchall())
+    except Exception as e:
+        logging.error(f"批量获取 bench_status 失败: {len(device_names)} 台设备, 错误: {e}")
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return statuses
+
+def update_bench_statuses(statuses):
+    """
+    批量更新 bench_status，statuses 为 {设备名: new_status}，返回是否写入（或入队）成功
+    """
+    if not statuses:
+        return True
+    if write_queue.running:
+        for device_name, new_status in statuses.items():
+            write_queue.put_update(STATUS_COLUMNS, device_name, (new_status,))
+        return True
+    try:
+        conn = get_conn()
+        with conn.cursor() as cursor:
+            _bulk_update_by_name(cursor, STATUS_COLUMNS, {k: (v,) for k, v in statuses.items()})
+        conn.commit()
+        logging.info(f"Bench status updated: {statuses}")
+        return True
+    except Exception as e:
+        logging.error(f"批量更新 bench_status 失败: {list(statuses)}, 错误: {e}")
+        return False
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
 def update_versions(device_name, soc_version, mcu_version, integration_version):
     """
     根据设备名更新 soc_version、mcu_version、integration_version 字段
     """
+    if write_queue.running:
+        write_queue.put_update(VERSION_COLUMNS, device_name, (soc_version, mcu_version, integration_version))
+        return
     try:
         conn = get_conn()
         with conn.cursor() as cursor:
@@ -106,6 +417,10 @@ def insert_test_bench_task(device_name, task_name, task_type, user, start_time,
     """
     新建任务时插入一条记录（无end_time）
     """
+    if write_queue.running:
+        start_time_str = start_time.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
+        write_queue.put_insert((device_name, task_name, task_type, user, start_time_str, result))
+        return
     try:
         start_time_str = start_time.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
         conn = get_conn()
@@ -126,6 +441,11 @@ def finish_test_bench_task(device_name, task_name, start_time, end_time, result)
     """
     任务结束后根据 device_name、task_name、start_time（到秒）更新 end_time 和 result
     """
+    if write_queue.running:
+        start_time_str = start_time.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
+        end_time_str = end_time.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
+        write_queue.put_finish((device_name, task_name, start_time_str), (end_time_str, result))
+        return
     try:
         start_time_str = start_time.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
         end_time_str = end_time.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
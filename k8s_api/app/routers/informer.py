@@ -0,0 +1,171 @@
+import time
+import logging
+import threading
+from kubernetes import watch as k8s_watch
+from kubernetes.client.rest import ApiException
+
+# 单次 watch 的超时时间（秒），到期后用最新 resourceVersion 续接
+WATCH_TIMEOUT = 300
+# list / watch 出错后的重试间隔（秒）
+RETRY_INTERVAL = 3
+
+
+class Informer:
+    """
+    list 一次全量对象后，基于 resourceVersion 持续 watch，
+    在内存中维护对象副本，并把 ADDED / MODIFIED / DELETED 事件分发给订阅者。
+    """
+
+    def __init__(self, list_func, **list_kwargs):
+        self.list_func = list_func
+        self.list_kwargs = list_kwargs
+        self.name = list_func.__name__
+        self._store = {}
+        self._handlers = []
+        self._lock = threading.RLock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._watch = None
+
+    @staticmethod
+    def key_of(obj):
+        meta = obj.metadata
+        return f"{meta.namespace}/{meta.name}" if meta.namespace else meta.name
+
+    def add_handler(self, handler):
+        """
+        注册事件回调 handler(event_type, obj, old_obj)，
+        注册时先用当前缓存回放一遍 ADDED 事件
+        """
+        with self._lock:
+            self._handlers.append(handler)
+            for obj in self._store.values():
+                self._call(handler, "ADDED", obj, None)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"informer-{self.name}", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+    def wait_synced(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def get(self, key):
+        with self._lock:
+            return self._store.get(key)
+
+    def list(self):
+        with self._lock:
+            return list(self._store.values())
+
+    # ---------- 内部实现 ----------
+
+    def _call(self, handler, event_type, obj, old):
+        try:
+            handler(event_type, obj, old)
+        except Exception as e:
+            logging.error(f"informer {self.name} handler error: {e}")
+
+    def _dispatch(self, event_type, obj, old):
+        for handler in self._handlers:
+            self._call(handler, event_type, obj, old)
+
+    def _relist(self):
+        resp = self.list_func(**self.list_kwargs)
+        fresh = {self.key_of(obj): obj for obj in resp.items}
+        with self._lock:
+            for key, old in list(self._store.items()):
+                if key not in fresh:
+                    del self._store[key]
+                    self._dispatch("DELETED", old, old)
+            for key, obj in fresh.items():
+                old = self._store.get(key)
+                self._store[key] = obj
+                if old is None:
+                    self._dispatch("ADDED", obj, None)
+                elif old.metadata.resource_version != obj.metadata.resource_version:
+                    self._dispatch("MODIFIED", obj, old)
+        self._synced.set()
+        return resp.metadata.resource_version
+
+    def _apply(self, event_type, obj):
+        key = self.key_of(obj)
+        with self._lock:
+            old = self._store.get(key)
+            if event_type == "DELETED":
+                self._store.pop(key, None)
+            else:
+                self._store[key] = obj
+            self._dispatch(event_type, obj, old)
+
+    def _watch_from(self, resource_version):
+        w = k8s_watch.Watch()
+        self._watch = w
+        for event in w.stream(
+            self.list_func,
+            resource_version=resource_version,
+            timeout_seconds=WATCH_TIMEOUT,
+            allow_watch_bookmarks=True,
+            **self.list_kwargs,
+        ):
+            if self._stopped.is_set():
+                break
+            if event["type"] == "BOOKMARK":
+                continue
+            self._apply(event["type"], event["object"])
+        return w.resource_version or resource_version
+
+    def _run(self):
+        resource_version = None
+        while not self._stopped.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = self._relist()
+                resource_version = self._watch_from(resource_version)
+            except ApiException as e:
+                if e.status == 410:
+                    # resourceVersion 已过期，重新 list
+                    resource_version = None
+                    continue
+                logging.error(f"informer {self.name} watch failed: {e}")
+                time.sleep(RETRY_INTERVAL)
+            except Exception as e:
+                logging.error(f"informer {self.name} watch failed: {e}")
+                time.sleep(RETRY_INTERVAL)
+
+
+# ---------- 进程内共享 ----------
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_informer(list_func, **list_kwargs):
+    """
+    按 (list 方法, 参数) 复用同一个已启动的 informer，避免同一资源被重复 watch
+    """
+    key = (list_func.__name__, tuple(sorted(list_kwargs.items())))
+    with _shared_lock:
+        inf = _shared.get(key)
+        if inf is None:
+            inf = Informer(list_func, **list_kwargs)
+            _shared[key] = inf
+    return inf.start()
+
+
+def stop_all():
+    with _shared_lock:
+        for inf in _shared.values():
+            inf.stop()
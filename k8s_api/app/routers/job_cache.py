@@ -0,0 +1,104 @@
+import threading
+from config import env_list, get_batch_v1_api
+from .informer import shared_informer
+
+# 由 informer 缓存的命名空间，其他命名空间的读取直接访问 apiserver；
+# 可通过环境变量 K8S_API_JOB_CACHE_NAMESPACES（逗号分隔）覆盖
+JOB_CACHE_NAMESPACES = env_list("K8S_API_JOB_CACHE_NAMESPACES", ("default", "device-system"))
+# 首次查询时等待缓存同步的最长时间（秒），超时直接查 API
+SYNC_TIMEOUT = 5
+
+
+def job_queues(job):
+    meta = job.metadata
+    return {
+        "label": (meta.labels or {}).get("queue"),
+        "annotation": (meta.annotations or {}).get("queue"),
+    }
+
+
+class JobCache:
+    """
+    进程内共享的 Job 缓存，每个配置的命名空间一组 list + watch，
+    按 命名空间 / 名称 / queue（label 或 annotation）建立索引。
+    缓存未同步或命名空间不在缓存范围内时返回 None，由调用方回退到 API
+    """
+
+    def __init__(self, namespaces=JOB_CACHE_NAMESPACES):
+        self.namespaces = frozenset(namespaces)
+        self._lock = threading.Lock()
+        self._informers = None
+        self._queues = {}   # (source, namespace, queue) -> {name}
+
+    def start(self):
+        with self._lock:
+            if self._informers is not None:
+                return
+            batch_v1 = get_batch_v1_api()
+            self._informers = {
+                ns: shared_informer(batch_v1.list_namespaced_job, namespace=ns)
+                for ns in self.namespaces
+            }
+        for informer in self._informers.values():
+            informer.add_handler(self._on_job)
+
+    def covers(self, namespace):
+        return namespace in self.namespaces
+
+    def get(self, namespace, name):
+        """
+        命中返回 Job；未命中（可能刚创建、watch 尚未送达）或缓存不可用时返回 None
+        """
+        informer = self._synced_informer(namespace)
+        if informer is None:
+            return None
+        return informer.get(f"{namespace}/{name}")
+
+    def list(self, namespace, queue=None, source="label"):
+        """
+        返回命名空间内的 Job，可按 queue 过滤；缓存不可用时返回 None
+        """
+        informer = self._synced_informer(namespace)
+        if informer is None:
+            return None
+        if queue is None:
+            jobs = informer.list()
+        else:
+            with self._lock:
+                names = list(self._queues.get((source, namespace, queue), ()))
+            jobs = [informer.get(f"{namespace}/{name}") for name in names]
+            jobs = [j for j in jobs if j is not None]
+        return sorted(jobs, key=lambda j: j.metadata.name)
+
+    # ---------- 内部实现 ----------
+
+    def _synced_informer(self, namespace):
+        if not self.covers(namespace):
+            return None
+        self.start()
+        informer = self._informers[namespace]
+        return informer if informer.wait_synced(SYNC_TIMEOUT) else None
+
+    def _on_job(self, event_type, job, old):
+        namespace, name = job.metadata.namespace, job.metadata.name
+        with self._lock:
+            if old is not None:
+                self._unindex(namespace, name, job_queues(old))
+            if event_type == "DELETED":
+                self._unindex(namespace, name, job_queues(job))
+                return
+            for source, queue in job_queues(job).items():
+                if queue is not None:
+                    self._queues.setdefault((source, namespace, queue), set()).add(name)
+
+    def _unindex(self, namespace, name, queues):
+        for source, queue in queues.items():
+            key = (source, namespace, queue)
+            names = self._queues.get(key)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._queues[key]
+
+
+job_cache = JobCache()
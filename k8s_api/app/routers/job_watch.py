@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from datetime import timedelta
+from config import get_batch_v1_api, get_core_v1_api
+from .informer import shared_informer
+
+# 比较 Job 创建时间（apiserver 时钟）与下发开始时间（本机时钟）时允许的偏差（秒）
+CLOCK_SKEW = 5
+# Job 控制器给 Pod 打的 Job uid 标签，新版本使用带前缀的键
+CONTROLLER_UID_LABELS = ("batch.kubernetes.io/controller-uid", "controller-uid")
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+def pod_controller_uid(pod):
+    labels = pod.metadata.labels or {}
+    return next((labels[k] for k in CONTROLLER_UID_LABELS if k in labels), None)
+
+
+class JobWatchMux:
+    """
+    命名空间内 Job 与 Pod 共用一组 watch，把事件分发给按 Job 名等待的 asyncio future，
+    watch_job 只需 await「Job 已创建」「Pod 已创建」「Job 已结束」三个事件，无需轮询 API。
+    OTA 的 Job 名按设备固定，缓存里可能还留着上一次的同名 Job / Pod，
+    因此先按创建时间认定本次的 Job，之后只按它的 uid 匹配
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._created_waiters = {}  # job -> [(loop, future, match)]
+        self._pod_waiters = {}      # job -> [(loop, future, match)]
+        self._finish_waiters = {}   # job -> [(loop, future, match)]
+        self._informers = None
+
+    @property
+    def batch_v1(self):
+        return get_batch_v1_api()
+
+    @property
+    def core_v1(self):
+        return get_core_v1_api()
+
+    def start(self):
+        with self._lock:
+            if self._informers is not None:
+                return
+            self._informers = (
+                shared_informer(self.batch_v1.list_namespaced_job, namespace=self.namespace),
+                shared_informer(self.core_v1.list_namespaced_pod, namespace=self.namespace),
+            )
+        jobs, pods = self._informers
+        jobs.add_handler(self._on_job)
+        pods.add_handler(self._on_pod)
+
+    async def wait_created(self, job_name, start_time=None):
+        """
+        等待 start_time（本机时间）之后创建的同名 Job，返回其 uid；start_time 为空时接受任意同名 Job
+        """
+        self.start()
+        if start_time is None:
+            match = lambda job: True
+        else:
+            not_before = start_time.astimezone() - timedelta(seconds=CLOCK_SKEW)
+            match = lambda job: job.metadata.creation_timestamp >= not_before
+        future = self._register(self._created_waiters, job_name, match)
+        job = self._informers[0].get(f"{self.namespace}/{job_name}")
+        if job is not None and match(job):
+            _resolve(future, job.metadata.uid)
+        return await future
+
+    async def wait_pod(self, job_name, uid):
+        """
+        等待 uid 对应 Job 的 Pod 出现，返回 Pod 名；Job 被删除时返回 None
+        """
+        self.start()
+        # Pod 事件按 controller-uid 标签匹配，Job 删除事件按 Job 自身的 uid 匹配
+        match = lambda obj: obj.metadata.uid == uid or pod_controller_uid(obj) == uid
+        future = self._register(self._pod_waiters, job_name, match)
+        for pod in self._informers[1].list():
+            if pod_controller_uid(pod) == uid:
+                _resolve(future, pod.metadata.name)
+                break
+        return await future
+
+    async def wait_finished(self, job_name, uid):
+        """
+        等待 uid 对应的 Job 结束，成功返回 True，失败或被删除返回 False
+        """
+        self.start()
+        match = lambda job: job.metadata.uid == uid
+        future = self._register(self._finish_waiters, job_name, match)
+        job = self._informers[0].get(f"{self.namespace}/{job_name}")
+        if job is not None and match(job):
+            result = self._job_result(job)
+            if result is not None:
+                _resolve(future, result)
+        else:
+            # 已被删除（或被同名的新 Job 替换）
+            _resolve(future, False)
+        return await future
+
+    # ---------- 内部实现 ----------
+
+    def _register(self, waiters, job_name, match):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            waiters.setdefault(job_name, []).append((loop, future, match))
+        future.add_done_callback(lambda f: self._unregister(waiters, job_name, f))
+        return future
+
+    def _unregister(self, waiters, job_name, future):
+        with self._lock:
+            entries = [e for e in waiters.get(job_name, []) if e[1] is not future]
+            if entries:
+                waiters[job_name] = entries
+            else:
+                waiters.pop(job_name, None)
+
+    def _notify(self, waiters, job_name, obj, value):
+        with self._lock:
+            entries = list(waiters.get(job_name, []))
+        for loop, future, match in entries:
+            if match(obj):
+                loop.call_soon_threadsafe(_resolve, future, value)
+
+    @staticmethod
+    def _job_result(job):
+        status = job.status
+        if status is None:
+            return None
+        if status.succeeded:
+            return True
+        if status.failed and status.failed > 0:
+            return False
+        return None
+
+    def _on_job(self, event_type, job, old):
+        job_name = job.metadata.name
+        if event_type == "DELETED":
+            self._notify(self._pod_waiters, job_name, job, None)
+            self._notify(self._finish_waiters, job_name, job, False)
+            return
+        self._notify(self._created_waiters, job_name, job, job.metadata.uid)
+        result = self._job_result(job)
+        if result is not None:
+            self._notify(self._finish_waiters, job_name, job, result)
+
+    def _on_pod(self, event_type, pod, old):
+        if event_type == "DELETED":
+            return
+        job_name = (pod.metadata.labels or {}).get("job-name")
+        if job_name:
+            self._notify(self._pod_waiters, job_name, pod, pod.metadata.name)
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Form
+from fastapi import APIRouter, HTTPException, Query, Path, Form, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, List, Optional
 from kubernetes import client
 from kubernetes.client.rest import ApiException
+from config import get_batch_v1_api
+from .pagination import STREAM_PAGE_SIZE, list_page, iter_pages, ndjson_lines
+from .job_cache import job_cache
+from .bulk import BULK_MAX_ITEMS, parse_items, submit_bulk
 
 router = APIRouter(prefix="/v1alpha1", tags=["Jobs"])
 
@@ -16,75 +21,77 @@ class JobInfo(BaseModel):
 
 class JobListResponse(BaseModel):
     jobs: List[JobInfo]
+    # 仅在还有下一页时返回（路由按 exclude_unset 输出），原样作为 continue 参数传回
+    continue_: Optional[str] = Field(None, alias="continue")
 
-# ---------- 辅助函数 ----------
+class JobCreateSpec(BaseModel):
+    """与单个创建接口的表单字段一致"""
+    name: str = Field(..., min_length=1)
+    image: str
+    command: Optional[str] = None
+    cpu: str
+    mem: str = Field(..., description="Memory in GiB")
+    env: Optional[List[str]] = Field(None, description="环境变量，list of KEY=VAL")
+    device_type: Optional[str] = None
+    device_name: Optional[str] = None
+    device_label: Optional[str] = None
+    queue: Optional[str] = None
+    mount: Optional[str] = Field(None, description="Mount 信息，例如 hostPath:containerPath")
+    group: Optional[str] = Field(None, description="资源组筛选项，以/开头，多组逗号分隔")
+    deploy_monitor: Optional[int] = Field(0, ge=0, le=1)
 
-def get_batch_v1_api() -> client.BatchV1Api:
-    return client.BatchV1Api()
+# ---------- 辅助函数 ----------
 
-# ---------- 路由实现 ----------
+def job_status(active, succeeded, failed) -> str:
+    if active:
+        return "Active"
+    if succeeded:
+        return "Succeeded"
+    if failed:
+        return "Failed"
+    return "Unknown"
 
-@router.get("/jobs/", response_model=JobListResponse)
-def v1alpha1_jobs_list(
-    queue: str = Query(..., min_length=1),
-    namespace: str = Query(..., min_length=1),
-):
-    """
-    GET /v1alpha1/jobs/?queue={queue}&namespace={namespace}
-    按 queue 标签和 namespace 过滤所有 Job
-    """
-    api = get_batch_v1_api()
-    try:
-        jobs = api.list_namespaced_job(
-            namespace=namespace,
-            label_selector=f"queue={queue}"
-        ).items
-    except ApiException as e:
-        raise HTTPException(status_code=500, detail=e.reason)
+def job_info(j) -> JobInfo:
+    return JobInfo(
+        name=j.metadata.name,
+        namespace=j.metadata.namespace,
+        queue=(j.metadata.labels or {}).get("queue"),
+        status=job_status(j.status.active, j.status.succeeded, j.status.failed)
+    )
 
-    result = []
-    for j in jobs:
-        status = "Unknown"
-        if j.status.active:
-            status = "Active"
-        elif j.status.succeeded:
-            status = "Succeeded"
-        elif j.status.failed:
-            status = "Failed"
-        result.append(JobInfo(
-            name=j.metadata.name,
-            namespace=j.metadata.namespace,
-            queue=j.metadata.labels.get("queue"),
-            status=status
-        ))
-    return JobListResponse(jobs=result)
+def job_info_from_dict(d: dict) -> JobInfo:
+    # list 接口返回原始 JSON，只取需要的字段
+    meta = d["metadata"]
+    status = d.get("status") or {}
+    return JobInfo(
+        name=meta["name"],
+        namespace=meta["namespace"],
+        queue=(meta.get("labels") or {}).get("queue"),
+        status=job_status(status.get("active"), status.get("succeeded"), status.get("failed"))
+    )
 
+def list_error(e: ApiException) -> HTTPException:
+    if e.status == 410:
+        return HTTPException(410, "continue 已过期，请从第一页重新获取")
+    return HTTPException(status_code=500, detail=e.reason)
 
-@router.post(
-    "/namespaces/{namespace}/jobs",
-    summary="在指定命名空间下创建新作业",
-)
-def v1alpha1_namespaces_jobs_create(
-    namespace: str = Path(..., min_length=1),
-    name: str = Form(..., min_length=1),
-    image: str = Form(...),
-    command: Optional[str] = Form(None),  # 修改为可选
-    cpu: str = Form(...),
-    mem: str = Form(..., description="Memory in GiB"),
-    env: Optional[List[str]] = Form(None, description="环境变量，list of KEY=VAL"),
-    device_type: Optional[str] = Form(None),
-    device_name: Optional[str] = Form(None),
-    device_label: Optional[str] = Form(None),
-    queue: Optional[str] = Form(None),
-    mount: Optional[str] = Form(None, description="Mount 信息，例如 hostPath:containerPath"),
-    group: Optional[str] = Form(None, description="资源组筛选项，以/开头，多组逗号分隔"),
-    deploy_monitor: Optional[int] = Form(0, ge=0, le=1),
-):
+def build_job(
+    namespace: str,
+    name: str,
+    image: str,
+    command: Optional[str],
+    cpu: str,
+    mem: str,
+    env: Optional[List[str]] = None,
+    device_type: Optional[str] = None,
+    device_label: Optional[str] = None,
+    queue: Optional[str] = None,
+    mount: Optional[str] = None,
+    group: Optional[str] = None,
+) -> client.V1Job:
     """
-    POST /v1alpha1/namespaces/{namespace}/jobs
+    根据表单字段构造 V1Job，单个创建与批量创建共用
     """
-    api = get_batch_v1_api()
-
     # 构造 container
     container_args = dict(
         name=name,
@@ -107,6 +114,8 @@ def v1alpha1_namespaces_jobs_create(
     # 挂载
     volume_mounts, volumes = [], []
     if mount:
+        if ":" not in mount:
+            raise ValueError("mount 格式应为 hostPath:containerPath")
         host_path, mount_path = mount.split(":",1)
         volumes.append(client.V1Volume(
             name="vol0",
@@ -146,7 +155,80 @@ def v1alpha1_namespaces_jobs_create(
         }),
         spec=job_spec
     )
+    return body
 
+# ---------- 路由实现 ----------
+
+@router.get("/jobs/", response_model=JobListResponse, response_model_exclude_unset=True)
+def v1alpha1_jobs_list(
+    queue: str = Query(..., min_length=1),
+    namespace: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1, description="每页条数，不传则一次返回全部"),
+    continue_: Optional[str] = Query(None, alias="continue", description="上一页返回的 continue"),
+    stream: bool = Query(False, description="以 NDJSON 逐页流式返回全部 Job"),
+    consistent: bool = Query(False, description="绕过本地缓存，直接读取 apiserver"),
+):
+    """
+    GET /v1alpha1/jobs/?queue={queue}&namespace={namespace}
+    按 queue 标签和 namespace 过滤所有 Job，默认读取本地 Job 缓存；
+    limit/continue 透传给 apiserver 分页，stream=true 时按页拉取并逐行输出 JobInfo
+    """
+    if not (consistent or stream or limit or continue_):
+        cached = job_cache.list(namespace, queue=queue)
+        if cached is not None:
+            return JobListResponse(jobs=[job_info(j) for j in cached])
+
+    api = get_batch_v1_api()
+    selector = dict(namespace=namespace, label_selector=f"queue={queue}")
+    if stream:
+        pages = iter_pages(api.list_namespaced_job, limit or STREAM_PAGE_SIZE, continue_, **selector)
+        try:
+            first_page = next(pages)
+        except ApiException as e:
+            raise list_error(e)
+        return StreamingResponse(
+            ndjson_lines(pages, first_page, job_info_from_dict), media_type="application/x-ndjson"
+        )
+
+    try:
+        jobs, continue_token = list_page(api.list_namespaced_job, limit, continue_, **selector)
+    except ApiException as e:
+        raise list_error(e)
+    page = {"continue": continue_token} if continue_token else {}
+    return JobListResponse(jobs=[job_info_from_dict(j) for j in jobs], **page)
+
+
+@router.post(
+    "/namespaces/{namespace}/jobs",
+    summary="在指定命名空间下创建新作业",
+)
+def v1alpha1_namespaces_jobs_create(
+    namespace: str = Path(..., min_length=1),
+    name: str = Form(..., min_length=1),
+    image: str = Form(...),
+    command: Optional[str] = Form(None),  # 修改为可选
+    cpu: str = Form(...),
+    mem: str = Form(..., description="Memory in GiB"),
+    env: Optional[List[str]] = Form(None, description="环境变量，list of KEY=VAL"),
+    device_type: Optional[str] = Form(None),
+    device_name: Optional[str] = Form(None),
+    device_label: Optional[str] = Form(None),
+    queue: Optional[str] = Form(None),
+    mount: Optional[str] = Form(None, description="Mount 信息，例如 hostPath:containerPath"),
+    group: Optional[str] = Form(None, description="资源组筛选项，以/开头，多组逗号分隔"),
+    deploy_monitor: Optional[int] = Form(0, ge=0, le=1),
+):
+    """
+    POST /v1alpha1/namespaces/{namespace}/jobs
+    """
+    api = get_batch_v1_api()
+    try:
+        body = build_job(
+            namespace, name, image, command, cpu, mem, env,
+            device_type=device_type, device_label=device_label, queue=queue, mount=mount, group=group
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     try:
         api.create_namespaced_job(namespace=namespace, body=body)
     except ApiException as e:
@@ -154,6 +236,41 @@ def v1alpha1_namespaces_jobs_create(
     return {"message": "Job created", "name": name, "namespace": namespace}
 
 
+@router.post(
+    "/namespaces/{namespace}/jobs/bulk",
+    summary="在指定命名空间下批量创建作业",
+)
+def v1alpha1_namespaces_jobs_bulk_create(
+    namespace: str = Path(..., min_length=1),
+    specs: List[Any] = Body(..., description="JobCreateSpec 列表"),
+):
+    """
+    POST /v1alpha1/namespaces/{namespace}/jobs/bulk
+    逐项校验（JobCreateSpec）并统一构造全部 V1Job，再以有限并发提交，逐项返回结果；
+    字段缺失、mount 格式错误等无效项返回 422，不影响其余作业
+    """
+    if not specs:
+        raise HTTPException(400, "作业列表不能为空")
+    if len(specs) > BULK_MAX_ITEMS:
+        raise HTTPException(400, f"单次最多创建 {BULK_MAX_ITEMS} 个作业")
+    api = get_batch_v1_api()
+    entries = []
+    for name, spec in parse_items(JobCreateSpec, specs):
+        if isinstance(spec, Exception):
+            entries.append((name, spec))
+            continue
+        try:
+            body = build_job(
+                namespace, spec.name, spec.image, spec.command, spec.cpu, spec.mem, spec.env,
+                device_type=spec.device_type, device_label=spec.device_label,
+                queue=spec.queue, mount=spec.mount, group=spec.group
+            )
+        except ValueError as e:
+            body = e
+        entries.append((spec.name, body))
+    return submit_bulk(entries, lambda body: api.create_namespaced_job(namespace=namespace, body=body))
+
+
 @router.get(
     "/namespaces/{namespace}/jobs/{name}",
     response_model=JobInfo,
@@ -162,7 +279,11 @@ def v1alpha1_namespaces_jobs_create(
 def v1alpha1_namespaces_jobs_read(
     namespace: str = Path(..., min_length=1),
     name: str = Path(..., min_length=1),
+    consistent: bool = Query(False, description="绕过本地缓存，直接读取 apiserver"),
 ):
+    j = None if consistent else job_cache.get(namespace, name)
+    if j is not None:
+        return job_info(j)
     api = get_batch_v1_api()
     try:
         j = api.read_namespaced_job(name=name, namespace=namespace)
@@ -170,19 +291,7 @@ def v1alpha1_namespaces_jobs_read(
         if e.status == 404:
             raise HTTPException(404, "Job not found")
         raise HTTPException(500, e.reason)
-    status = "Unknown"
-    if j.status.active:
-        status = "Active"
-    elif j.status.succeeded:
-        status = "Succeeded"
-    elif j.status.failed:
-        status = "Failed"
-    return JobInfo(
-        name=j.metadata.name,
-        namespace=j.metadata.namespace,
-        queue=j.metadata.labels.get("queue"),
-        status=status
-    )
+    return job_info(j)
 
 
 @router.delete(
@@ -0,0 +1,35 @@
+import os
+import fcntl
+
+
+class FileLeaderLock:
+    """
+    基于 flock 的多 worker 选主：同一锁文件同时只有一个进程能持有，
+    持有者退出（含崩溃）时由内核释放，其他 worker 下次尝试即可接管
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """非阻塞地尝试成为持有者，已持有时直接返回 True"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,43 +1,205 @@
+import os
+import json
 import requests
 import logging
-from .device_database import get_bench_status, update_bench_status
+import threading
+from datetime import datetime
+from .device_database import (
+    get_bench_statuses,
+    update_bench_statuses,
+)
+from .leader import FileLeaderLock
 
 PROMETHEUS_URL = "http://10.64.243.100:30090/api/v1/query"  # 标准API路径
 MODULE = "icmp"
 TARGET_IP = "192.168.195.3"
+PROM_MATCHER_LIMIT = 4000  # 单次查询中 device 正则的最大长度，超出则分批
+RECONCILE_INTERVAL = 60    # 后台同步 bench_status 的间隔（秒）
 
-def fetch_probe_success(device: str) -> int:
-    """从 Prometheus 查询 probe_success 值，返回 0 或 1"""
-    query = f'probe_success{{device="{device}",module="{MODULE}",target="{TARGET_IP}"}}'
-    try:
-        resp = requests.get(PROMETHEUS_URL, params={"query": query}, timeout=3)
-        resp.raise_for_status()
-        # print("Prometheus response:", resp.text)  # 调试用
-        data = resp.json()
-        results = data.get("data", {}).get("result", [])
-        if not results:
-            raise ValueError(f"No data for device={device}")
-        value = results[0]["value"][1]
-        return int(float(value))
-    except Exception as e:
-        logging.error(f"fetch_probe_success error: {e}")
-        raise
-
-def sync_bench_status(device: str) -> dict:
+def _promql_regex_literal(device: str) -> str:
+    """转义 RE2 元字符，再按 PromQL 字符串字面量规则转义"""
+    escaped = "".join("\\" + ch if ch in r"\.+*?()|[]{}^$" else ch for ch in device)
+    return escaped.replace("\\", "\\\\").replace('"', '\\"')
+
+def fetch_probe_success_bulk(devices) -> dict:
+    """
+    用 device=~"a|b|..." 批量查询 probe_success，返回 {device: 0 或 1}；
+    Prometheus 中没有数据的设备不在结果中
+    """
+    chunks, current, length = [], [], 0
+    for device in devices:
+        literal = _promql_regex_literal(device)
+        if current and length + len(literal) + 1 > PROM_MATCHER_LIMIT:
+            chunks.append(current)
+            current, length = [], 0
+        current.append(literal)
+        length += len(literal) + 1
+    if current:
+        chunks.append(current)
+
+    values = {}
+    for chunk in chunks:
+        query = (
+            f'probe_success{{device=~"{"|".join(chunk)}",'
+            f'module="{MODULE}",target="{TARGET_IP}"}}'
+        )
+        try:
+            resp = requests.post(PROMETHEUS_URL, data={"query": query}, timeout=10)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            logging.error(f"fetch_probe_success_bulk error: {e}")
+            raise
+        for result in data.get("data", {}).get("result", []):
+            device = result.get("metric", {}).get("device")
+            if device:
+                values[device] = int(float(result["value"][1]))
+    return values
+
+class BenchStatusReconciler:
     """
-    1. 获取最新 probe_success
-    2. 读取 test_bench.bench_status
-    3. 不一致时更新，并返回变化前后值
+    后台周期性评估所有被监控设备的 probe_success，内存中保存每台设备最近一次的状态，
+    仅在状态变化时写 test_bench；只有首次见到的设备才会从数据库读取旧值。
+    多个 worker 中只有持有 lock_path 文件锁的一个在后台同步，并把快照写到 snapshot_path，
+    其他 worker 的 snapshot() 读取该文件
     """
-    try:
-        probe = fetch_probe_success(device)
-        new_status = 1 if probe == 1 else 0  # 用整数
-    except Exception as e:
-        return {"device": device, "error": str(e)}
-
-    old_status = get_bench_status(device)
-    if old_status != new_status:
-        update_bench_status(device, new_status)
-        return {"device": device, "old": old_status, "new": new_status, "action": "updated"}
-    else:
-        return {"device": device, "old": old_status, "new": new_status, "action": "unchanged"}
\ No newline at end of file
+
+    def __init__(self, load_devices, lock_path, snapshot_path, interval=RECONCILE_INTERVAL):
+        self.load_devices = load_devices
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self._leader = FileLeaderLock(lock_path)
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._devices = []
+        self._states = {}      # device -> {"status", "since", "checked_at", "error"}
+        self._last_run = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="bench-reconciler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def reconcile_once(self) -> list:
+        """
+        执行一轮同步，返回逐设备结果：
+        {"device", "old", "new", "action": "updated" | "unchanged"} 或 {"device", "error"}
+        """
+        with self._run_lock:
+            try:
+                self._devices = self.load_devices()
+            except Exception as e:
+                logging.error(f"加载监控设备列表失败，沿用上次列表: {e}")
+            devices = list(self._devices)
+            now = datetime.now().isoformat(timespec="seconds")
+            try:
+                probes = fetch_probe_success_bulk(devices)
+            except Exception as e:
+                self._record_errors(devices, str(e), now)
+                return [{"device": device, "error": str(e)} for device in devices]
+
+            with self._lock:
+                # 非后台同步的 worker（手动触发）内存状态可能已过时，旧值一律从数据库读取
+                if not self._leader.held:
+                    self._states = {}
+                unknown = [
+                    d for d in devices
+                    if d in probes and self._states.get(d, {}).get("status") is None
+                ]
+            seeded = get_bench_statuses(unknown) if unknown else {}
+
+            results, changes = [], {}
+            with self._lock:
+                for device in devices:
+                    if device not in probes:
+                        error = f"No data for device={device}"
+                        self._states.setdefault(device, {"status": None, "since": None})
+                        self._states[device].update(checked_at=now, error=error)
+                        results.append({"device": device, "error": error})
+                        continue
+                    new_status = 1 if probes[device] == 1 else 0
+                    state = self._states.get(device)
+                    old_status = state["status"] if state and state["status"] is not None else seeded.get(device)
+                    if old_status != new_status:
+                        changes[device] = new_status
+                    results.append({
+                        "device": device,
+                        "old": old_status,
+                        "new": new_status,
+                        "action": "updated" if old_status != new_status else "unchanged",
+                    })
+
+            # 写入失败的设备保持原状态，下一轮重试
+            persisted = update_bench_statuses(changes)
+            with self._lock:
+                for result in results:
+                    if "error" in result:
+                        continue
+                    device = result["device"]
+                    state = self._states.setdefault(device, {"status": None, "since": None})
+                    if result["action"] == "updated" and persisted:
+                        state.update(status=result["new"], since=now)
+                    elif state["status"] is None:
+                        state["status"] = result["old"]
+                    state.update(checked_at=now, error=None)
+                self._last_run = now
+            self._publish()
+            return results
+
+    def snapshot(self) -> dict:
+        if not self._leader.held:
+            try:
+                with open(self.snapshot_path) as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return {"updated_at": None, "devices": []}
+        return self._local_snapshot()
+
+    def _local_snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "updated_at": self._last_run,
+                "devices": [
+                    {"device": device, **self._states[device]}
+                    for device in self._devices if device in self._states
+                ],
+            }
+
+    def _publish(self):
+        # 快照文件只由持锁的 worker 写，其他 worker 手动触发的同步不能覆盖它
+        if not self._leader.held:
+            return
+        # 先写临时文件再原子替换，读者不会看到写了一半的快照
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._local_snapshot(), f, ensure_ascii=False)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logging.error(f"写入设备状态快照失败: {e}")
+
+    def _record_errors(self, devices, error, now):
+        with self._lock:
+            for device in devices:
+                self._states.setdefault(device, {"status": None, "since": None})
+                self._states[device].update(checked_at=now, error=error)
+            self._last_run = now
+        self._publish()
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                if self._leader.try_acquire():
+                    try:
+                        self.reconcile_once()
+                    except Exception as e:
+                        logging.error(f"bench status reconcile failed: {e}")
+                self._stopped.wait(self.interval)
+        finally:
+            self._leader.release()
@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+
+class PooledConnection:
+    """
+    从连接池借出的 pymysql 连接，其余接口原样代理，
+    close() 只把连接归还给连接池
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MySQLConnectionPool:
+    """
+    线程安全的有界 MySQL 连接池：
+    - 常驻 size 条连接，繁忙时最多再临时建立 max_overflow 条，归还后即关闭
+    - 借出前 ping 检查，超过 max_lifetime 的连接会被替换
+    - 无空闲连接且已达上限时最多等待 wait_timeout 秒
+    """
+
+    def __init__(self, size=8, max_overflow=8, max_lifetime=3600, wait_timeout=10, **connect_kwargs):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = []          # [(conn, 建立时间)]
+        self._created_at = {}    # id(conn) -> 建立时间
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._stats = {"created": 0, "closed": 0, "waits": 0, "timeouts": 0}
+
+    def connect(self) -> PooledConnection:
+        return PooledConnection(self, self.acquire())
+
+    def acquire(self):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._total() >= self.size + self.max_overflow:
+                    self._stats["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    self._waiting += 1
+                    try:
+                        woken = remaining > 0 and self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    if not woken:
+                        self._stats["timeouts"] += 1
+                        raise TimeoutError("等待 MySQL 连接超时")
+                self._in_use += 1
+                candidate = self._idle.pop() if self._idle else None
+            if candidate is None:
+                return self._open()
+            conn, created_at = candidate
+            # ping 在锁外进行，避免阻塞其他借用者
+            if self._usable(conn, created_at):
+                return conn
+            with self._cond:
+                self._in_use -= 1
+                self._close(conn)
+
+    def release(self, conn):
+        try:
+            # 未提交的事务不能带回池中
+            if conn.open and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                conn.rollback()
+        except Exception as e:
+            logging.warning(f"MySQL 连接回滚失败，丢弃连接: {e}")
+            conn.close()
+        with self._cond:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(conn), 0)
+            # 有等待者时直接转交，否则超出常驻数量的临时连接关闭
+            if (
+                conn.open
+                and (self._waiting or len(self._idle) + self._in_use < self.size)
+                and time.monotonic() - created_at < self.max_lifetime
+            ):
+                self._idle.append((conn, created_at))
+            else:
+                self._close(conn)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._close(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                **self._stats,
+            }
+
+    # ---------- 内部实现 ----------
+
+    def _open(self):
+        try:
+            conn = pymysql.connect(**self.connect_kwargs)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    def _total(self):
+        return self._in_use + len(self._idle)
+
+    def _usable(self, conn, created_at):
+        if time.monotonic() - created_at >= self.max_lifetime:
+            return False
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        self._created_at.pop(id(conn), None)
+        self._stats["closed"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
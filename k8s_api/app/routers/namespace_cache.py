@@ -0,0 +1,73 @@
+import threading
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from config import get_core_v1_api
+from .informer import shared_informer
+
+# 首次查询时等待缓存同步的最长时间（秒），超时后直接尝试创建
+SYNC_TIMEOUT = 5
+
+
+class NamespaceCache:
+    """
+    进程内的已知命名空间集合，由 namespace 的 list + watch 维护，
+    创建接口自己建出的命名空间也会立即加入；
+    ensure() 对已知命名空间只做集合查找，只有新命名空间才访问 API
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._known = set()
+        self._create_lock = threading.Lock()
+        self._core_v1 = None
+        self._informer = None
+
+    def start(self):
+        with self._lock:
+            if self._informer is not None:
+                return
+            self._core_v1 = get_core_v1_api()
+            self._informer = shared_informer(self._core_v1.list_namespace)
+        self._informer.add_handler(self._on_namespace)
+
+    def exists(self, name):
+        self.start()
+        self._informer.wait_synced(SYNC_TIMEOUT)
+        with self._lock:
+            return name in self._known
+
+    def ensure(self, name):
+        """
+        确保命名空间存在，新建返回 True，已存在返回 False；
+        进程内的创建串行进行；其他 worker 并发创建时 apiserver 返回的 409 视为已存在，
+        其他错误抛出 ApiException
+        """
+        if self.exists(name):
+            return False
+        with self._create_lock:
+            with self._lock:
+                if name in self._known:
+                    return False
+            body = client.V1Namespace(metadata=client.V1ObjectMeta(name=name))
+            created = True
+            try:
+                self._core_v1.create_namespace(body)
+            except ApiException as e:
+                if e.status != 409:
+                    raise
+                created = False
+            with self._lock:
+                self._known.add(name)
+        return created
+
+    def _on_namespace(self, event_type, ns, old):
+        name = ns.metadata.name
+        with self._lock:
+            # 正在删除的命名空间无法再创建资源，不视为已知
+            if event_type == "DELETED" or (ns.status and ns.status.phase == "Terminating"):
+                self._known.discard(name)
+            else:
+                self._known.add(name)
+
+
+namespace_cache = NamespaceCache()
@@ -0,0 +1,179 @@
+import json
+import uuid
+import sqlite3
+from datetime import datetime
+
+# 设备在一次 OTA 下发中的阶段
+PHASES = ("queued", "submitting", "running", "succeeded", "failed", "cleaned")
+# 尚在进行中、占用跳板机并发名额的阶段（succeeded / failed 在收尾完成前也算）
+ACTIVE_PHASES = ("submitting", "running", "succeeded", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollouts (
+    rollout_id TEXT PRIMARY KEY,
+    oss_link   TEXT,
+    user       TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS rollout_devices (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    rollout_id TEXT NOT NULL,
+    device     TEXT NOT NULL,
+    jump_host  TEXT NOT NULL,
+    phase      TEXT NOT NULL,
+    result     TEXT,
+    error      TEXT,
+    start_time TEXT,
+    finished   INTEGER NOT NULL DEFAULT 0,
+    timings    TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_rollout_devices_rollout ON rollout_devices (rollout_id);
+CREATE INDEX IF NOT EXISTS idx_rollout_devices_pending ON rollout_devices (jump_host, finished, phase);
+"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class RolloutStore:
+    """
+    OTA 下发记录的本地持久化（SQLite），多个 worker 进程共享同一文件：
+    任一 worker 都可以写入排队记录和查询进度，调度只由持有调度锁的 worker 执行
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+    def _execute(self, sql, params=()):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(sql, params)
+        finally:
+            conn.close()
+
+    def create(self, devices, oss_link, user, jump_host):
+        rollout_id = uuid.uuid4().hex[:12]
+        now = _now()
+        timings = json.dumps({"queued": now})
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO rollouts (rollout_id, oss_link, user, created_at) VALUES (?, ?, ?, ?)",
+                    (rollout_id, oss_link, user, now),
+                )
+                conn.executemany(
+                    "INSERT INTO rollout_devices (rollout_id, device, jump_host, phase, timings) "
+                    "VALUES (?, ?, ?, 'queued', ?)",
+                    [(rollout_id, dev, jump_host, timings) for dev in devices],
+                )
+        finally:
+            conn.close()
+        return rollout_id
+
+    def set_phase(self, task_id, phase, error=None, start_time=None, finished=None):
+        sets = ["phase = ?", "timings = json_set(timings, '$.' || ?, ?)"]
+        params = [phase, phase, _now()]
+        if phase in ("succeeded", "failed"):
+            sets.append("result = ?")
+            params.append(phase)
+        if error is not None:
+            sets.append("error = ?")
+            params.append(error)
+        if start_time is not None:
+            sets.append("start_time = ?")
+            params.append(start_time.isoformat())
+        if finished is not None:
+            sets.append("finished = ?")
+            params.append(int(finished))
+        params.append(task_id)
+        self._execute(f"UPDATE rollout_devices SET {', '.join(sets)} WHERE id = ?", params)
+
+    def mark_finished(self, task_id):
+        self._execute("UPDATE rollout_devices SET finished = 1 WHERE id = ?", (task_id,))
+
+    def count_active(self, jump_host):
+        placeholders = ",".join("?" * len(ACTIVE_PHASES))
+        rows = self._query(
+            f"SELECT COUNT(*) AS n FROM rollout_devices "
+            f"WHERE jump_host = ? AND finished = 0 AND phase IN ({placeholders})",
+            (jump_host, *ACTIVE_PHASES),
+        )
+        return rows[0]["n"]
+
+    def claim_queued(self, jump_host, limit, start_time):
+        """
+        按入队顺序取出至多 limit 台待下发设备，并在同一事务中标为 submitting、记录开始时间；
+        重启恢复时据此得到与任务记录一致的开始时间
+        """
+        if limit <= 0:
+            return []
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = [dict(row) for row in conn.execute(
+                    "SELECT d.*, r.oss_link, r.user FROM rollout_devices d "
+                    "JOIN rollouts r ON r.rollout_id = d.rollout_id "
+                    "WHERE d.jump_host = ? AND d.phase = 'queued' ORDER BY d.id LIMIT ?",
+                    (jump_host, limit),
+                ).fetchall()]
+                conn.executemany(
+                    "UPDATE rollout_devices SET phase = 'submitting', start_time = ?, "
+                    "timings = json_set(timings, '$.submitting', ?) WHERE id = ?",
+                    [(start_time.isoformat(), _now(), row["id"]) for row in rows],
+                )
+        finally:
+            conn.close()
+        for row in rows:
+            row["phase"] = "submitting"
+            row["start_time"] = start_time.isoformat()
+        return rows
+
+    def in_flight(self, jump_host):
+        """已开始但未收尾的设备，用于重启后恢复"""
+        placeholders = ",".join("?" * len(ACTIVE_PHASES))
+        return self._query(
+            f"SELECT d.*, r.oss_link, r.user FROM rollout_devices d "
+            f"JOIN rollouts r ON r.rollout_id = d.rollout_id "
+            f"WHERE d.jump_host = ? AND d.finished = 0 AND d.phase IN ({placeholders}) ORDER BY d.id",
+            (jump_host, *ACTIVE_PHASES),
+        )
+
+    def get(self, rollout_id):
+        rollouts = self._query("SELECT * FROM rollouts WHERE rollout_id = ?", (rollout_id,))
+        if not rollouts:
+            return None
+        devices = [
+            {
+                "device": row["device"],
+                "phase": row["phase"],
+                "result": row["result"],
+                "error": row["error"],
+                "timings": json.loads(row["timings"]),
+            }
+            for row in self._query(
+                "SELECT * FROM rollout_devices WHERE rollout_id = ? ORDER BY id", (rollout_id,)
+            )
+        ]
+        summary = {phase: 0 for phase in PHASES}
+        for state in devices:
+            summary[state["phase"]] += 1
+        return {**rollouts[0], "summary": summary, "devices": devices}
@@ -0,0 +1,200 @@
+import os
+import json
+import asyncio
+import functools
+import logging
+from datetime import datetime
+from .leader import FileLeaderLock
+
+SCHEDULE_INTERVAL = 2     # 调度循环间隔（秒），同一 worker 内的新请求会立即唤醒
+MAX_JOBS_PER_HOST = 16    # 每个跳板机同时进行的 OTA 任务上限
+
+
+def ota_job_name(device):
+    return f"ota-{device.lower()}"
+
+
+def recorded_start_time(row):
+    """
+    下发记录中的开始时间；旧版本写入的 submitting 记录没有 start_time，
+    退回到进入 submitting 阶段的时间
+    """
+    value = row["start_time"] or json.loads(row["timings"] or "{}").get("submitting")
+    return datetime.fromisoformat(value) if value else None
+
+
+class OtaScheduler:
+    """
+    持久化的 OTA 下发调度：
+    - 下发请求只写入 RolloutStore 排队，多个 worker 中仅持有文件锁的一个负责调度
+    - 每个跳板机同时进行的任务不超过 max_jobs，其余按入队顺序（FIFO）等待
+    - 成为调度者时先恢复上次未收尾的任务，已提交的继续 watch，Job 已不存在的直接收尾
+    - 存储访问（SQLite，可能等待其他 worker 的写锁）都在线程池中执行，不阻塞事件循环
+    submit / watch / finish / job_exists 由调用方注入：
+      submit(device, oss_link, user, start_time)           阻塞，在 executor 中执行
+      watch(job_name, start_time) -> (succeeded, pod_name, versions)  协程，只认 start_time 之后创建的 Job
+      finish(device, job_name, pod_name, start_time, end_time, succeeded, versions) -> cleaned  阻塞
+      job_exists(job_name) -> bool                         阻塞
+    """
+
+    def __init__(self, store, jump_host, submit, watch, finish, job_exists, executor,
+                 lock_path, max_jobs=MAX_JOBS_PER_HOST, interval=SCHEDULE_INTERVAL):
+        self.store = store
+        self.jump_host = jump_host
+        self.submit = submit
+        self.watch = watch
+        self.finish = finish
+        self.job_exists = job_exists
+        self.executor = executor
+        self.max_jobs = max_jobs
+        self.interval = interval
+        self._leader = FileLeaderLock(lock_path)
+        self._wakeup = None
+        self._loop_task = None
+        self._stopping = False
+        self._tasks = set()
+
+    @property
+    def is_leader(self):
+        return self._leader.held
+
+    def start(self):
+        """需在事件循环中调用（应用 startup 阶段）"""
+        if self._loop_task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        # 调度循环不取消，等它跑完当前一轮：取消只会中断等待，认领记录的存储调用仍在线程中继续，
+        # 认领到的记录就无人下发了
+        self._stopping = True
+        if self._loop_task is not None:
+            self._wakeup.set()
+            await self._loop_task
+            self._loop_task = None
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        # 未完成的任务保留在存储中，由下一个调度者恢复
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._leader.release()
+
+    async def enqueue(self, devices, oss_link, user):
+        rollout_id = await self._db(self.store.create, devices, oss_link, user, self.jump_host)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return rollout_id
+
+    async def stats(self):
+        return {
+            "leader": self.is_leader,
+            "jump_host": self.jump_host,
+            "max_jobs": self.max_jobs,
+            "active": await self._db(self.store.count_active, self.jump_host),
+            "tasks": len(self._tasks),
+        }
+
+    # ---------- 内部实现 ----------
+
+    async def _run_loop(self):
+        while not self._stopping:
+            try:
+                if self.is_leader or await self._acquire_lock():
+                    await self._dispatch()
+            except Exception as e:
+                logging.error(f"OTA 调度失败: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _db(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def _acquire_lock(self):
+        if not self._leader.try_acquire():
+            return False
+        logging.info(f"OTA 调度由进程 {os.getpid()} 接管")
+        await self._resume()
+        return True
+
+    async def _resume(self):
+        for row in await self._db(self.store.in_flight, self.jump_host):
+            self._spawn(self._recover(row))
+
+    async def _dispatch(self):
+        free = self.max_jobs - await self._db(self.store.count_active, self.jump_host)
+        # 开始时间与 submitting 阶段在同一事务中落盘，任务记录也使用同一时间（精确到秒）
+        start_time = datetime.now().replace(microsecond=0)
+        for row in await self._db(self.store.claim_queued, self.jump_host, free, start_time):
+            self._spawn(self._run(row, start_time))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        return task
+
+    def _on_task_done(self, task):
+        self._tasks.discard(task)
+        # 任务结束释放名额，立即调度下一个
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"OTA 任务异常: {task.exception()}")
+
+    async def _run(self, row, start_time):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor, self.submit, row["device"], row["oss_link"], row["user"], start_time
+            )
+        except Exception as e:
+            logging.error(f"Submit job for {row['device']} failed: {e}")
+            await self._db(self.store.set_phase, row["id"], "failed",
+                           error=str(getattr(e, "detail", e)), finished=True)
+            return
+        await self._db(self.store.set_phase, row["id"], "running")
+        await self._track(row, start_time)
+
+    async def _recover(self, row):
+        loop = asyncio.get_running_loop()
+        job_name = ota_job_name(row["device"])
+        start_time = recorded_start_time(row)
+        exists = await loop.run_in_executor(self.executor, self.job_exists, job_name)
+        if row["phase"] == "submitting":
+            if not exists:
+                # 下发中途退出且 Job 未创建，重新排队
+                await self._db(self.store.set_phase, row["id"], "queued")
+                return
+            await self._db(self.store.set_phase, row["id"], "running")
+        if exists:
+            # Job 仍在：重新 watch，已结束的 Job 会立即返回结果并重新读取完整日志，
+            # 与正常下发一样经 _track / _finish 收尾任务记录
+            await self._track(row, start_time)
+        else:
+            succeeded = row["result"] == "succeeded"
+            if row["phase"] == "running":
+                await self._db(self.store.set_phase, row["id"], "failed", error="Job 在调度中断期间被删除")
+            await self._finish(row, start_time, succeeded, None, None)
+
+    async def _track(self, row, start_time):
+        job_name = ota_job_name(row["device"])
+        succeeded, pod_name, versions = await self.watch(job_name, start_time)
+        await self._db(self.store.set_phase, row["id"], "succeeded" if succeeded else "failed")
+        await self._finish(row, start_time, succeeded, pod_name, versions)
+
+    async def _finish(self, row, start_time, succeeded, pod_name, versions):
+        loop = asyncio.get_running_loop()
+        cleaned = await loop.run_in_executor(
+            self.executor, self.finish, row["device"], ota_job_name(row["device"]), pod_name,
+            start_time, datetime.now(), succeeded, versions
+        )
+        if cleaned:
+            await self._db(self.store.set_phase, row["id"], "cleaned", finished=True)
+        else:
+            await self._db(self.store.mark_finished, row["id"])
@@ -0,0 +1,63 @@
+import json
+from fastapi.encoders import jsonable_encoder
+from kubernetes.client.rest import ApiException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_PAGE_SIZE = 500   # NDJSON 流式输出时每次向 apiserver 请求的条数
+
+
+def json_loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def json_dumps(obj):
+    return orjson.dumps(obj).decode() if orjson is not None else json.dumps(obj)
+
+
+def list_page(list_func, limit=None, continue_token=None, **kwargs):
+    """
+    单页 list，返回 (items, 下一页的 continue token)；limit 为空时不分页。
+    直接读取原始 JSON（_preload_content=False），items 为 dict，
+    不再反序列化成 V1Job 等模型对象，由调用方只取需要的字段
+    """
+    if limit:
+        kwargs["limit"] = limit
+    if continue_token:
+        kwargs["_continue"] = continue_token
+    resp = list_func(_preload_content=False, **kwargs)
+    try:
+        body = json_loads(resp.data)
+    finally:
+        resp.release_conn()
+    return body.get("items") or [], (body.get("metadata") or {}).get("continue") or None
+
+
+def iter_pages(list_func, limit=STREAM_PAGE_SIZE, continue_token=None, **kwargs):
+    """
+    按页依次 list，逐页返回 (items, continue token)，内存只占一页
+    """
+    while True:
+        items, continue_token = list_page(list_func, limit, continue_token, **kwargs)
+        yield items, continue_token
+        if not continue_token:
+            return
+
+
+def ndjson_lines(pages, first_page, convert):
+    """
+    把分页结果转换为 NDJSON，每页作为一个分块输出；
+    中途出错时输出一行 error，并附上最后一页的 continue token 便于续传
+    """
+    page = first_page
+    continue_token = None
+    try:
+        while page is not None:
+            items, continue_token = page
+            yield "".join(json_dumps(jsonable_encoder(convert(item))) + "\n" for item in items)
+            page = next(pages, None)
+    except ApiException as e:
+        yield json.dumps({"error": e.reason, "status": e.status, "continue": continue_token}) + "\n"
@@ -0,0 +1,164 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+
+LOG_DIR = "/tmp"
+LOG_BUFFER_SIZE = 64 * 1024        # 文件写缓冲（字节）
+LOG_MAX_BYTES = 50 * 1024 * 1024   # 单个日志文件上限，超过后轮转
+LOG_BACKUP_COUNT = 3               # 保留的轮转文件数
+RING_LINES = 2000                  # 每个 Pod 在内存中保留的最近行数
+MAX_CAPTURES = 200                 # 内存中保留的 Pod 日志数，超出后淘汰最早结束的
+SUBSCRIBER_QUEUE_SIZE = 1000       # 实时订阅者的队列长度，消费过慢时丢弃新行
+
+
+def _offer(queue, item):
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        pass
+
+
+def _end(queue):
+    """投递结束标记 None；队列已满时丢弃最早的行腾出位置，保证订阅者能收到结束"""
+    while True:
+        try:
+            queue.put_nowait(None)
+            return
+        except asyncio.QueueFull:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+
+
+class PodLogCapture:
+    """
+    单个 Pod 的日志捕获：写入带缓冲、按大小轮转的文件，
+    在内存环形缓冲中保留最近 RING_LINES 行，并把新行推送给实时订阅者；
+    通过 add_matcher 挂载的行处理函数会对每一行依次调用
+    """
+
+    def __init__(self, pod_name, job_name=None):
+        self.pod_name = pod_name
+        self.job_name = job_name
+        self.path = os.path.join(LOG_DIR, f"{pod_name}.log")
+        self.lines = deque(maxlen=RING_LINES)
+        self.closed = False
+        self.complete = False    # 日志流是否完整读到结尾
+        self.matchers = []
+        self._lock = threading.Lock()
+        self._subscribers = []   # [(loop, queue)]
+        self._file = open(self.path, "a", buffering=LOG_BUFFER_SIZE)
+        self._size = self._file.tell()
+
+    def add_matcher(self, matcher):
+        """matcher(line) 会在每行写入时被调用"""
+        with self._lock:
+            self.matchers.append(matcher)
+
+    def write(self, line):
+        with self._lock:
+            if self.closed:
+                return
+            for matcher in self.matchers:
+                try:
+                    matcher(line)
+                except Exception as e:
+                    logging.error(f"log matcher error for {self.pod_name}: {e}")
+            self.lines.append(line)
+            data = line + "\n"
+            self._file.write(data)
+            self._size += len(data.encode())
+            if self._size >= LOG_MAX_BYTES:
+                self._rotate()
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, line)
+
+    def close(self, complete=False):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.complete = complete
+            self._file.close()
+            subscribers, self._subscribers = self._subscribers, []
+        for loop, queue in subscribers:
+            # None 表示日志流结束
+            loop.call_soon_threadsafe(_end, queue)
+
+    def subscribe(self):
+        """
+        返回 (当前缓冲中的行, 后续新行的 asyncio.Queue)；日志已结束时队列中只有 None
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            backlog = list(self.lines)
+            if self.closed:
+                queue.put_nowait(None)
+            else:
+                self._subscribers.append((loop, queue))
+        return backlog, queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not queue]
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(LOG_BACKUP_COUNT - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if LOG_BACKUP_COUNT > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", buffering=LOG_BUFFER_SIZE)
+        self._size = 0
+
+
+class PodLogRegistry:
+    """
+    按 Pod 名保存日志捕获，供日志流写入和 tail 接口读取
+    """
+
+    def __init__(self, max_captures=MAX_CAPTURES):
+        self.max_captures = max_captures
+        self._lock = threading.Lock()
+        self._captures = OrderedDict()
+
+    def open(self, pod_name, job_name=None):
+        with self._lock:
+            capture = self._captures.get(pod_name)
+            if capture is None or capture.closed:
+                capture = PodLogCapture(pod_name, job_name)
+                self._captures[pod_name] = capture
+            self._captures.move_to_end(pod_name)
+            self._evict()
+            return capture
+
+    def get(self, pod_name):
+        with self._lock:
+            return self._captures.get(pod_name)
+
+    def find_by_job(self, job_name):
+        with self._lock:
+            for capture in reversed(self._captures.values()):
+                if capture.job_name == job_name:
+                    return capture
+        return None
+
+    def _evict(self):
+        # 只淘汰已结束的日志，正在写入的保留
+        for pod_name in list(self._captures):
+            if len(self._captures) <= self.max_captures:
+                break
+            if self._captures[pod_name].closed:
+                del self._captures[pod_name]
+
+
+log_registry = PodLogRegistry()
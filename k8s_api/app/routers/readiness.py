@@ -0,0 +1,73 @@
+import time
+from kubernetes import watch as k8s_watch
+from kubernetes.client.rest import ApiException
+
+# wait=true 的等待在同步路由中进行，整个等待期间占用一个线程池线程（默认 40 个），
+# 上限需足够短，长时间的就绪等待由客户端轮询 GET 接口完成
+WAIT_TIMEOUT = 30       # wait=true 时默认最长等待时间（秒）
+MAX_WAIT_TIMEOUT = 120
+
+
+def _desired(obj):
+    return obj.spec.replicas if obj.spec.replicas is not None else 1
+
+
+def _observed(obj):
+    # 控制器已处理最新的 spec，状态才可信
+    return (obj.status.observed_generation or 0) >= (obj.metadata.generation or 0)
+
+
+def deployment_ready(d):
+    status = d.status
+    if status is None or not _observed(d):
+        return False
+    want = _desired(d)
+    return (status.updated_replicas or 0) == want and (status.available_replicas or 0) == want
+
+
+def stateful_set_ready(s):
+    status = s.status
+    if status is None or not _observed(s):
+        return False
+    return (status.ready_replicas or 0) == _desired(s)
+
+
+def wait_ready(list_func, obj, is_ready, timeout=WAIT_TIMEOUT):
+    """
+    从 obj 的 resourceVersion 开始 watch 该对象（按名称过滤），直到 is_ready 成立、对象被删除或超时；
+    返回 (是否就绪, 最后看到的对象)
+    """
+    if is_ready(obj):
+        return True, obj
+    namespace, name = obj.metadata.namespace, obj.metadata.name
+    resource_version = obj.metadata.resource_version
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False, obj
+        w = k8s_watch.Watch()
+        kwargs = dict(
+            namespace=namespace,
+            field_selector=f"metadata.name={name}",
+            timeout_seconds=max(1, int(remaining)),
+        )
+        if resource_version:
+            kwargs["resource_version"] = resource_version
+        try:
+            for event in w.stream(list_func, **kwargs):
+                if event["type"] == "DELETED":
+                    return False, event["object"]
+                if event["type"] not in ("ADDED", "MODIFIED"):
+                    continue
+                obj = event["object"]
+                resource_version = obj.metadata.resource_version
+                if is_ready(obj):
+                    return True, obj
+        except ApiException as e:
+            if e.status != 410:
+                raise
+            # resourceVersion 过期，重新 watch 时会先收到当前状态
+            resource_version = None
+        finally:
+            w.stop()
@@ -1,23 +1,32 @@
 import io
 import re
 import yaml
-import paramiko
 import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query, Body, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from kubernetes import config as k8s_config, client as k8s_client, watch as k8s_watch
+from kubernetes import watch as k8s_watch
 from kubernetes.client.exceptions import ApiException
 
+from config import get_batch_v1_api, get_core_v1_api
 from .device_database import (
     update_usage_info,
     update_versions,
     insert_test_bench_task,
     finish_test_bench_task,
+    db_pool,
 )
-from .monitor import sync_bench_status
+from .monitor import BenchStatusReconciler
+from .ssh_pool import SSHTransportPool
+from .service_index import DeviceServiceIndex
+from .job_watch import JobWatchMux
+from .pod_logs import log_registry
+from .ota_rollouts import RolloutStore
+from .ota_scheduler import OtaScheduler, ota_job_name
 
 # ================== 配置与常量 ==================
 router = APIRouter(prefix="/v1alpha1/remote", tags=["RemoteOps"])
@@ -28,22 +37,34 @@ JUMP_PASS = "Byd@20220721"
 WORKDIR = "/home/jump/config"
 SCRIPT = "./generate_k8s_resources.sh"
 KUBE_NS = "device-system"
+SSH_POOL_SIZE = 8        # 到跳板机的持久连接数
+SSH_KEEPALIVE = 30       # keepalive 间隔（秒）
+LOG_DRAIN_TIMEOUT = 30   # Job 结束后等待日志流读完的最长时间（秒）
+OTA_SUBMIT_CONCURRENCY = 8  # OTA 下发的最大并发设备数
+OTA_STORE_PATH = "/var/tmp/k8s_api_ota.db"  # OTA 下发记录，重启后据此恢复
+MAX_OTA_JOBS_PER_HOST = 16  # 每个跳板机同时进行的 OTA 任务上限
+BENCH_LOCK_PATH = "/var/tmp/k8s_api_bench.lock"       # 设备状态后台同步的选主锁
+BENCH_SNAPSHOT_PATH = "/var/tmp/k8s_api_bench.json"   # 后台同步结果，供各 worker 读取
 
-k8s_config.load_kube_config()
-batch_v1 = k8s_client.BatchV1Api()
-core_v1 = k8s_client.CoreV1Api()
+service_index = DeviceServiceIndex(KUBE_NS)
+job_mux = JobWatchMux(KUBE_NS)
+ota_executor = ThreadPoolExecutor(max_workers=OTA_SUBMIT_CONCURRENCY, thread_name_prefix="ota")
+# 在应用 startup 中创建，见 start_ota_scheduler
+rollouts = None
+ota_scheduler = None
 
 # ================== 工具函数 ==================
 
+ssh_pool = SSHTransportPool(
+    JUMP_HOST, JUMP_PORT, JUMP_USER, JUMP_PASS,
+    size=SSH_POOL_SIZE, keepalive=SSH_KEEPALIVE
+)
+
 def ssh_connect():
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(
-        hostname=JUMP_HOST, port=JUMP_PORT,
-        username=JUMP_USER, password=JUMP_PASS,
-        look_for_keys=False, allow_agent=False
-    )
-    return client
+    """
+    从连接池借出一条到跳板机的连接，用完 close() 归还
+    """
+    return ssh_pool.connect()
 
 def run_remote_command(client, cmd):
     full = f"cd {WORKDIR} && {cmd}"
@@ -53,31 +74,22 @@ def run_remote_command(client, cmd):
     err = stderr.read().decode().strip()
     return exit_code, out, err
 
-def get_nodeport(client, svc_name):
-    cmd = f"kubectl -n {KUBE_NS} get svc {svc_name} -o jsonpath='{{.spec.ports[0].nodePort}}'"
-    code, out, err = run_remote_command(client, cmd)
-    if code != 0 or not out.isdigit():
-        raise HTTPException(500, f"获取 NodePort 失败: {err or out}")
-    return out
+def get_nodeport(svc_name):
+    try:
+        port = service_index.get_nodeport(svc_name)
+    except ApiException as e:
+        raise HTTPException(500, f"获取 NodePort 失败: {e.reason}")
+    if not port:
+        raise HTTPException(500, f"获取 NodePort 失败: {svc_name} 未分配 NodePort")
+    return str(port)
 
-def get_pod_node_ip(svc_name, namespace=KUBE_NS):
-    v1 = k8s_client.CoreV1Api()
-    svc = v1.read_namespaced_service(svc_name, namespace)
-    selector = svc.spec.selector
-    if not selector:
-        raise HTTPException(500, f"Service {svc_name} 没有 selector")
-    label_selector = ",".join([f"{k}={v}" for k, v in selector.items()])
-    pods = v1.list_namespaced_pod(namespace, label_selector=label_selector).items
-    if not pods:
-        raise HTTPException(500, f"未找到 {svc_name} 对应的 Pod")
-    node_name = pods[0].spec.node_name
-    if not node_name:
-        raise HTTPException(500, f"Pod 未调度到节点")
-    node = v1.read_node(node_name)
-    for addr in node.status.addresses:
-        if addr.type == "InternalIP":
-            return addr.address
-    raise HTTPException(500, f"未找到节点 {node_name} 的 InternalIP")
+def get_pod_node_ip(svc_name):
+    try:
+        return service_index.get_pod_node_ip(svc_name)
+    except LookupError as e:
+        raise HTTPException(500, str(e))
+    except ApiException as e:
+        raise HTTPException(500, f"获取节点 IP 失败: {e.reason}")
 
 def clean_device(device_name):
     client = ssh_connect()
@@ -98,20 +110,31 @@ def clean_device(device_name):
         connect_info=None,
     )
 
+class VersionMatcher:
+    """
+    从日志行中提取 SwVersion / SOC / MCU，可挂到日志流上随行增量提取
+    """
+
+    def __init__(self):
+        self.versions = {"SwVersion": None, "SOC": None, "MCU": None}
+
+    def __call__(self, line):
+        if "SwVersion=" in line:
+            self.versions["SwVersion"] = line.strip().split("=",1)[1]
+        if line.startswith("SOC="):
+            self.versions["SOC"] = line.strip().split("=",1)[1]
+        if line.startswith("MCU="):
+            self.versions["MCU"] = line.strip().split("=",1)[1]
+
 def parse_versions(pod_name, namespace=KUBE_NS):
-    sv, soc, mcu = None, None, None
+    matcher = VersionMatcher()
     try:
-        log = core_v1.read_namespaced_pod_log(name=pod_name, namespace=namespace)
+        log = get_core_v1_api().read_namespaced_pod_log(name=pod_name, namespace=namespace)
         for line in log.splitlines():
-            if "SwVersion=" in line:
-                sv = line.strip().split("=",1)[1]
-            if line.startswith("SOC="):
-                soc = line.strip().split("=",1)[1]
-            if line.startswith("MCU="):
-                mcu = line.strip().split("=",1)[1]
+            matcher(line)
     except Exception as e:
         print(f"Error reading pod log for {pod_name}: {e}")
-    return {"SwVersion": sv, "SOC": soc, "MCU": mcu}
+    return matcher.versions
 
 def call_generate_ota_job(client, device, oss_link):
     cmd = f"./generate_ota_job.sh {device} {oss_link}"
@@ -120,6 +143,31 @@ def call_generate_ota_job(client, device, oss_link):
         raise HTTPException(500, f"generate_ota_job.sh failed (exit {code}): {err or out}")
     return out
 
+def load_monitored_devices():
+    client = ssh_connect()
+    cfg_path = f"{WORKDIR}/devices_monitor.csv"
+    try:
+        sftp = client.open_sftp()
+        with sftp.file(cfg_path, "r") as f:
+            lines = f.readlines()
+        sftp.close()
+    finally:
+        client.close()
+    devices = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        device = line.split(",")[0].strip()
+        if device:
+            devices.append(device)
+    return devices
+
+# 多个 worker 中只有持锁的一个在后台同步设备状态，快照经文件共享
+bench_reconciler = BenchStatusReconciler(
+    load_monitored_devices, lock_path=BENCH_LOCK_PATH, snapshot_path=BENCH_SNAPSHOT_PATH
+)
+
 def admission_review_validate(device, env_config):
     admission_review = {
         "apiVersion": "admission.k8s.io/v1",
@@ -226,7 +274,7 @@ def ssh_to_dev(req: DeviceMoreInfoRequest = Body(...)):
         if code != 0:
             raise HTTPException(500, f"Failed (exit {code}): {err or out}")
         svc_dev = f"{req.device.lower()}-dc-proxy-svc"
-        dev_port = get_nodeport(client, svc_dev)
+        dev_port = get_nodeport(svc_dev)
         ssh_dev_cmd = f"ssh -p {dev_port} root@{JUMP_HOST}"
         connect_info = f"ssh_dev: {ssh_dev_cmd}"
         update_usage_info(
@@ -261,8 +309,8 @@ def ssh_to_env(req: SSHEnvRequest = Body(...)):
             raise HTTPException(500, f"Failed (exit {code}): {err or out}")
         dev_svc = f"{req.device.lower()}-dc-proxy-svc"
         env_svc = f"{req.device.lower()}-env-svc"
-        dev_port = get_nodeport(client, dev_svc)
-        env_port = get_nodeport(client, env_svc)
+        dev_port = get_nodeport(dev_svc)
+        env_port = get_nodeport(env_svc)
         dev_node_ip = get_pod_node_ip(dev_svc)
         env_node_ip = get_pod_node_ip(env_svc)
         ssh_dev_cmd = f"ssh -p {dev_port} root@{dev_node_ip}"
@@ -279,30 +327,30 @@ def ssh_to_env(req: SSHEnvRequest = Body(...)):
     finally:
         client.close()
 
+@router.get("/stats")
+def remote_stats():
+    return {
+        "service_index": service_index.stats(),
+        "ssh_pool": ssh_pool.stats(),
+        "mysql_pool": db_pool.stats(),
+    }
+
 @router.post("/sync_devices_status")
 def sync_devices_status():
-    client = ssh_connect()
-    cfg_path = f"{WORKDIR}/devices_monitor.csv"
-    results = []
-    try:
-        sftp = client.open_sftp()
-        with sftp.file(cfg_path, "r") as f:
-            lines = f.readlines()
-        sftp.close()
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            device = line.split(",")[0].strip()
-            if device:
-                try:
-                    res = sync_bench_status(device)
-                except Exception as e:
-                    res = {"device": device, "error": str(e)}
-                results.append(res)
-    finally:
-        client.close()
-    return {"results": results}
+    return {"results": bench_reconciler.reconcile_once()}
+
+@router.get("/devices_status")
+def devices_status():
+    """
+    直接从内存返回后台同步得到的设备状态
+    """
+    return bench_reconciler.snapshot()
+
+def running_ota_scheduler() -> OtaScheduler:
+    """调度器在 startup 中创建、shutdown 时停止，不在运行期间返回 503"""
+    if ota_scheduler is None:
+        raise HTTPException(503, "OTA 调度器未运行")
+    return ota_scheduler
 
 @router.post("/ota_jobs/submit_async")
 async def ota_jobs_submit_async(
@@ -311,78 +359,132 @@ async def ota_jobs_submit_async(
     user: str = Body("", embed=True),
     background_tasks: BackgroundTasks = None
 ):
+    """
+    立即返回 rollout_id，设备写入持久化队列后由调度者按跳板机并发上限依次下发，
+    进度通过 /ota_jobs/rollouts/{rollout_id} 查询
+    """
     device_list = [d.strip() for d in devices.split(",") if d.strip()]
-    succeed, failed = [], []
-    for dev in device_list:
+    rollout_id = await running_ota_scheduler().enqueue(device_list, oss_link, user)
+    return {"rollout_id": rollout_id, "devices": device_list}
+
+@router.get("/ota_jobs/rollouts/{rollout_id}")
+def ota_rollout_status(rollout_id: str):
+    running_ota_scheduler()
+    rollout = rollouts.get(rollout_id)
+    if rollout is None:
+        raise HTTPException(404, f"未找到下发记录 {rollout_id}")
+    return rollout
+
+@router.get("/ota_jobs/scheduler")
+async def ota_scheduler_stats():
+    return await running_ota_scheduler().stats()
+
+@router.get("/ota_jobs/{device}/logs")
+async def ota_job_logs(
+    device: str,
+    follow: bool = Query(True, description="是否持续推送新日志"),
+):
+    """
+    以 SSE 形式从内存缓冲输出设备 OTA 任务的日志，不再访问 apiserver
+    """
+    capture = log_registry.find_by_job(ota_job_name(device))
+    if capture is None:
+        raise HTTPException(404, f"未找到设备 {device} 的 OTA 日志")
+
+    async def events():
+        backlog, queue = capture.subscribe()
         try:
-            await submit_jobs([dev], oss_link, user)
-            succeed.append(dev)
-        except Exception as e:
-            print(f"Submit job for {dev} failed: {e}")
-            failed.append(dev)
-    return {"succeed": succeed, "failed": failed}
+            for line in backlog:
+                yield f"data: {line}\n\n"
+            if not follow:
+                return
+            while True:
+                line = await queue.get()
+                if line is None:
+                    yield "event: end\ndata: \n\n"
+                    break
+                yield f"data: {line}\n\n"
+        finally:
+            capture.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 # ================== 业务流程 ==================
 
-async def submit_jobs(devices: List[str], oss_link: str, user: str):
+def submit_job(dev: str, oss_link: str, user: str, start_time: datetime):
+    """
+    阻塞执行单台设备的下发（SSH、NodePort 查询、MySQL），在 ota_executor 中运行；
+    start_time 由调度者在下发前记录，任务记录与之一致，重启恢复后据此收尾
+    """
     client = ssh_connect()
     try:
-        for dev in devices:
-            call_generate_ota_job(client, dev, oss_link)
-            svc_dev = f"{dev.lower()}-dc-proxy-svc"
-            dev_port = get_nodeport(ssh_connect(), svc_dev)
-            ssh_dev_cmd = f"ssh -p {dev_port} root@{JUMP_HOST}"
-            connect_info = f"ssh_dev: {ssh_dev_cmd}"
-            update_usage_info(
-                device_name=dev,
-                userinfo=user,
-                usage_info="task",
-                environment_purpose="",
-                connect_info=connect_info
-            )
-            job_name = f"ota-{dev.lower()}"
-            start_time = datetime.now()
-            insert_test_bench_task(
-                device_name=dev,
-                task_name=job_name,
-                task_type="OTA",
-                user=user,
-                start_time=start_time,
-                result="执行中"
-            )
-            asyncio.create_task(watch_job(job_name, KUBE_NS, dev, oss_link, start_time, user))
+        call_generate_ota_job(client, dev, oss_link)
     finally:
         client.close()
+    svc_dev = f"{dev.lower()}-dc-proxy-svc"
+    dev_port = get_nodeport(svc_dev)
+    ssh_dev_cmd = f"ssh -p {dev_port} root@{JUMP_HOST}"
+    connect_info = f"ssh_dev: {ssh_dev_cmd}"
+    update_usage_info(
+        device_name=dev,
+        userinfo=user,
+        usage_info="task",
+        environment_purpose="",
+        connect_info=connect_info
+    )
+    job_name = ota_job_name(dev)
+    insert_test_bench_task(
+        device_name=dev,
+        task_name=job_name,
+        task_type="OTA",
+        user=user,
+        start_time=start_time,
+        result="执行中"
+    )
 
-async def watch_job(job_name, ns, device, oss, start_time, user):
-    label_selector = f"job-name={job_name}"
-    pods = core_v1.list_namespaced_pod(ns, label_selector=label_selector).items
-    while not pods:
-        await asyncio.sleep(1)
-        pods = core_v1.list_namespaced_pod(ns, label_selector=label_selector).items
-    pod_name = pods[0].metadata.name
-    log_task = asyncio.create_task(stream_logs(ns, pod_name))
+async def watch_job(job_name, start_time=None, ns=KUBE_NS):
+    """
+    等待本次下发（start_time 之后创建）的 Job 结束并跟随日志提取版本，
+    返回 (是否成功, Pod 名, 版本信息)；日志流未完整读完时版本信息为 None
+    """
+    # 由共享 watch 推送事件，不再轮询 Pod 与 Job；同名的旧 Job / Pod 按 uid 排除
+    uid = await job_mux.wait_created(job_name, start_time)
+    pod_name = await job_mux.wait_pod(job_name, uid)
     succeeded = False
-    try:
-        while True:
-            job = batch_v1.read_namespaced_job(job_name, ns)
-            if job.status.succeeded:
-                succeeded = True
-                break
-            if job.status.failed and job.status.failed > 0:
-                break
-            await asyncio.sleep(2)
-    finally:
-        # 任务结束时，主动取消日志流
-        log_task.cancel()
+    log_complete = False
+    matcher = VersionMatcher()
+    if pod_name:
+        log_task = asyncio.create_task(stream_logs(ns, pod_name, job_name, matchers=[matcher]))
         try:
-            await log_task
-        except asyncio.CancelledError:
+            succeeded = await job_mux.wait_finished(job_name, uid)
+            # Job 结束后容器已退出，日志流随即结束；超时则放弃增量结果
+            log_complete = await asyncio.wait_for(log_task, LOG_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
             pass
-    end_time = datetime.now()
-    # 拉取一次完整日志
-    if succeeded:
-        version_info = parse_versions(pod_name)
+        finally:
+            log_task.cancel()
+            try:
+                await log_task
+            except asyncio.CancelledError:
+                pass
+    return succeeded, pod_name, matcher.versions if log_complete else None
+
+def job_exists(job_name, ns=KUBE_NS):
+    try:
+        get_batch_v1_api().read_namespaced_job(name=job_name, namespace=ns)
+        return True
+    except ApiException as e:
+        if e.status == 404:
+            return False
+        raise
+
+def finish_job(device, job_name, pod_name, start_time, end_time, succeeded, versions):
+    """
+    阻塞执行任务结束后的版本更新、任务记录与设备清理，返回是否清理成功
+    """
+    if succeeded and (versions is not None or pod_name):
+        # 日志流中断时才回退为拉取一次完整日志
+        version_info = versions if versions is not None else parse_versions(pod_name)
         update_versions(device, version_info.get("SOC"), version_info.get("MCU"), version_info.get("SwVersion"))
     result = "成功" if succeeded else "失败"
     finish_test_bench_task(
@@ -394,24 +496,61 @@ async def watch_job(job_name, ns, device, oss, start_time, user):
     )
     try:
         clean_device(device)
+        return True
     except Exception as e:
         print(f"Error cleaning device {device} after job: {e}")
+        return False
 
-async def stream_logs(namespace, pod_name):
+async def stream_logs(namespace, pod_name, job_name=None, matchers=()):
+    """
+    跟随 Pod 日志写入日志捕获，完整读到结尾返回 True，中断返回 False
+    """
     loop = asyncio.get_running_loop()
+    capture = log_registry.open(pod_name, job_name)
+    for matcher in matchers:
+        capture.add_matcher(matcher)
     def log_worker():
         w = k8s_watch.Watch()
-        for line in w.stream(core_v1.read_namespaced_pod_log,
+        for line in w.stream(get_core_v1_api().read_namespaced_pod_log,
                              name=pod_name, namespace=namespace, follow=True):
-            print(f"[{pod_name}] {line}")
-            with open(f"/tmp/{pod_name}.log", "a") as f:
-                f.write(line + "\n")
+            if capture.closed:
+                w.stop()
+                return False
+            capture.write(line)
+        return True
+    complete = False
     try:
-        await loop.run_in_executor(None, log_worker)
-    except ApiException as e:
-        body_str = e.body.decode() if isinstance(e.body, bytes) else str(e.body)
-        if e.status == 400 and "ContainerCreating" in body_str:
-            await asyncio.sleep(1)
-            await stream_logs(namespace, pod_name)
-        else:
-            print(f"Error streaming logs for {pod_name}: {e}")
\ No newline at end of file
+        while True:
+            try:
+                complete = await loop.run_in_executor(None, log_worker)
+                break
+            except ApiException as e:
+                body_str = e.body.decode() if isinstance(e.body, bytes) else str(e.body)
+                if e.status == 400 and "ContainerCreating" in body_str:
+                    await asyncio.sleep(1)
+                    continue
+                print(f"Error streaming logs for {pod_name}: {e}")
+                break
+    except Exception as e:
+        print(f"Error streaming logs for {pod_name}: {e}")
+    finally:
+        capture.close(complete)
+    return complete
+
+def start_ota_scheduler():
+    """打开下发记录并启动调度循环，需在事件循环中调用（应用 startup 阶段）"""
+    global rollouts, ota_scheduler
+    if ota_scheduler is not None:
+        return
+    rollouts = RolloutStore(OTA_STORE_PATH)
+    ota_scheduler = OtaScheduler(
+        rollouts, JUMP_HOST, submit_job, watch_job, finish_job, job_exists, ota_executor,
+        lock_path=f"{OTA_STORE_PATH}.lock", max_jobs=MAX_OTA_JOBS_PER_HOST
+    )
+    ota_scheduler.start()
+
+async def stop_ota_scheduler():
+    global ota_scheduler
+    scheduler, ota_scheduler = ota_scheduler, None
+    if scheduler is not None:
+        await scheduler.stop()
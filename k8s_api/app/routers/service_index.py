@@ -0,0 +1,208 @@
+import time
+import threading
+from config import get_core_v1_api
+from .informer import shared_informer
+
+# 首次查询时等待缓存同步的最长时间（秒），超时直接查 API
+SYNC_TIMEOUT = 5
+
+
+def selector_matches(selector, labels):
+    labels = labels or {}
+    return all(labels.get(k) == v for k, v in selector.items())
+
+
+class DeviceServiceIndex:
+    """
+    设备命名空间内 Service 的本地索引，由 service / pod / node 的 list + watch 维护：
+    - Service -> NodePort
+    - Service -> 后端 Pod -> 节点 -> InternalIP
+    查询直接命中内存，未命中时回退到 API
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._selectors = {}   # service -> selector
+        self._pods = {}        # pod -> (labels, node_name, phase)
+        self._label_pods = {}  # (key, value) -> 带该标签的 pod 集合
+        self._label_svcs = {}  # (key, value) -> selector 含该标签的 service 集合
+        self._svc_pod = {}     # service -> 后端 pod
+        self._pod_svcs = {}    # pod -> 以其为后端的 service 集合
+        self._node_ip = {}     # node -> InternalIP
+        self._hits = 0
+        self._misses = 0
+        self._informers = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def core_v1(self):
+        # 首次使用时才加载 kube 配置
+        return get_core_v1_api()
+
+    def start(self):
+        with self._start_lock:
+            if self._informers is not None:
+                return
+            services = shared_informer(self.core_v1.list_namespaced_service, namespace=self.namespace)
+            pods = shared_informer(self.core_v1.list_namespaced_pod, namespace=self.namespace)
+            nodes = shared_informer(self.core_v1.list_node)
+            # 处理器注册完成后再发布，并发的查询不会在空索引上判定已同步
+            nodes.add_handler(self._on_node)
+            pods.add_handler(self._on_pod)
+            services.add_handler(self._on_service)
+            self._informers = (services, pods, nodes)
+
+    def wait_synced(self, timeout=None):
+        self.start()
+        if timeout is None:
+            return all(inf.wait_synced() for inf in self._informers)
+        # 三个 informer 共用同一个截止时间
+        deadline = time.monotonic() + timeout
+        return all(inf.wait_synced(max(0.0, deadline - time.monotonic())) for inf in self._informers)
+
+    # ---------- NodePort ----------
+
+    def get_service(self, svc_name):
+        self.start()
+        svc = None
+        services = self._informers[0]
+        if services.wait_synced(SYNC_TIMEOUT):
+            svc = services.get(f"{self.namespace}/{svc_name}")
+        if svc is None:
+            # 刚创建、watch 尚未送达的 Service
+            svc = self.core_v1.read_namespaced_service(svc_name, self.namespace)
+        return svc
+
+    def get_nodeport(self, svc_name):
+        svc = self.get_service(svc_name)
+        ports = svc.spec.ports or []
+        return ports[0].node_port if ports else None
+
+    # ---------- 节点 IP ----------
+
+    def get_pod_node_ip(self, svc_name):
+        """
+        返回 Service 后端 Pod 所在节点的 InternalIP，索引未命中时按原流程查询 API；
+        查询失败抛出 LookupError
+        """
+        self.wait_synced(SYNC_TIMEOUT)
+        with self._lock:
+            pod = self._svc_pod.get(svc_name)
+            node_name = self._pods[pod][1] if pod else None
+            ip = self._node_ip.get(node_name) if node_name else None
+            if ip:
+                self._hits += 1
+                return ip
+            self._misses += 1
+        return self._lookup_node_ip(svc_name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "services": len(self._svc_pod),
+                "nodes": len(self._node_ip),
+            }
+
+    def _lookup_node_ip(self, svc_name):
+        svc = self.core_v1.read_namespaced_service(svc_name, self.namespace)
+        selector = svc.spec.selector
+        if not selector:
+            raise LookupError(f"Service {svc_name} 没有 selector")
+        label_selector = ",".join([f"{k}={v}" for k, v in selector.items()])
+        pods = self.core_v1.list_namespaced_pod(self.namespace, label_selector=label_selector).items
+        if not pods:
+            raise LookupError(f"未找到 {svc_name} 对应的 Pod")
+        node_name = pods[0].spec.node_name
+        if not node_name:
+            raise LookupError(f"Pod 未调度到节点")
+        node = self.core_v1.read_node(node_name)
+        for addr in node.status.addresses:
+            if addr.type == "InternalIP":
+                return addr.address
+        raise LookupError(f"未找到节点 {node_name} 的 InternalIP")
+
+    # ---------- 事件处理 ----------
+
+    def _on_service(self, event_type, svc, old):
+        name = svc.metadata.name
+        with self._lock:
+            prev = self._selectors.pop(name, None)
+            if prev:
+                self._unindex(self._label_svcs, prev, name)
+            if event_type == "DELETED" or not svc.spec.selector:
+                self._set_backend(name, None)
+                return
+            self._selectors[name] = svc.spec.selector
+            self._index(self._label_svcs, svc.spec.selector, name)
+            self._resolve(name)
+
+    def _on_pod(self, event_type, pod, old):
+        name = pod.metadata.name
+        labels = pod.metadata.labels or {}
+        with self._lock:
+            prev = self._pods.pop(name, None)
+            if prev:
+                self._unindex(self._label_pods, prev[0], name)
+            if event_type != "DELETED":
+                self._pods[name] = (labels, pod.spec.node_name, pod.status.phase)
+                self._index(self._label_pods, labels, name)
+            # 只重新解析以该 Pod 为后端的、以及 selector 可能匹配该 Pod 的 Service
+            affected = set(self._pod_svcs.get(name, ()))
+            for pair in labels.items():
+                affected.update(
+                    svc_name for svc_name in self._label_svcs.get(pair, ())
+                    if selector_matches(self._selectors[svc_name], labels)
+                )
+            for svc_name in affected:
+                self._resolve(svc_name)
+
+    def _on_node(self, event_type, node, old):
+        name = node.metadata.name
+        with self._lock:
+            if event_type == "DELETED":
+                self._node_ip.pop(name, None)
+                return
+            for addr in (node.status.addresses if node.status else None) or []:
+                if addr.type == "InternalIP":
+                    self._node_ip[name] = addr.address
+                    break
+
+    @staticmethod
+    def _index(index, labels, name):
+        for pair in labels.items():
+            index.setdefault(pair, set()).add(name)
+
+    @staticmethod
+    def _unindex(index, labels, name):
+        for pair in labels.items():
+            names = index.get(pair)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del index[pair]
+
+    def _set_backend(self, svc_name, pod):
+        prev = self._svc_pod.pop(svc_name, None)
+        if prev is not None:
+            svcs = self._pod_svcs.get(prev)
+            if svcs is not None:
+                svcs.discard(svc_name)
+                if not svcs:
+                    del self._pod_svcs[prev]
+        if pod is not None:
+            self._svc_pod[svc_name] = pod
+            self._pod_svcs.setdefault(pod, set()).add(svc_name)
+
+    def _resolve(self, svc_name):
+        # 从 selector 中最少 Pod 的标签出发，在已调度的匹配 Pod 中优先选 Running 的
+        selector = self._selectors[svc_name]
+        smallest = min((self._label_pods.get(pair, ()) for pair in selector.items()), key=len)
+        candidates = []
+        for pod in smallest:
+            labels, node_name, phase = self._pods[pod]
+            if node_name and selector_matches(selector, labels):
+                candidates.append((phase != "Running", pod))
+        self._set_backend(svc_name, min(candidates)[1] if candidates else None)
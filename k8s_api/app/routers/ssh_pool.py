@@ -0,0 +1,183 @@
+import time
+import socket
+import logging
+import threading
+import paramiko
+
+
+class PooledSSHClient:
+    """
+    从连接池借出的 SSH 客户端，提供与 paramiko.SSHClient 相同的 exec_command / open_sftp，
+    close() 只把 Transport 归还给连接池，不断开底层连接
+    """
+
+    def __init__(self, pool, transport):
+        self._pool = pool
+        self._transport = transport
+
+    def exec_command(self, command, timeout=None):
+        try:
+            chan = self._transport.open_session(timeout=timeout)
+        except (paramiko.SSHException, EOFError, OSError):
+            # 连接已失效，重连后重试一次
+            self._reconnect()
+            chan = self._transport.open_session(timeout=timeout)
+        chan.settimeout(timeout)
+        chan.exec_command(command)
+        stdin = chan.makefile_stdin("wb")
+        stdout = chan.makefile("r")
+        stderr = chan.makefile_stderr("r")
+        return stdin, stdout, stderr
+
+    def open_sftp(self):
+        try:
+            return paramiko.SFTPClient.from_transport(self._transport)
+        except (paramiko.SSHException, EOFError, OSError):
+            self._reconnect()
+            return paramiko.SFTPClient.from_transport(self._transport)
+
+    def _reconnect(self):
+        # 重连失败时连接池已回收该名额，置空后 close() 不再归还
+        transport, self._transport = self._transport, None
+        self._transport = self._pool.reconnect(transport)
+
+    def close(self):
+        if self._transport is not None:
+            self._pool.release(self._transport)
+            self._transport = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SSHTransportPool:
+    """
+    跳板机的持久 SSH 连接池：最多 size 条已认证的 Transport，
+    开启 keepalive，借出前做健康检查，失效连接自动重建
+    """
+
+    def __init__(self, hostname, port, username, password,
+                 size=8, keepalive=30, connect_timeout=10, acquire_timeout=60):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle = []        # [(transport, 归还时间)]
+        self._total = 0        # 已建立（含借出）的连接数
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def connect(self) -> PooledSSHClient:
+        return PooledSSHClient(self, self.acquire())
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            transport = None
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"SSH 连接池已关闭: {self.hostname}")
+                if self._idle:
+                    transport, released_at = self._idle.pop()
+                elif self._total < self.size:
+                    self._total += 1
+                    break
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise TimeoutError(f"等待 SSH 连接超时: {self.hostname}")
+                    continue
+            # 健康检查可能有网络 I/O，在锁外进行；检查期间该连接已从空闲列表取出，不会被其他线程借走
+            if self._healthy(transport, released_at):
+                return transport
+            self._discard(transport)
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, transport):
+        with self._cond:
+            # 连接池关闭后归还的连接直接断开
+            keep = transport.is_active() and not self._closed
+            if keep:
+                self._idle.append((transport, time.monotonic()))
+                self._cond.notify()
+        if not keep:
+            self._discard(transport)
+
+    def reconnect(self, transport):
+        """
+        关闭失效的 Transport，并在同一个名额上重新建立连接；
+        失败时释放该名额，调用方不能再 release 原 Transport
+        """
+        try:
+            transport.close()
+        except Exception:
+            pass
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def close(self):
+        """断开空闲连接；借出中的连接在归还时断开"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for transport, _ in idle:
+            self._discard(transport)
+
+    def stats(self):
+        with self._cond:
+            return {"size": self.size, "open": self._total, "idle": len(self._idle)}
+
+    # ---------- 内部实现 ----------
+
+    def _open(self):
+        sock = socket.create_connection((self.hostname, self.port), timeout=self.connect_timeout)
+        transport = paramiko.Transport(sock)
+        try:
+            transport.start_client(timeout=self.connect_timeout)
+            transport.auth_password(self.username, self.password)
+        except Exception:
+            transport.close()
+            raise
+        transport.set_keepalive(self.keepalive)
+        logging.info(f"SSH connection established: {self.hostname}:{self.port}")
+        return transport
+
+    def _healthy(self, transport, released_at):
+        if not transport.is_active():
+            return False
+        if time.monotonic() - released_at < self.keepalive:
+            return True
+        # 空闲较久的连接先探测一次
+        try:
+            transport.send_ignore()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, transport):
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+        try:
+            transport.close()
+        except Exception:
+            pass
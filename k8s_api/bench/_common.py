@@ -0,0 +1,34 @@
+"""
+基准脚本共用的工具：把 app 目录加入 sys.path（与 main.py 的运行方式一致），以及计时函数。
+脚本在 k8s_api/bench 下直接运行，例如 python bench/bench_fit.py
+"""
+import os
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+def best_of(func, repeat=3, number=1):
+    """执行 repeat 轮、每轮调用 number 次，返回单次调用的最短耗时（秒）与最后一次的返回值"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best, result
+
+
+def fmt_us(seconds):
+    return f"{seconds * 1e6:.0f}us"
+
+
+def fmt_ns(seconds):
+    return f"{seconds * 1e9:.0f}ns"
+
+
+def fmt_ms(seconds):
+    return f"{seconds * 1e3:.0f}ms"
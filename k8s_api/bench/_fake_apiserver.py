@@ -0,0 +1,91 @@
+"""
+基准用的最小 apiserver：只实现 create_app 用到的接口（namespace 的 list/watch/read/create、
+Service 读取，以及任意对象的 apply PATCH，原样返回请求体并为 Service 补上 nodePort），
+不校验、不持久化
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+NODE_PORT = 30080
+WATCH_HOLD = 5   # watch 请求保持的秒数，之后返回空结果让客户端重连
+
+KUBECONFIG_TEMPLATE = """apiVersion: v1
+kind: Config
+clusters:
+- cluster: {{server: "http://127.0.0.1:{port}"}}
+  name: bench
+contexts:
+- context: {{cluster: bench, user: bench}}
+  name: bench
+current-context: bench
+users:
+- name: bench
+  user: {{token: bench}}
+"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 65536   # 整个响应一次写出，避免 Nagle + delayed ACK 拖慢每个请求
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, obj, code=200):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/api/v1/namespaces":
+            if "watch=" in query:
+                time.sleep(WATCH_HOLD)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            return self._send({"kind": "NamespaceList", "apiVersion": "v1",
+                               "metadata": {"resourceVersion": "1"}, "items": []})
+        m = re.fullmatch(r"/api/v1/namespaces/([^/]+)/services/([^/]+)", path)
+        if m:
+            return self._send({"kind": "Service", "apiVersion": "v1",
+                               "metadata": {"name": m[2], "namespace": m[1]},
+                               "spec": {"ports": [{"port": 80, "nodePort": NODE_PORT}]}})
+        m = re.fullmatch(r"/api/v1/namespaces/([^/]+)", path)
+        if m:
+            return self._send({"kind": "Namespace", "apiVersion": "v1", "metadata": {"name": m[1]}})
+        self._send({"kind": "Status", "code": 404}, 404)
+
+    def do_POST(self):
+        self._send(self._read_body(), 201)
+
+    def do_PATCH(self):
+        body = self._read_body()
+        if body.get("kind") == "Service":
+            for port in body.get("spec", {}).get("ports", []):
+                port.setdefault("nodePort", NODE_PORT)
+        self._send(body)
+
+
+def serve():
+    """在后台线程启动，返回 (server, kubeconfig 路径)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    fd, path = tempfile.mkstemp(prefix="bench-kubeconfig-", suffix=".yaml")
+    with os.fdopen(fd, "w") as f:
+        f.write(KUBECONFIG_TEMPLATE.format(port=server.server_address[1]))
+    return server, path
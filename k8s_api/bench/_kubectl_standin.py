@@ -0,0 +1,44 @@
+"""
+找不到 kubectl 时 bench_apply 使用的替身：`python _kubectl_standin.py apply -f FILE`，
+读取 KUBECONFIG 中的 server，按文档逐个发送 server-side apply PATCH，与 kubectl apply
+最终发出的写请求相同；不含 kubectl 的 discovery、OpenAPI 下载与 Go 进程启动，
+因此只是改动前路径的下限
+"""
+import json
+import os
+import re
+import sys
+from http.client import HTTPConnection
+import yaml
+
+PATHS = {
+    "Service": "/api/v1/namespaces/{namespace}/services/{name}",
+    "Deployment": "/apis/apps/v1/namespaces/{namespace}/deployments/{name}",
+    "StatefulSet": "/apis/apps/v1/namespaces/{namespace}/statefulsets/{name}",
+}
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] != ["apply"] or "-f" not in args:
+        sys.exit("usage: _kubectl_standin.py apply -f FILE")
+    with open(args[args.index("-f") + 1]) as f:
+        docs = [d for d in yaml.safe_load_all(f) if d]
+    with open(os.environ["KUBECONFIG"]) as f:
+        host, port = re.search(r"http://([^:\"]+):(\d+)", f.read()).groups()
+    conn = HTTPConnection(host, int(port))
+    for doc in docs:
+        meta = doc["metadata"]
+        path = PATHS[doc["kind"]].format(namespace=meta["namespace"], name=meta["name"])
+        conn.request("PATCH", f"{path}?fieldManager=kubectl&force=true", json.dumps(doc),
+                     {"Content-Type": "application/apply-patch+yaml"})
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status >= 300:
+            sys.exit(f"{doc['kind']}/{meta['name']}: HTTP {resp.status}")
+        print(f"{doc['kind'].lower()}/{meta['name']} serverside-applied")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
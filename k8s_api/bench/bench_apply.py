@@ -0,0 +1,98 @@
+"""
+create_app 的吞吐（请求/秒）：改动前的「渲染模板 → 写临时文件 → kubectl apply -f → 读 Service」
+对比进程内 server-side apply。两条路径挂在同一个 FastAPI 应用上、都经过 TestClient，
+连接本地的假 apiserver（_fake_apiserver.py），只衡量本服务自身的开销。
+
+kubectl 通过环境变量 KUBECTL 指定（默认 kubectl）；找不到时使用 _kubectl_standin.py：
+一个 Python 进程，逐文档发送与 kubectl apply 相同的 apply PATCH，但不含 kubectl 的
+discovery 与 OpenAPI 请求，此时「改动前」是真实 kubectl 的上限。
+
+    python bench/bench_apply.py [--requests 300]
+"""
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import _common  # noqa: F401  把 app 目录加入 sys.path
+import _fake_apiserver
+
+BODY = {"name": "my-webapp", "image": "nginx", "namespace": "bench", "replicas": 2,
+        "env": {"A": "1"}, "node_port": 30080}
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_kubectl_standin.py")
+
+
+def legacy_create_app(kubectl, core_v1, template, namespace, spec):
+    """改动前 create_app 的主体（命名空间检查、临时文件 + kubectl apply、回读 nodePort）"""
+    core_v1.read_namespace(namespace)
+    yaml_text = template.render(**spec)
+    with tempfile.NamedTemporaryFile("w+", suffix=".yaml", delete=False) as f:
+        f.write(yaml_text)
+        path = f.name
+    subprocess.run(kubectl + ["apply", "-f", path], check=True, capture_output=True, text=True)
+    svc = core_v1.read_namespaced_service(f"{spec['name']}-svc", namespace)
+    return {"service": f"{spec['name']}-svc", "nodePort": svc.spec.ports[0].node_port}
+
+
+def rate(func, count):
+    func()   # 预热：建立连接、同步命名空间缓存
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    server, kubeconfig = _fake_apiserver.serve()
+    os.environ["KUBECONFIG"] = kubeconfig
+    # 以下模块会读取 KUBECONFIG，需在设置之后导入
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from config import get_core_v1_api
+    from routers import webapps
+
+    kubectl = os.environ.get("KUBECTL", "kubectl")
+    if shutil.which(kubectl):
+        kubectl, label = [kubectl], kubectl
+    else:
+        print(f"{kubectl} not found, using _kubectl_standin.py (apply PATCHes only, no discovery)")
+        kubectl, label = [sys.executable, STANDIN], "stand-in"
+
+    app = FastAPI()
+    app.include_router(webapps.router)
+
+    @app.post("/legacy/namespaces/{namespace}/apps", response_model=dict)
+    def legacy(namespace: str, spec: webapps.AppDeploySpec):
+        spec.namespace = namespace
+        return legacy_create_app(kubectl, get_core_v1_api(), webapps.deployment_template, namespace, spec.dict())
+
+    client = TestClient(app)
+
+    def post(path):
+        resp = client.post(path, json=BODY)
+        assert resp.status_code == 200 and resp.json()["nodePort"] == _fake_apiserver.NODE_PORT, resp.text
+        return resp
+
+    tmp_before = set(glob.glob(os.path.join(tempfile.gettempdir(), "tmp*.yaml")))
+    before = rate(lambda: post("/legacy/namespaces/bench/apps"), args.requests)
+    leftover = set(glob.glob(os.path.join(tempfile.gettempdir(), "tmp*.yaml"))) - tmp_before
+    for path in leftover:
+        os.remove(path)
+
+    after = rate(lambda: post("/v1alpha1/namespaces/bench/apps"), args.requests)
+    print(f"{'before (tempfile + ' + label + ' apply)':<36} {before:>7.0f} req/s  "
+          f"({len(leftover)} temp files left behind, removed)")
+    print(f"{'after (server-side apply)':<36} {after:>7.0f} req/s")
+    server.shutdown()
+    os.remove(kubeconfig)
+
+
+if __name__ == "__main__":
+    main()
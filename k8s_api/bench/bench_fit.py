@@ -0,0 +1,56 @@
+"""
+准入检查的节点放置判断，逐节点 Python 循环（原 can_schedule）对比 numpy 向量化
+（NodeFitTable.fit_mask / best_fit）。取最坏情况：没有任何节点放得下，循环需扫描全部节点。
+
+    python bench/bench_fit.py [--iterations 200]
+"""
+import argparse
+import numpy as np
+from _common import best_of, fmt_us
+from routers.admission_webhook import NODE_CAPACITY, NodeFitTable, can_schedule
+
+NODE_COUNTS = (100, 1000, 10000)
+
+
+def legacy_can_schedule(allocations, req_cpu, req_mem, req_stor):
+    """改动前的实现：固定 NODE_CAPACITY，逐节点比较"""
+    for node, used in allocations.items():
+        free_cpu = NODE_CAPACITY["cpu"] - used["cpu"]
+        free_mem = NODE_CAPACITY["memory"] - used["memory"]
+        free_stor = NODE_CAPACITY["storage"] - used["storage"]
+        if free_cpu >= req_cpu and free_mem >= req_mem and free_stor >= req_stor:
+            if req_cpu <= 4 and req_mem <= 10 and req_stor <= 120:
+                return True
+    return False
+
+
+def build(count, rng):
+    names = [f"node-{i}" for i in range(count)]
+    capacity = np.tile((NODE_CAPACITY["cpu"], NODE_CAPACITY["memory"], NODE_CAPACITY["storage"]), (count, 1))
+    # 每个节点都只剩不到 1 核，请求 2 核时谁都放不下
+    used = capacity * rng.uniform(0.5, 0.9, size=(count, 3))
+    used[:, 0] = capacity[:, 0] - rng.uniform(0.0, 0.9, size=count)
+    allocations = {
+        name: {"cpu": u[0], "memory": u[1], "storage": u[2]} for name, u in zip(names, used.tolist())
+    }
+    return allocations, NodeFitTable(names, capacity, capacity - used)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    request = (2.0, 1.0, 0.0)
+    print(f"{'nodes':>6}  {'dict loop':>10}  {'vectorized':>10}  {'best-fit':>10}")
+    for count in NODE_COUNTS:
+        allocations, table = build(count, rng)
+        loop, r1 = best_of(lambda: legacy_can_schedule(allocations, *request), number=args.iterations)
+        vec, r2 = best_of(lambda: can_schedule(table, *request), number=args.iterations)
+        fit, r3 = best_of(lambda: can_schedule(table, *request, best_fit=True), number=args.iterations)
+        assert r1 is False and r2 is False and r3 is None
+        print(f"{count:>6}  {fmt_us(loop):>10}  {fmt_us(vec):>10}  {fmt_us(fit):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+list 接口的反序列化开销：对一份 10k 个 Job 的 JobList（字段与真实集群返回的相近，含 managedFields），
+比较 kubernetes 客户端反序列化成 V1JobList 再转换为 JobInfo，
+与 list_page 读取原始 JSON（orjson 或标准库 json）后只取所需字段。
+
+    python bench/bench_list_decode.py [--items 10000]
+"""
+import argparse
+import json
+from kubernetes import client
+from _common import best_of, fmt_ms
+from routers import jobs, pagination
+
+
+def job(i):
+    name = f"job-{i}"
+    return {
+        "apiVersion": "batch/v1",
+        "kind": "Job",
+        "metadata": {
+            "name": name, "namespace": "default", "uid": f"uid-{i}",
+            "resourceVersion": str(1000 + i), "creationTimestamp": "2026-10-01T10:00:00Z",
+            "labels": {"queue": "q1", "job-name": name},
+            "annotations": {"queue": "q1", "task_name": "t"},
+            "managedFields": [{
+                "manager": "kubectl", "operation": "Update", "apiVersion": "batch/v1",
+                "time": "2026-10-01T10:00:00Z", "fieldsType": "FieldsV1",
+                "fieldsV1": {"f:spec": {"f:template": {}}},
+            }],
+        },
+        "spec": {
+            "parallelism": 1, "completions": 1, "backoffLimit": 4,
+            "selector": {"matchLabels": {"controller-uid": f"uid-{i}"}},
+            "template": {
+                "metadata": {"labels": {"job-name": name, "queue": "q1"}},
+                "spec": {
+                    "restartPolicy": "Never",
+                    "containers": [{
+                        "name": "main", "image": "busybox:1.36",
+                        "command": ["/bin/sh", "-c", "sleep 10"],
+                        "env": [{"name": "A", "value": "1"}, {"name": "B", "value": "2"}],
+                        "resources": {"limits": {"cpu": "1", "memory": "1Gi"},
+                                      "requests": {"cpu": "1", "memory": "1Gi"}},
+                        "terminationMessagePath": "/dev/termination-log",
+                        "imagePullPolicy": "IfNotPresent",
+                    }],
+                    "dnsPolicy": "ClusterFirst", "schedulerName": "default-scheduler",
+                },
+            },
+        },
+        "status": {
+            "succeeded": 1, "startTime": "2026-10-01T10:00:00Z", "completionTime": "2026-10-01T10:00:12Z",
+            "conditions": [{"type": "Complete", "status": "True",
+                            "lastProbeTime": "2026-10-01T10:00:12Z",
+                            "lastTransitionTime": "2026-10-01T10:00:12Z"}],
+        },
+    }
+
+
+class RawResponse:
+    """_preload_content=False 时返回的 urllib3 响应中 list_page 用到的部分"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def release_conn(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    args = parser.parse_args()
+    data = json.dumps({
+        "apiVersion": "batch/v1", "kind": "JobList", "metadata": {"resourceVersion": "99"},
+        "items": [job(i) for i in range(args.items)],
+    }).encode()
+    print(f"JobList with {args.items} items, {len(data) / 1e6:.1f} MB")
+
+    api_client = client.ApiClient()
+
+    def typed():
+        job_list = api_client.deserialize(data.decode(), "V1JobList", "application/json")
+        return [jobs.job_info(j) for j in job_list.items]
+
+    def raw():
+        items, _ = pagination.list_page(lambda **kwargs: RawResponse(data))
+        return [jobs.job_info_from_dict(d) for d in items]
+
+    t_typed, expected = best_of(typed)
+    print(f"{'typed V1JobList':<18} {fmt_ms(t_typed):>8}")
+    orjson = pagination.orjson
+    try:
+        pagination.orjson = None
+        t_json, result = best_of(raw)
+        assert result == expected
+        print(f"{'raw + json':<18} {fmt_ms(t_json):>8}  ({t_typed / t_json:.1f}x)")
+    finally:
+        pagination.orjson = orjson
+    if orjson is None:
+        print(f"{'raw + orjson':<18} {'skipped (orjson not installed)':>8}")
+    else:
+        t_orjson, result = best_of(raw)
+        assert result == expected
+        print(f"{'raw + orjson':<18} {fmt_ms(t_orjson):>8}  ({t_typed / t_orjson:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+资源数量解析的单次调用耗时：改动前的 parse_cpu / parse_memory 对比严格解析 + LRU 缓存的版本，
+以及缓存未命中时 parse_quantity 本身的开销。
+
+    python bench/bench_quantity.py [--number 500000]
+"""
+import argparse
+from _common import best_of, fmt_ns
+from routers.admission_webhook import parse_cpu, parse_memory, parse_quantity
+
+SAMPLES = ("250m", "512Mi")
+
+
+def legacy_parse_cpu(cpu_str: str) -> float:
+    if cpu_str.endswith('m'):
+        return float(cpu_str[:-1]) / 1000.0
+    else:
+        return float(cpu_str)
+
+
+def legacy_parse_memory(mem_str: str) -> float:
+    mem_str = mem_str.strip()
+    units = {"Ki": 1 / 1024 / 1024, "Mi": 1 / 1024, "Gi": 1, "Ti": 1024}
+    for unit in units:
+        if mem_str.endswith(unit):
+            val = float(mem_str[:-len(unit)])
+            return val * units[unit]
+    val = float(mem_str)
+    return val / 1024 / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=500000)
+    args = parser.parse_args()
+    cpu, mem = SAMPLES
+    assert abs(legacy_parse_cpu(cpu) - parse_cpu(cpu)) < 1e-12
+    assert abs(legacy_parse_memory(mem) - parse_memory(mem)) < 1e-12
+
+    rows = [
+        (f'parse_cpu("{cpu}")', lambda: legacy_parse_cpu(cpu), lambda: parse_cpu(cpu)),
+        (f'parse_memory("{mem}")', lambda: legacy_parse_memory(mem), lambda: parse_memory(mem)),
+    ]
+    print(f"{'call':<22}  {'before':>8}  {'after':>8}")
+    for name, before, after in rows:
+        t_before, _ = best_of(before, number=args.number)
+        t_after, _ = best_of(after, number=args.number)
+        print(f"{name:<22}  {fmt_ns(t_before):>8}  {fmt_ns(t_after):>8}")
+
+    # 缓存未命中：直接调用被缓存包装的原函数
+    uncached = parse_quantity.__wrapped__
+    t_miss, _ = best_of(lambda: uncached(mem), number=args.number)
+    print(f"{'uncached parse_quantity':<22}  {'':>8}  {fmt_ns(t_miss):>8}")
+
+
+if __name__ == "__main__":
+    main()
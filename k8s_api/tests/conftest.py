@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from kubernetes import client as k8s
+from kubernetes.client.rest import ApiException
+from routers import jobs
+from routers.admission_webhook import NodeAllocationIndex
+
+
+@pytest.fixture
+def client(request):
+    """挂载测试模块 ROUTER 的 TestClient"""
+    app = FastAPI()
+    app.include_router(request.module.ROUTER)
+    return TestClient(app)
+
+
+class FakeInformer:
+    def __init__(self, synced=True):
+        self.synced = synced
+
+    def wait_synced(self, timeout=None):
+        return self.synced
+
+
+def node(name, cpu="8", memory="16Gi", control_plane=False):
+    labels = {"node-role.kubernetes.io/control-plane": ""} if control_plane else {}
+    return k8s.V1Node(
+        metadata=k8s.V1ObjectMeta(name=name, labels=labels, resource_version="1"),
+        status=k8s.V1NodeStatus(allocatable={"cpu": cpu, "memory": memory, "ephemeral-storage": "100Gi"}),
+    )
+
+
+def pod_spec(cpu, memory):
+    return {"containers": [{"resources": {"requests": {"cpu": cpu, "memory": memory}}}]}
+
+
+def make_index(synced=True, nodes=()):
+    """不连接集群的节点资源索引，informer 只回答是否已同步"""
+    index = NodeAllocationIndex()
+    index._informers = (FakeInformer(synced), FakeInformer(synced))
+    for n in nodes:
+        index._on_node("ADDED", n, None)
+    return index
+
+
+def job(i, **status):
+    return {"metadata": {"name": f"job-{i}", "namespace": "default", "labels": {"queue": "q1"}},
+            "status": status or {"active": 1}}
+
+
+class RawResponse:
+    def __init__(self, body):
+        self.data = json.dumps(body).encode()
+        self.released = False
+
+    def release_conn(self):
+        self.released = True
+
+
+class FakeBatchApi:
+    """
+    按偏移量分页的 list_namespaced_job（continue token 即下一页的起始下标），
+    create_namespaced_job 记录创建的 Job，名为 exists 的返回 409
+    """
+
+    def __init__(self, items=(), expired=()):
+        self.items = list(items)
+        self.expired = set(expired)
+        self.calls = []
+        self.responses = []
+        self.created = []
+
+    def list_namespaced_job(self, namespace, label_selector=None, _preload_content=True,
+                            limit=None, _continue=None):
+        assert _preload_content is False
+        self.calls.append({"limit": limit, "continue": _continue})
+        if _continue in self.expired:
+            raise ApiException(status=410, reason="Expired")
+        start = int(_continue or 0)
+        end = start + limit if limit else len(self.items)
+        metadata = {"continue": str(end)} if end < len(self.items) else {}
+        resp = RawResponse({"items": self.items[start:end], "metadata": metadata})
+        self.responses.append(resp)
+        return resp
+
+    def create_namespaced_job(self, namespace, body):
+        if body.metadata.name == "exists":
+            raise ApiException(status=409, reason="AlreadyExists")
+        self.created.append((namespace, body.metadata.name))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """替换 jobs 路由的 BatchV1Api，预置 5 个 Job"""
+    api = FakeBatchApi([job(i) for i in range(5)])
+    monkeypatch.setattr(jobs, "get_batch_v1_api", lambda: api)
+    return api
@@ -0,0 +1,158 @@
+import pytest
+from kubernetes import client as k8s
+from kubernetes.client.rest import ApiException
+from routers import admission_webhook
+from routers.admission_webhook import NodeAllocationIndex, can_schedule
+from routers.informer import Informer
+from conftest import FakeInformer, node, pod_spec, make_index
+
+ROUTER = admission_webhook.router
+
+
+def pod(name, node_name, cpu="1", memory="1Gi", phase="Running", rv="1"):
+    container = k8s.V1Container(name="c", resources=k8s.V1ResourceRequirements(
+        requests={"cpu": cpu, "memory": memory}))
+    return k8s.V1Pod(
+        metadata=k8s.V1ObjectMeta(name=name, namespace="default", resource_version=rv),
+        spec=k8s.V1PodSpec(containers=[container], node_name=node_name),
+        status=k8s.V1PodStatus(phase=phase),
+    )
+
+
+def test_index_tracks_pod_requests_per_node():
+    index = make_index()
+    index._on_node("ADDED", node("n1"), None)
+    index._on_node("ADDED", node("cp", cpu="64", control_plane=True), None)
+    index._on_pod("ADDED", pod("a", "n1", cpu="2", memory="4Gi"), None)
+    index._on_pod("ADDED", pod("b", "n1", cpu="500m", memory="512Mi"), None)
+    assert index.allocations() == {"n1": {"cpu": 2.5, "memory": 4.5, "storage": 0.0}}
+
+    # 更新只计一次，结束或删除的 Pod 释放资源
+    index._on_pod("MODIFIED", pod("a", "n1", cpu="2", memory="4Gi", rv="2"), None)
+    index._on_pod("MODIFIED", pod("b", "n1", cpu="500m", memory="512Mi", phase="Succeeded"), None)
+    assert index.allocations()["n1"]["cpu"] == 2.0
+    index._on_pod("DELETED", pod("a", "n1"), None)
+    assert index.allocations()["n1"]["cpu"] == 0.0
+
+
+def test_snapshot_excludes_control_plane_and_deleted_nodes():
+    index = make_index()
+    for i in range(20):   # 超过初始容量，触发数组扩容
+        index._on_node("ADDED", node(f"n{i}"), None)
+    index._on_node("ADDED", node("cp", control_plane=True), None)
+    index._on_node("DELETED", node("n0"), None)
+    index._on_pod("ADDED", pod("a", "n1", cpu="3"), None)
+    table = index.snapshot()
+    assert table.names == [f"n{i}" for i in range(1, 20)]
+    assert table.free[0].tolist() == [5.0, 15.0, 100.0]
+
+
+def test_can_schedule_and_best_fit():
+    index = make_index()
+    index._on_node("ADDED", node("big", cpu="16", memory="32Gi"), None)
+    index._on_node("ADDED", node("small", cpu="4", memory="8Gi"), None)
+    index._on_pod("ADDED", pod("a", "small", cpu="2", memory="2Gi"), None)
+    table = index.snapshot()
+    assert can_schedule(table, 2, 2, 0) is True
+    assert can_schedule(table, 2, 2, 0, best_fit=True) == "small"
+    assert can_schedule(table, 4, 2, 0, best_fit=True) == "big"
+    # 超过单个请求上限
+    assert can_schedule(table, 5, 1, 0) is False
+
+
+def test_snapshot_raises_when_not_synced():
+    index = make_index(synced=False)
+    with pytest.raises(admission_webhook.IndexNotSynced):
+        index.snapshot(timeout=0)
+
+
+def review(uid, cpu, memory):
+    return {"request": {"uid": uid, "object": {"spec": pod_spec(cpu, memory)}}}
+
+
+def test_validate(monkeypatch, client):
+    index = make_index()
+    index._on_node("ADDED", node("n1", cpu="4", memory="8Gi"), None)
+    monkeypatch.setattr(admission_webhook, "node_index", index)
+    resp = client.post("/admission/validate", json=review("u1", "2", "4Gi")).json()
+    assert resp["response"] == {"uid": "u1", "allowed": True}
+    resp = client.post("/admission/validate", json=review("u2", "4", "9Gi")).json()
+    assert resp["response"]["allowed"] is False
+    assert resp["response"]["status"]["code"] == 403
+
+
+def test_validate_denies_with_503_when_index_not_synced(monkeypatch, client):
+    monkeypatch.setattr(admission_webhook, "node_index", make_index(synced=False))
+    resp = client.post("/admission/validate", json=review("u1", "1", "1Gi"))
+    assert resp.status_code == 200
+    assert resp.json()["response"]["uid"] == "u1"
+    assert resp.json()["response"]["allowed"] is False
+    assert resp.json()["response"]["status"]["code"] == 503
+
+
+def test_validate_denies_invalid_quantity_with_400(monkeypatch, client):
+    monkeypatch.setattr(admission_webhook, "node_index", make_index())
+    resp = client.post("/admission/validate", json=review("u1", "1.2.3", "1Gi"))
+    assert resp.status_code == 200
+    assert resp.json()["response"]["uid"] == "u1"
+    assert resp.json()["response"]["allowed"] is False
+    assert resp.json()["response"]["status"]["code"] == 400
+
+
+def test_informer_relists_after_410():
+    pods = [[pod("a", "n1"), pod("b", "n1")], [pod("b", "n1", rv="2")]]
+
+    def list_pod_for_all_namespaces(**kwargs):
+        items = pods.pop(0)
+        return k8s.V1PodList(items=items, metadata=k8s.V1ListMeta(resource_version=str(len(pods))))
+
+    inf = Informer(list_pod_for_all_namespaces)
+    events = []
+    inf.add_handler(lambda event_type, obj, old: events.append((event_type, obj.metadata.name)))
+    watched = []
+
+    def watch_from(resource_version):
+        watched.append(resource_version)
+        if len(watched) == 1:
+            raise ApiException(status=410, reason="Gone")
+        inf._stopped.set()
+        return resource_version
+
+    inf._watch_from = watch_from
+    inf._run()
+    # 410 后重新 list，并把两次 list 之间的变化作为事件补发
+    assert watched == ["1", "0"]
+    assert events == [("ADDED", "a"), ("ADDED", "b"), ("DELETED", "a"), ("MODIFIED", "b")]
+    assert [p.metadata.name for p in inf.list()] == ["b"]
+    assert inf.wait_synced(0)
+
+
+def test_unparseable_pod_update_keeps_previous_usage():
+    index = make_index()
+    index._on_node("ADDED", node("n1"), None)
+    index._on_pod("ADDED", pod("a", "n1", cpu="2"), None)
+    index._on_pod("MODIFIED", pod("a", "n1", cpu="two", rv="2"), None)
+    assert index.allocations()["n1"]["cpu"] == 2.0
+    # 新 Pod 解析失败时不计入
+    index._on_pod("ADDED", pod("b", "n1", memory="1 Ki"), None)
+    assert index.allocations()["n1"]["cpu"] == 2.0
+    index._on_pod("DELETED", pod("a", "n1", cpu="two"), None)
+    assert index.allocations()["n1"]["cpu"] == 0.0
+
+
+def test_start_registers_handlers_before_publishing_informers(monkeypatch):
+    index = NodeAllocationIndex()
+    registered = []
+
+    class RecordingInformer(FakeInformer):
+        def add_handler(self, handler):
+            # 处理器注册完成前 wait_synced 不能看到 informer
+            assert index._informers is None
+            registered.append(handler)
+
+    monkeypatch.setattr(admission_webhook, "get_core_v1_api", lambda: k8s.CoreV1Api)
+    monkeypatch.setattr(admission_webhook, "shared_informer", lambda list_func: RecordingInformer())
+    assert index.wait_synced(0)
+    assert registered == [index._on_node, index._on_pod]
+    index.start()
+    assert len(registered) == 2
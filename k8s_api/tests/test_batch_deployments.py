@@ -0,0 +1,56 @@
+from kubernetes import client as k8s
+from models import BatchDeploymentSpec
+from routers import batch_deployments
+from routers.batch_deployments import deployment_patch
+
+ROUTER = batch_deployments.router
+
+
+def deployment(replicas=2, containers=(("web", "nginx:1", {"A": "1"}),)):
+    return k8s.V1Deployment(spec=k8s.V1DeploymentSpec(
+        replicas=replicas,
+        selector=k8s.V1LabelSelector(match_labels={"app": "web"}),
+        template=k8s.V1PodTemplateSpec(spec=k8s.V1PodSpec(containers=[
+            k8s.V1Container(name=name, image=image, env=[k8s.V1EnvVar(name=k, value=v) for k, v in env.items()])
+            for name, image, env in containers
+        ])),
+    ))
+
+
+def spec(name="web", image="nginx:1", replicas=2, env=None):
+    return BatchDeploymentSpec(name=name, namespace="default", image=image, replicas=replicas,
+                               env={"A": "1"} if env is None else env)
+
+
+def test_patch_contains_only_changed_fields():
+    assert deployment_patch(deployment(), spec()) is None
+    assert deployment_patch(deployment(), spec(replicas=3)) == {"spec": {"replicas": 3}}
+    assert deployment_patch(deployment(), spec(image="nginx:2", env={})) == {"spec": {"template": {"spec": {
+        "containers": [{"name": "web", "image": "nginx:2", "env": [{"$patch": "replace"}]}]}}}}
+
+
+def test_patch_replaces_renamed_or_extra_containers():
+    expected = [{"name": "web", "image": "nginx:1", "env": [{"name": "A", "value": "1"}]}, {"$patch": "replace"}]
+    patch = deployment_patch(deployment(containers=[("old", "nginx:1", {"A": "1"})]), spec())
+    assert patch["spec"]["template"]["spec"]["containers"] == expected
+    patch = deployment_patch(deployment(containers=[("web", "nginx:1", {"A": "1"}), ("sidecar", "x", {})]), spec())
+    assert patch["spec"]["template"]["spec"]["containers"] == expected
+
+
+class FakeAppsApi:
+    def __init__(self):
+        self.scaled = []
+
+    def patch_namespaced_deployment_scale(self, name, namespace, body, _content_type):
+        self.scaled.append((namespace, name, body["spec"]["replicas"]))
+
+
+def test_scale_always_sends_the_patch(monkeypatch, client):
+    api = FakeAppsApi()
+    monkeypatch.setattr(batch_deployments, "get_apps_v1_api", lambda: api)
+    # 缓存中的副本数可能已过时，不能据此跳过
+    monkeypatch.setattr(batch_deployments, "live_deployment", lambda namespace, name: deployment(replicas=3))
+    items = [{"name": "web", "namespace": "default", "replicas": 3}, {"name": "bad", "namespace": "default"}]
+    body = client.post("/v2/batch_deployments/scale", json=items).json()
+    assert (body["scaled"], body["failed"]) == (1, 1)
+    assert api.scaled == [("default", "web", 3)]
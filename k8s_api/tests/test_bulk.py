@@ -0,0 +1,74 @@
+import threading
+from kubernetes.client.rest import ApiException
+from routers import jobs
+from routers.bulk import parse_items, submit_bulk
+from routers.jobs import JobCreateSpec
+
+ROUTER = jobs.router
+
+
+def spec(name, **fields):
+    return {"name": name, "image": "busybox", "cpu": "1", "mem": "1Gi", **fields}
+
+
+def test_parse_items_validates_each_item():
+    parsed = parse_items(JobCreateSpec, [spec("a"), {"name": "b", "image": "x"}, "oops"])
+    assert parsed[0][0] == "a" and isinstance(parsed[0][1], JobCreateSpec)
+    assert parsed[1][0] == "b" and isinstance(parsed[1][1], ValueError)
+    assert "cpu" in str(parsed[1][1]) and "mem" in str(parsed[1][1])
+    assert parsed[2][0] is None and isinstance(parsed[2][1], ValueError)
+
+
+def test_submit_bulk_reports_each_item():
+    def create(body):
+        if body == "conflict":
+            raise ApiException(status=409, reason="AlreadyExists")
+        return {"uid": f"uid-{body}"}
+
+    entries = [("a", "a"), ("b", "conflict"), ("bad", ValueError("invalid")), ("a", "a"), (None, ValueError("x"))]
+    result = submit_bulk(entries, create)
+    assert (result["created"], result["failed"]) == (1, 4)
+    assert result["results"][0] == {"index": 0, "name": "a", "created": True, "uid": "uid-a"}
+    assert [(r["name"], r.get("status")) for r in result["results"]] == [
+        ("a", None), ("b", 409), ("bad", 422), ("a", 409), (None, 422),
+    ]
+
+
+def test_submit_bulk_isolates_non_api_errors():
+    def create(body):
+        if body == "down":
+            raise ConnectionError("connection refused")
+        return None
+
+    result = submit_bulk([("a", "a"), ("b", "down"), ("c", "c")], create)
+    assert (result["created"], result["failed"]) == (2, 1)
+    assert [(r["name"], r["created"], r.get("status")) for r in result["results"]] == [
+        ("a", True, None), ("b", False, 500), ("c", True, None),
+    ]
+    assert result["results"][1]["message"] == "connection refused"
+
+
+def test_submit_bulk_runs_concurrently():
+    barrier = threading.Barrier(4, timeout=5)
+    result = submit_bulk([(str(i), i) for i in range(4)], lambda body: barrier.wait() and None)
+    assert result["created"] == 4
+
+
+def test_bulk_endpoint_isolates_invalid_items(api, client):
+    items = [spec("ok"), {"name": "missing"}, spec("badmount", mount="nocolon"), spec("exists"), spec("ok")]
+    resp = client.post("/v1alpha1/namespaces/default/jobs/bulk", json=items)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [(r["name"], r["created"], r.get("status")) for r in body["results"]] == [
+        ("ok", True, None), ("missing", False, 422), ("badmount", False, 422),
+        ("exists", False, 409), ("ok", False, 409),
+    ]
+    assert api.created == [("default", "ok")]
+
+
+def test_bulk_endpoint_rejects_empty_and_oversized(api, client, monkeypatch):
+    assert client.post("/v1alpha1/namespaces/default/jobs/bulk", json=[]).status_code == 400
+    monkeypatch.setattr(jobs, "BULK_MAX_ITEMS", 2)
+    items = [spec(str(i)) for i in range(3)]
+    assert client.post("/v1alpha1/namespaces/default/jobs/bulk", json=items).status_code == 400
+    assert api.created == []
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from kubernetes import client as k8s
+from routers.job_watch import JobWatchMux
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class FakeInformer:
+    def __init__(self, objects=()):
+        self.objects = {f"default/{o.metadata.name}": o for o in objects}
+
+    def get(self, key):
+        return self.objects.get(key)
+
+    def list(self):
+        return list(self.objects.values())
+
+
+def job(uid, created, succeeded=None, failed=None):
+    return k8s.V1Job(
+        metadata=k8s.V1ObjectMeta(name="ota-dev1", namespace="default", uid=uid, creation_timestamp=created),
+        status=k8s.V1JobStatus(succeeded=succeeded, failed=failed),
+    )
+
+
+def pod(name, uid):
+    return k8s.V1Pod(metadata=k8s.V1ObjectMeta(
+        name=name, namespace="default",
+        labels={"job-name": "ota-dev1", "batch.kubernetes.io/controller-uid": uid}))
+
+
+def make_mux(jobs=(), pods=()):
+    mux = JobWatchMux("default")
+    mux._informers = (FakeInformer(jobs), FakeInformer(pods))
+    return mux
+
+
+async def settle(task):
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return task.done()
+
+
+def test_previous_run_in_cache_is_ignored():
+    # 上一次同名 Job 已成功结束，Pod 仍在缓存中
+    old_job = job("old", NOW - timedelta(hours=1), succeeded=1)
+    old_pod = pod("ota-dev1-old", "old")
+    start_time = (NOW - timedelta(seconds=1)).astimezone().replace(tzinfo=None)
+
+    async def main():
+        mux = make_mux([old_job], [old_pod])
+        created = asyncio.create_task(mux.wait_created("ota-dev1", start_time))
+        assert not await settle(created)
+        new_job = job("new", NOW)
+        mux._on_job("MODIFIED", new_job, old_job)
+        uid = await created
+
+        pods = asyncio.create_task(mux.wait_pod("ota-dev1", uid))
+        assert not await settle(pods)
+        mux._on_pod("MODIFIED", old_pod, None)
+        assert not await settle(pods)
+        mux._on_pod("ADDED", pod("ota-dev1-new", "new"), None)
+        pod_name = await pods
+
+        mux._informers[0].objects["default/ota-dev1"] = new_job
+        finished = asyncio.create_task(mux.wait_finished("ota-dev1", uid))
+        assert not await settle(finished)
+        # 旧 Job 的删除与状态事件不影响本次
+        mux._on_job("DELETED", old_job, old_job)
+        assert not await settle(finished)
+        mux._on_job("MODIFIED", job("new", NOW, failed=1), new_job)
+        return uid, pod_name, await finished
+
+    assert asyncio.run(main()) == ("new", "ota-dev1-new", False)
+
+
+def test_current_job_resolves_from_cache():
+    current = job("cur", NOW, succeeded=1)
+    start_time = (NOW - timedelta(seconds=2)).astimezone().replace(tzinfo=None)
+
+    async def main():
+        mux = make_mux([current], [pod("ota-dev1-cur", "cur")])
+        uid = await mux.wait_created("ota-dev1", start_time)
+        return uid, await mux.wait_pod("ota-dev1", uid), await mux.wait_finished("ota-dev1", uid)
+
+    assert asyncio.run(main()) == ("cur", "ota-dev1-cur", True)
+
+
+def test_deleted_job_ends_waiters():
+    current = job("cur", NOW)
+
+    async def main():
+        mux = make_mux([current])
+        pods = asyncio.create_task(mux.wait_pod("ota-dev1", "cur"))
+        finished = asyncio.create_task(mux.wait_finished("ota-dev1", "cur"))
+        assert not await settle(pods)
+        mux._on_job("DELETED", current, current)
+        return await pods, await finished
+
+    assert asyncio.run(main()) == (None, False)
+    # Job 已不在缓存中（或已被新的同名 Job 替换）时立即返回失败
+    assert asyncio.run(make_mux([job("other", NOW)]).wait_finished("ota-dev1", "cur")) is False
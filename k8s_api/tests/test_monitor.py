@@ -0,0 +1,29 @@
+import json
+from routers import monitor
+from routers.leader import FileLeaderLock
+from routers.monitor import BenchStatusReconciler
+
+
+def make_reconciler(tmp_path, monkeypatch, probes):
+    monkeypatch.setattr(monitor, "fetch_probe_success_bulk", lambda devices: dict(probes))
+    monkeypatch.setattr(monitor, "get_bench_statuses", lambda devices: {d: 0 for d in devices})
+    monkeypatch.setattr(monitor, "update_bench_statuses", lambda changes: True)
+    return BenchStatusReconciler(
+        lambda: ["d1", "d2"], str(tmp_path / "lock"), str(tmp_path / "snapshot.json")
+    )
+
+
+def test_only_the_lock_holder_publishes_the_snapshot(tmp_path, monkeypatch):
+    leader = make_reconciler(tmp_path, monkeypatch, {"d1": 1, "d2": 0})
+    assert leader._leader.try_acquire()
+    leader.reconcile_once()
+    published = json.loads((tmp_path / "snapshot.json").read_text())
+    assert {d["device"]: d["status"] for d in published["devices"]} == {"d1": 1, "d2": 0}
+
+    # 另一个 worker 手动触发同步：结果照常返回，但不覆盖持锁者的快照
+    follower = make_reconciler(tmp_path, monkeypatch, {"d1": 0})
+    results = follower.reconcile_once()
+    assert [r.get("new") for r in results] == [0, None]
+    assert json.loads((tmp_path / "snapshot.json").read_text()) == published
+    assert follower.snapshot() == published
+    leader._leader.release()
@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytest
+from routers import remote
+from routers.ota_rollouts import RolloutStore
+from routers.ota_scheduler import OtaScheduler, ota_job_name, recorded_start_time
+
+HOST = "jump-1"
+ROUTER = remote.router
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RolloutStore(str(tmp_path / "rollouts.db"))
+
+
+class Cluster:
+    """注入给调度器的 submit / watch / finish / job_exists，记录调用并模拟 Job"""
+
+    def __init__(self, jobs=(), release=True):
+        self.jobs = set(jobs)
+        self.submitted = []
+        self.finished = []
+        self.release = asyncio.Event() if not release else None
+
+    def submit(self, device, oss_link, user, start_time):
+        self.submitted.append((device, start_time))
+        self.jobs.add(ota_job_name(device))
+
+    async def watch(self, job_name, start_time):
+        if self.release is not None:
+            await self.release.wait()
+        return True, f"{job_name}-pod", {"SOC": "1.0"}
+
+    def finish(self, device, job_name, pod_name, start_time, end_time, succeeded, versions):
+        self.finished.append((device, start_time, succeeded))
+        self.jobs.discard(job_name)
+        return True
+
+    def job_exists(self, job_name):
+        return job_name in self.jobs
+
+
+def scheduler(store, cluster, tmp_path, **kwargs):
+    return OtaScheduler(store, HOST, cluster.submit, cluster.watch, cluster.finish, cluster.job_exists,
+                        ThreadPoolExecutor(4), str(tmp_path / "ota.lock"), interval=0.05, **kwargs)
+
+
+async def wait_until(predicate, timeout=5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def phases(store, rollout_id):
+    return {d["device"]: d["phase"] for d in store.get(rollout_id)["devices"]}
+
+
+def test_claim_queued_is_fifo_and_records_start_time(store):
+    first = store.create(["a", "b"], "oss://x", "u", HOST)
+    store.create(["c"], "oss://x", "u", HOST)
+    store.create(["other"], "oss://x", "u", "jump-2")
+    start = datetime(2026, 1, 2, 3, 4, 5)
+
+    rows = store.claim_queued(HOST, 2, start)
+    assert [r["device"] for r in rows] == ["a", "b"]
+    assert all(recorded_start_time(r) == start for r in rows)
+    assert phases(store, first) == {"a": "submitting", "b": "submitting"}
+    assert store.count_active(HOST) == 2
+    assert [r["device"] for r in store.claim_queued(HOST, 5, start)] == ["c"]
+    assert store.claim_queued(HOST, 5, start) == []
+    assert store.claim_queued(HOST, 0, start) == []
+    assert [recorded_start_time(r) for r in store.in_flight(HOST)] == [start] * 3
+
+
+def test_dispatch_respects_max_jobs(store, tmp_path):
+    async def main():
+        cluster = Cluster(release=False)
+        sched = scheduler(store, cluster, tmp_path, max_jobs=2)
+        sched.start()
+        rollout_id = await sched.enqueue(["a", "b", "c"], "oss://x", "u")
+        await wait_until(lambda: len(cluster.submitted) == 2)
+        await asyncio.sleep(0.2)
+        assert [d for d, _ in cluster.submitted] == ["a", "b"]
+        assert phases(store, rollout_id)["c"] == "queued"
+        assert (await sched.stats())["active"] == 2
+        cluster.release.set()
+        await wait_until(lambda: set(phases(store, rollout_id).values()) == {"cleaned"})
+        await sched.stop()
+        return cluster
+
+    cluster = asyncio.run(main())
+    assert sorted(d for d, _, _ in cluster.finished) == ["a", "b", "c"]
+    # 任务记录使用与 submit 相同的开始时间
+    assert {d: s for d, s in cluster.submitted} == {d: s for d, s, _ in cluster.finished}
+
+
+def test_recovery_after_restart(store, tmp_path):
+    rollout_id = store.create(["submitted", "lost", "deleted"], "oss://x", "u", HOST)
+    start = datetime(2026, 1, 2, 3, 4, 5)
+    rows = {r["device"]: r for r in store.claim_queued(HOST, 3, start)}
+    store.set_phase(rows["deleted"]["id"], "running")
+
+    async def main():
+        # 上一个调度者退出前：submitted 的 Job 已创建，lost 未创建，deleted 的 Job 已被删除
+        cluster = Cluster(jobs=[ota_job_name("submitted")])
+        sched = scheduler(store, cluster, tmp_path)
+        sched.start()
+        await wait_until(lambda: store.count_active(HOST) == 0 and len(cluster.finished) == 3)
+        await sched.stop()
+        return cluster
+
+    cluster = asyncio.run(main())
+    finished = {d: (s, ok) for d, s, ok in cluster.finished}
+    # 已提交的任务沿用原开始时间收尾；未创建 Job 的重新排队后再下发
+    assert finished["submitted"] == (start, True)
+    assert finished["deleted"] == (start, False)
+    assert [d for d, _ in cluster.submitted] == ["lost"]
+    assert finished["lost"][0] == cluster.submitted[0][1]
+    devices = {d["device"]: d for d in store.get(rollout_id)["devices"]}
+    assert devices["deleted"]["result"] == "failed"
+    assert devices["deleted"]["error"]
+    assert {d["phase"] for d in devices.values()} == {"cleaned"}
+
+
+def test_only_one_scheduler_dispatches(store, tmp_path):
+    async def main():
+        leader_cluster, follower_cluster = Cluster(), Cluster()
+        leader = scheduler(store, leader_cluster, tmp_path)
+        follower = scheduler(store, follower_cluster, tmp_path)
+        leader.start()
+        await wait_until(lambda: leader.is_leader)
+        follower.start()
+        await follower.enqueue(["a", "b"], "oss://x", "u")
+        await wait_until(lambda: len(leader_cluster.finished) == 2 and store.count_active(HOST) == 0)
+        assert not follower.is_leader and follower_cluster.submitted == []
+        await leader.stop()
+        # 调度者退出后由另一个 worker 接管
+        await follower.enqueue(["c"], "oss://x", "u")
+        await wait_until(lambda: store.count_active(HOST) == 0 and follower_cluster.finished)
+        assert follower.is_leader
+        assert [d for d, _, _ in follower_cluster.finished] == ["c"]
+        await follower.stop()
+
+    asyncio.run(main())
+
+
+def test_endpoints_return_503_when_scheduler_not_running(monkeypatch, client):
+    monkeypatch.setattr(remote, "ota_scheduler", None)
+    resp = client.post("/v1alpha1/remote/ota_jobs/submit_async", json={"devices": "a", "oss_link": "oss://x", "user": "u"})
+    assert resp.status_code == 503
+    assert client.get("/v1alpha1/remote/ota_jobs/scheduler").status_code == 503
@@ -0,0 +1,81 @@
+import json
+from kubernetes import client as k8s
+from routers import jobs
+from routers.pagination import iter_pages, list_page
+
+ROUTER = jobs.router
+
+
+def test_list_page_passes_limit_and_continue(api):
+    items, token = list_page(api.list_namespaced_job, 2, "1", namespace="default")
+    assert [d["metadata"]["name"] for d in items] == ["job-1", "job-2"]
+    assert token == "3"
+    assert api.calls == [{"limit": 2, "continue": "1"}]
+    assert api.responses[0].released
+
+
+def test_list_page_without_limit_returns_everything(api):
+    items, token = list_page(api.list_namespaced_job, namespace="default")
+    assert len(items) == 5 and token is None
+    assert api.calls == [{"limit": None, "continue": None}]
+
+
+def test_iter_pages_follows_continue(api):
+    pages = list(iter_pages(api.list_namespaced_job, 2, namespace="default"))
+    assert [len(items) for items, _ in pages] == [2, 2, 1]
+    assert [token for _, token in pages] == ["2", "4", None]
+
+
+def test_endpoint_returns_continue_token(api, client):
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default", "limit": 2})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [j["name"] for j in body["jobs"]] == ["job-0", "job-1"]
+    assert body["continue"] == "2"
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default",
+                                                 "limit": 2, "continue": "4"})
+    assert "continue" not in resp.json()
+
+
+def test_cached_list_has_no_continue_key(monkeypatch, client):
+    class FakeJobCache:
+        def list(self, namespace, queue=None):
+            return [k8s.V1Job(metadata=k8s.V1ObjectMeta(name="job-0", namespace=namespace, labels={"queue": queue}),
+                              status=k8s.V1JobStatus(succeeded=1))]
+
+    monkeypatch.setattr(jobs, "job_cache", FakeJobCache())
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default"})
+    assert resp.json() == {"jobs": [{"name": "job-0", "namespace": "default", "queue": "q1", "status": "Succeeded"}]}
+
+
+def test_expired_continue_is_410(api, client):
+    api.expired.add("2")
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default",
+                                                 "limit": 2, "continue": "2"})
+    assert resp.status_code == 410
+
+
+def test_stream_outputs_all_jobs_as_ndjson(api, client):
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default",
+                                                 "stream": "true", "limit": 2})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["name"] for line in lines] == [f"job-{i}" for i in range(5)]
+    assert lines[0]["status"] == "Active"
+
+
+def test_stream_reports_410_mid_stream_with_resume_token(api, client):
+    api.expired.add("4")
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default",
+                                                 "stream": "true", "limit": 2})
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["name"] for line in lines[:-1]] == [f"job-{i}" for i in range(4)]
+    assert lines[-1] == {"error": "Expired", "status": 410, "continue": "4"}
+
+
+def test_stream_with_expired_first_page_is_410(api, client):
+    api.expired.add("2")
+    resp = client.get("/v1alpha1/jobs/", params={"queue": "q1", "namespace": "default",
+                                                 "stream": "true", "continue": "2"})
+    assert resp.status_code == 410
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from routers import pod_logs
+from routers.pod_logs import PodLogCapture, PodLogRegistry
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pod_logs, "LOG_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_ring_buffer_keeps_last_lines(monkeypatch, log_dir):
+    monkeypatch.setattr(pod_logs, "RING_LINES", 3)
+    capture = PodLogCapture("pod-a")
+    for i in range(5):
+        capture.write(f"line {i}")
+    capture.close(complete=True)
+    assert list(capture.lines) == ["line 2", "line 3", "line 4"]
+    assert (log_dir / "pod-a.log").read_text().splitlines() == [f"line {i}" for i in range(5)]
+    assert capture.complete
+
+
+def test_rotation(monkeypatch, log_dir):
+    monkeypatch.setattr(pod_logs, "LOG_MAX_BYTES", 10)
+    monkeypatch.setattr(pod_logs, "LOG_BACKUP_COUNT", 2)
+    capture = PodLogCapture("pod-r")
+    for i in range(4):
+        capture.write(f"line-{i}-xx")
+    capture.close()
+    assert sorted(p.name for p in log_dir.iterdir()) == ["pod-r.log", "pod-r.log.1", "pod-r.log.2"]
+
+
+def test_subscriber_receives_lines_then_end():
+    async def main():
+        capture = PodLogCapture("pod-s")
+        capture.write("old")
+        backlog, queue = capture.subscribe()
+        capture.write("new")
+        capture.close()
+        items = [await asyncio.wait_for(queue.get(), 1) for _ in range(2)]
+        return backlog, items
+
+    backlog, items = asyncio.run(main())
+    assert backlog == ["old"]
+    assert items == ["new", None]
+
+
+def test_end_delivered_when_subscriber_queue_full(monkeypatch):
+    monkeypatch.setattr(pod_logs, "SUBSCRIBER_QUEUE_SIZE", 2)
+
+    async def main():
+        capture = PodLogCapture("pod-f")
+        _, queue = capture.subscribe()
+        for i in range(5):
+            capture.write(f"line {i}")
+        capture.close()
+        await asyncio.sleep(0)
+        items = []
+        while True:
+            item = await asyncio.wait_for(queue.get(), 1)
+            items.append(item)
+            if item is None:
+                return items
+
+    items = asyncio.run(main())
+    assert items[-1] is None
+    assert len(items) == 2
+
+
+def test_subscribe_after_close_gets_end():
+    async def main():
+        capture = PodLogCapture("pod-c")
+        capture.write("x")
+        capture.close()
+        backlog, queue = capture.subscribe()
+        return backlog, queue.get_nowait()
+
+    assert asyncio.run(main()) == (["x"], None)
+
+
+def test_unsubscribe_stops_delivery():
+    async def main():
+        capture = PodLogCapture("pod-u")
+        _, queue = capture.subscribe()
+        capture.unsubscribe(queue)
+        capture.write("x")
+        capture.close()
+        await asyncio.sleep(0)
+        return queue.empty()
+
+    assert asyncio.run(main())
+
+
+def test_registry_evicts_only_closed_captures():
+    registry = PodLogRegistry(max_captures=2)
+    a = registry.open("a", "job-a")
+    registry.open("b")
+    a.close()
+    registry.open("c")
+    assert registry.get("a") is None
+    registry.open("d")   # b、c 仍在写入，不淘汰
+    assert [registry.get(n) is not None for n in "bcd"] == [True, True, True]
+    assert registry.find_by_job("job-a") is None
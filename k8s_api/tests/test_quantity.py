@@ -0,0 +1,69 @@
+import pytest
+from routers.admission_webhook import parse_quantity, parse_cpu, parse_memory
+
+
+@pytest.mark.parametrize("quantity, expected", [
+    ("0", 0.0),
+    ("2", 2.0),
+    ("1.5", 1.5),
+    (".5", 0.5),
+    ("2k", 2e3),
+    ("3M", 3e6),
+    ("1G", 1e9),
+    ("1T", 1e12),
+    ("1P", 1e15),
+    ("1E", 1e18),
+    ("1Ki", 1024.0),
+    ("1.5Mi", 1.5 * 2 ** 20),
+    ("4Gi", 4 * 2 ** 30),
+    ("1Ti", 2.0 ** 40),
+    ("1Pi", 2.0 ** 50),
+    ("1Ei", 2.0 ** 60),
+])
+def test_decimal_and_binary_suffixes(quantity, expected):
+    assert parse_quantity(quantity) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("quantity, expected", [
+    ("1e3", 1e3),
+    ("1E-3", 1e-3),
+    ("2.5e+2", 250.0),
+    ("1E3", 1e3),
+])
+def test_exponents(quantity, expected):
+    # 大写 E 后跟数字是指数，单独的 E 才是 10^18 后缀
+    assert parse_quantity(quantity) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("quantity, expected", [
+    ("500m", 0.5),
+    ("1m", 0.001),
+    ("1500m", 1.5),
+    ("0.5m", 0.0005),
+])
+def test_milli_suffix(quantity, expected):
+    assert parse_quantity(quantity) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("quantity, expected", [
+    ("+1", 1.0),
+    ("-1", -1.0),
+    ("-500m", -0.5),
+    ("  2Gi ", 2 * 2 ** 30),
+    ("\t100m\n", 0.1),
+    (3, 3.0),
+])
+def test_signs_whitespace_and_numbers(quantity, expected):
+    assert parse_quantity(quantity) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("quantity", ["1.2.3", "Mi", "", "1 Ki", "m", "1mi", "1KB", "1e", "e3", "--1", "1Gi2"])
+def test_rejects_invalid_quantities(quantity):
+    with pytest.raises(ValueError):
+        parse_quantity(quantity)
+
+
+def test_cpu_and_memory_units():
+    assert parse_cpu("250m") == pytest.approx(0.25)
+    assert parse_memory("512Mi") == pytest.approx(0.5)
+    assert parse_memory("1G") == pytest.approx(1e9 / 2 ** 30)
@@ -0,0 +1,52 @@
+import time
+from kubernetes import client as k8s
+from routers.service_index import DeviceServiceIndex
+
+
+def service(name, selector):
+    return k8s.V1Service(metadata=k8s.V1ObjectMeta(name=name), spec=k8s.V1ServiceSpec(selector=selector))
+
+
+def pod(name, labels, node_name="n1", phase="Running"):
+    return k8s.V1Pod(metadata=k8s.V1ObjectMeta(name=name, labels=labels),
+                     spec=k8s.V1PodSpec(containers=[], node_name=node_name),
+                     status=k8s.V1PodStatus(phase=phase))
+
+
+def test_pods_resolve_to_matching_services():
+    index = DeviceServiceIndex("devices")
+    index._on_service("ADDED", service("a-svc", {"app": "a"}), None)
+    index._on_service("ADDED", service("b-svc", {"app": "b", "tier": "x"}), None)
+    index._on_pod("ADDED", pod("a-1", {"app": "a"}, phase="Pending"), None)
+    index._on_pod("ADDED", pod("b-1", {"app": "b"}), None)
+    assert index._svc_pod == {"a-svc": "a-1"}
+
+    # Running 优先；标签变化后不再匹配的 Pod 让出后端
+    index._on_pod("ADDED", pod("a-2", {"app": "a"}, node_name="n2"), None)
+    index._on_pod("MODIFIED", pod("b-1", {"app": "b", "tier": "x"}), None)
+    assert index._svc_pod == {"a-svc": "a-2", "b-svc": "b-1"}
+    index._on_pod("MODIFIED", pod("a-2", {"app": "other"}), None)
+    assert index._svc_pod["a-svc"] == "a-1"
+
+    index._on_pod("DELETED", pod("a-1", {"app": "a"}), None)
+    index._on_service("DELETED", service("b-svc", {"app": "b", "tier": "x"}), None)
+    assert index._svc_pod == {}
+    assert index._pod_svcs == {}
+    assert set(index._label_svcs) == {("app", "a")}
+
+
+class SlowInformer:
+    """用满给定的超时才完成同步"""
+
+    def wait_synced(self, timeout=None):
+        time.sleep(timeout)
+        return True
+
+
+def test_wait_synced_shares_one_deadline():
+    index = DeviceServiceIndex("devices")
+    index._informers = (SlowInformer(), SlowInformer(), SlowInformer())
+    start = time.monotonic()
+    assert index.wait_synced(0.2) is True
+    # 逐个等满 SYNC_TIMEOUT 时需要 0.6s
+    assert time.monotonic() - start < 0.4
@@ -0,0 +1,120 @@
+import threading
+import paramiko
+import pytest
+from routers.ssh_pool import SSHTransportPool
+
+
+class FakeTransport:
+    def __init__(self, fail_sessions=0):
+        self.active = True
+        self.fail_sessions = fail_sessions
+
+    def is_active(self):
+        return self.active
+
+    def close(self):
+        self.active = False
+
+    def send_ignore(self):
+        pass
+
+    def open_session(self, timeout=None):
+        if self.fail_sessions:
+            self.fail_sessions -= 1
+            raise paramiko.SSHException("session failed")
+        raise AssertionError("not expected in these tests")
+
+
+def make_pool(opens, size=2):
+    """opens: 依次由 _open 返回的 Transport，或要抛出的异常"""
+    pool = SSHTransportPool("jump", 22, "u", "p", size=size, acquire_timeout=0.1)
+
+    def _open():
+        item = opens.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    pool._open = _open
+    return pool
+
+
+def test_acquire_and_release_reuse_connection():
+    t = FakeTransport()
+    pool = make_pool([t])
+    client = pool.connect()
+    assert pool.stats() == {"size": 2, "open": 1, "idle": 0}
+    client.close()
+    client.close()   # 重复 close 不会重复归还
+    assert pool.stats() == {"size": 2, "open": 1, "idle": 1}
+    assert pool.acquire() is t
+
+
+def test_failed_open_returns_slot():
+    pool = make_pool([OSError("refused")], size=1)
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.stats()["open"] == 0
+
+
+def test_acquire_times_out_when_exhausted():
+    pool = make_pool([FakeTransport()], size=1)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+
+def test_dead_idle_connection_is_replaced():
+    dead, fresh = FakeTransport(), FakeTransport()
+    pool = make_pool([dead, fresh], size=1)
+    pool.release(pool.acquire())
+    dead.active = False
+    assert pool.acquire() is fresh
+    assert pool.stats()["open"] == 1
+
+
+def test_failed_reconnect_releases_slot_once():
+    pool = make_pool([FakeTransport(fail_sessions=1), OSError("refused")], size=1)
+    client = pool.connect()
+    with pytest.raises(OSError):
+        client.exec_command("true")
+    assert pool.stats()["open"] == 0
+    client.close()
+    assert pool.stats() == {"size": 1, "open": 0, "idle": 0}
+    # 名额已归还，可以再建立新连接
+    pool._open = FakeTransport
+    assert pool.acquire() is not None
+    assert pool.stats()["open"] == 1
+
+
+def test_close_disconnects_borrowed_connections_on_release():
+    idle, borrowed = FakeTransport(), FakeTransport()
+    pool = make_pool([idle, borrowed])
+    first = pool.acquire()
+    pool.acquire()
+    pool.release(first)
+    pool.close()
+    assert not idle.active and pool.stats() == {"size": 2, "open": 1, "idle": 0}
+    pool.release(borrowed)
+    assert not borrowed.active and pool.stats() == {"size": 2, "open": 0, "idle": 0}
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_health_check_runs_outside_the_pool_lock():
+    checked = []
+
+    class ProbedTransport(FakeTransport):
+        def send_ignore(self):
+            # 探测期间其他线程仍可使用连接池
+            probe = threading.Thread(target=lambda: checked.append(pool.stats()["open"]))
+            probe.start()
+            probe.join(1)
+
+    t = ProbedTransport()
+    pool = make_pool([t])
+    pool._idle.append((t, 0.0))
+    pool._total = 1
+    pool.keepalive = 0
+    assert pool.acquire() is t
+    assert checked == [1]
@@ -0,0 +1,43 @@
+from routers import admission_webhook
+from conftest import node, pod_spec, make_index
+
+ROUTER = admission_webhook.router
+
+
+def set_index(monkeypatch, nodes, synced=True):
+    index = make_index(synced, nodes)
+    monkeypatch.setattr(admission_webhook, "node_index", index)
+    return index
+
+
+def test_batch_placement_consumes_capacity_in_order(monkeypatch, client):
+    index = set_index(monkeypatch, [node("small", "2", "4Gi"), node("big", "4", "8Gi")])
+    pods = [pod_spec("2", "2Gi"), pod_spec("3", "4Gi"), pod_spec("2", "2Gi"), pod_spec("5", "1Gi")]
+    body = client.post("/admission/validate_batch", json={"pods": pods}).json()
+    # 第一个最适合 small，第二个只能放 big，第三个时两台都已不够
+    assert [(r["allowed"], r["node"]) for r in body["results"]] == [
+        (True, "small"), (True, "big"), (False, None), (False, None),
+    ]
+    assert [r["index"] for r in body["results"]] == [0, 1, 2, 3]
+    assert (body["allowed"], body["denied"]) == (2, 2)
+    assert "message" in body["results"][2]
+    # 模拟不改变索引本身
+    assert index.snapshot().free.tolist() == [[2.0, 4.0, 100.0], [4.0, 8.0, 100.0]]
+
+
+def test_batch_returns_503_when_index_not_synced(monkeypatch, client):
+    set_index(monkeypatch, [], synced=False)
+    resp = client.post("/admission/validate_batch", json={"pods": [pod_spec("1", "1Gi")]})
+    assert resp.status_code == 503
+
+
+
+def test_batch_denies_only_the_item_with_an_invalid_quantity(monkeypatch, client):
+    set_index(monkeypatch, [node("n1", "4", "8Gi")])
+    pods = [pod_spec("1", "1 Ki"), pod_spec("2", "2Gi")]
+    resp = client.post("/admission/validate_batch", json={"pods": pods})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [(r["allowed"], r["node"]) for r in body["results"]] == [(False, None), (True, "n1")]
+    assert "1 Ki" in body["results"][0]["message"]
+    assert (body["allowed"], body["denied"]) == (1, 1)
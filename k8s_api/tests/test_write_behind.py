@@ -0,0 +1,165 @@
+import json
+import time
+import pymysql
+import pytest
+from routers.device_database import WriteBehindQueue
+
+INSERT_GOOD = ("good", "t", "OTA", "u", "2026-01-01 00:00:00", "running")
+INSERT_BAD = ("bad", "t", "OTA", "u", "2026-01-01 00:00:00", "running")
+
+
+class FakeDB:
+    """替代 _write：rejected 中的设备名所在批次整体失败，down 为 True 时模拟数据库不可用"""
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.down = False
+        self.calls = 0
+        self.updates, self.inserts, self.finishes = {}, [], {}
+
+    def write(self, updates, inserts, finishes):
+        self.calls += 1
+        names = {name for rows in updates.values() for name in rows}
+        names |= {row[0] for row in inserts} | {key[0] for key in finishes}
+        if self.down:
+            raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+        if names & self.rejected:
+            raise pymysql.err.IntegrityError(1062, "Duplicate entry")
+        for columns, rows in updates.items():
+            self.updates.setdefault(columns, {}).update(rows)
+        self.inserts.extend(inserts)
+        self.finishes.update(finishes)
+
+
+@pytest.fixture
+def dead_letter(tmp_path):
+    return tmp_path / "dead.jsonl"
+
+
+def make_queue(db, dead_letter, max_retries=3):
+    queue = WriteBehindQueue(0.01, max_retries=max_retries, max_backoff=0.05,
+                             dead_letter_path=str(dead_letter))
+    queue._write = db.write
+    return queue
+
+
+def test_updates_coalesce_per_device(dead_letter):
+    db = FakeDB()
+    queue = make_queue(db, dead_letter)
+    queue.put_update(("bench_status",), "d1", (0,))
+    queue.put_update(("bench_status",), "d1", (1,))
+    queue.put_update(("bench_status",), "d2", (0,))
+    queue.flush()
+    assert db.calls == 1
+    assert db.updates == {("bench_status",): {"d1": (1,), "d2": (0,)}}
+
+
+def test_transient_failure_backs_off_and_retries(dead_letter):
+    db = FakeDB()
+    db.down = True
+    queue = make_queue(db, dead_letter)
+    queue.put_update(("bench_status",), "d1", (1,))
+    queue.flush()
+    assert queue._failures == 1
+    queue.flush()   # 退避期间不重试
+    assert db.calls == 1
+    # 失败期间到达的新值覆盖旧值
+    queue.put_update(("bench_status",), "d1", (2,))
+    db.down = False
+    time.sleep(0.05)
+    queue.flush()
+    assert db.updates == {("bench_status",): {"d1": (2,)}}
+    assert queue._failures == 0
+    assert not dead_letter.exists()
+
+
+def test_outage_longer_than_retry_budget_loses_nothing(dead_letter):
+    db = FakeDB()
+    db.down = True
+    queue = make_queue(db, dead_letter, max_retries=2)
+    queue.put_insert(INSERT_GOOD)
+    queue.put_update(("bench_status",), "d1", (1,))
+    for _ in range(10):
+        queue._retry_at = 0.0
+        queue.flush()
+    assert db.calls == 10
+    assert queue._inserts == [INSERT_GOOD]
+    db.down = False
+    queue._retry_at = 0.0
+    queue.flush()
+    assert db.inserts == [INSERT_GOOD]
+    assert db.updates == {("bench_status",): {"d1": (1,)}}
+    assert not dead_letter.exists()
+
+
+def test_outage_during_per_record_fallback_requeues_the_rest(dead_letter):
+    db = FakeDB(rejected={"bad"})
+    queue = make_queue(db, dead_letter, max_retries=1)
+    write = db.write
+
+    def flaky(updates, inserts, finishes):
+        if db.calls >= 2:
+            db.down = True
+        return write(updates, inserts, finishes)
+
+    queue._write = flaky
+    queue.put_insert(INSERT_BAD)
+    queue.put_insert(INSERT_GOOD)
+    queue.flush()
+    # bad 被隔离后数据库断开，good 留在队列中
+    assert queue._inserts == [INSERT_GOOD]
+    assert [r["inserts"] for r in map(json.loads, dead_letter.read_text().splitlines())] == [[list(INSERT_BAD)]]
+    db.down = False
+    queue._write = write
+    queue._retry_at = 0.0
+    queue.flush()
+    assert db.inserts == [INSERT_GOOD]
+
+
+def test_poison_record_is_dead_lettered_after_max_retries(dead_letter):
+    db = FakeDB(rejected={"bad"})
+    queue = make_queue(db, dead_letter, max_retries=3)
+    queue.put_insert(INSERT_BAD)
+    queue.put_insert(INSERT_GOOD)
+    queue.put_update(("bench_status",), "d1", (1,))
+    for _ in range(100):
+        queue.flush()
+        if db.inserts:
+            break
+        time.sleep(0.01)
+    assert db.inserts == [INSERT_GOOD]
+    assert db.updates == {("bench_status",): {"d1": (1,)}}
+    records = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [r["inserts"] for r in records] == [[list(INSERT_BAD)]]
+    assert queue._failures == 0 and queue._inserts == []
+    # 之后的写入不再被阻塞
+    queue.put_insert(INSERT_GOOD)
+    queue.flush()
+    assert db.inserts == [INSERT_GOOD, INSERT_GOOD]
+
+
+def test_stop_writes_remaining_records_individually(dead_letter):
+    db = FakeDB(rejected={"bad"})
+    queue = make_queue(db, dead_letter)
+    queue.start()
+    queue._retry_at = time.monotonic() + 60   # 正处于退避中
+    queue.put_insert(INSERT_BAD)
+    queue.put_finish(("good", "t", "2026-01-01 00:00:00"), ("2026-01-01 00:10:00", "succeeded"))
+    queue.stop()
+    assert not queue.running
+    assert list(db.finishes) == [("good", "t", "2026-01-01 00:00:00")]
+    assert len(dead_letter.read_text().splitlines()) == 1
+
+
+def test_stop_during_outage_dead_letters_the_batch_once(dead_letter):
+    db = FakeDB()
+    db.down = True
+    queue = make_queue(db, dead_letter)
+    queue.put_insert(INSERT_GOOD)
+    queue.put_update(("bench_status",), "d1", (1,))
+    queue.stop()
+    assert db.calls == 1
+    records = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]["inserts"] == [list(INSERT_GOOD)]
+    assert records[0]["updates"] == [[["bench_status"], "d1", [1]]]